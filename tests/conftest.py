@@ -1 +1,49 @@
 pytest_plugins = ("tests.fixtures.aio_consumers",)
+
+
+def pytest_configure(config):
+    """Init django."""
+    import django
+    from django.conf import settings
+
+    settings.configure(
+        SERVICE_NAME="TEST_SERVICE",
+        DEBUG_PROPAGATE_EXCEPTIONS=True,
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        SITE_ID=1,
+        SECRET_KEY="not very secret in tests",
+        USE_I18N=True,
+        USE_L10N=True,
+        STATIC_URL="/static/",
+        ROOT_URLCONF="tests.django.urls",
+        TEMPLATES=[
+            {
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "APP_DIRS": True,
+                "OPTIONS": {"debug": True},  # We want template errors to raise
+            },
+        ],
+        MIDDLEWARE=(
+            "django.middleware.common.CommonMiddleware",
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+            "django.contrib.messages.middleware.MessageMiddleware",
+        ),
+        INSTALLED_APPS=(
+            "django.contrib.admin",
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.sessions",
+            "django.contrib.sites",
+            "django.contrib.staticfiles",
+            "rest_framework",
+            "toolset.event_bus.django",
+            "tests.django",
+        ),
+        PASSWORD_HASHERS=("django.contrib.auth.hashers.MD5PasswordHasher",),
+        REST_FRAMEWORK={
+            "EXCEPTION_HANDLER": "toolset.drf.exceptions_utils.handlers.custom_exception_handler",
+        },
+    )
+
+    django.setup()
@@ -1,6 +1,8 @@
 """Snatched from https://github.com/encode/django-rest-framework/blob/master/tests/models.py ."""
 from django.db import models
 
+from toolset.event_bus.django.outbox import OutboxEventABC
+
 
 class RESTFrameworkModel(models.Model):
     """Base for test models that sets app_label, so they play nicely."""
@@ -8,3 +10,7 @@ class RESTFrameworkModel(models.Model):
     class Meta:
         app_label = "tests"
         abstract = True
+
+
+class OutboxEvent(OutboxEventABC):
+    """Outbox of event bus tests."""
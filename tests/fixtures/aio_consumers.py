@@ -83,10 +83,11 @@ def full_queue_factory(queue_mock):
 def rabbit_message_factory():
     """Message factory. Return coroutine mock object."""
 
-    def factory(payload: JSON, routing_key: str):
+    def factory(payload: JSON, routing_key: str, headers=None):
         message = CoroutineMock()
         message.body = json.dumps(payload).encode()
         message.routing_key = routing_key
+        message.headers = headers or {}
         return message
 
     return factory
@@ -1,6 +1,12 @@
+import asyncio
+
 import pytest
+from aiohttp import web
 
 from toolset.aio.base_api_client import BaseApiClient
+from toolset.aio.fan_out import RequestSpec
+from toolset.aio.sessions import SessionRegistry, close_sessions
+from toolset.http_cache import HttpCache
 
 
 class TestApiClient(BaseApiClient):
@@ -21,3 +27,187 @@ class TestApiClient(BaseApiClient):
 async def test_aiohttp_param(input_params, output_params):
     """Test aiohttp params from dict."""
     assert TestApiClient().make_params(input_params) == output_params
+
+
+class OwnSessionApiClient(BaseApiClient):
+    """Api client with own session."""
+
+    service_name = "own"
+    session_name = None
+
+
+@pytest.fixture()
+def sessions(mocker):
+    """Registry of test."""
+    registry = SessionRegistry()
+    mocker.patch.object(BaseApiClient, "sessions", registry)
+    yield registry
+
+
+@pytest.fixture()
+async def server(aiohttp_server):
+    """Server counting HEAD requests."""
+    app = web.Application()
+    app["heads"] = 0
+    app["gets"] = []
+
+    async def _head(request):
+        request.app["heads"] += 1
+        return web.Response()
+
+    async def _get(request):
+        request.app["gets"].append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"1"':
+            return web.Response(status=304, headers={"Cache-Control": "max-age=10"})
+        return web.json_response({"ok": True}, headers={"ETag": '"1"', "Cache-Control": "no-cache"})
+
+    app.router.add_head("/", _head)
+    app.router.add_get("/", _get, allow_head=False)
+    return await aiohttp_server(app)
+
+
+async def test_shared_session(sessions, server):
+    """Test clients share session created lazily with configured connector."""
+    sessions.configure(limit_per_host=5, keepalive_timeout=10)
+    first, second = TestApiClient(), TestApiClient()
+
+    assert first.session is second.session
+    assert first.session.connector.limit_per_host == 5
+    response = await first.get(server.make_url("/"))
+    assert await response.json() == {"ok": True}
+
+    await first.close()
+    shared = second.session
+    assert not shared.closed
+    await sessions.close()
+    assert shared.closed
+    assert first.session is not shared
+    await sessions.close()
+
+
+async def test_own_session(sessions):
+    """Test client without session name uses own session."""
+    client = OwnSessionApiClient()
+    session = client.session
+
+    assert session is client.session
+    assert session is not TestApiClient().session
+    await client.close()
+    assert session.closed
+    await sessions.close()
+
+
+async def test_prewarm(sessions, server):
+    """Test prewarm opens connections, unavailable hosts are skipped."""
+    await sessions.prewarm([server.make_url("/"), "http://127.0.0.1:1/"], connections=3)
+
+    assert server.app["heads"] == 3
+    assert len(sessions.get().connector._conns) == 1
+    await close_sessions()
+    await sessions.close()
+
+
+class CachedApiClient(BaseApiClient):
+    """Api client with cache."""
+
+    service_name = "cached"
+    cache = HttpCache()
+
+
+async def test_cached_get(sessions, server):
+    """Test no-cache response is revalidated, then fresh response is returned from cache."""
+    client = CachedApiClient()
+    url = server.make_url("/")
+
+    first = await client.get(url, params=client.make_params({"id": [1, 2]}))
+    second = await client.get(url, params=[("id", "1"), ("id", "2")])
+    third = await client.get(url, params=[("id", "1"), ("id", "2")])
+
+    assert first is second is third
+    assert await first.json() == await third.json() == {"ok": True}
+    assert server.app["gets"] == [None, '"1"']
+    assert client.cache.stats.hits == 1
+    await sessions.close()
+
+
+class CoalescingApiClient(BaseApiClient):
+    """Api client coalescing requests."""
+
+    service_name = "coalescing"
+    coalesce_requests = True
+
+
+@pytest.fixture()
+async def slow_server(aiohttp_server):
+    """Server answering after a while."""
+    app = web.Application()
+    app["gets"] = []
+
+    async def _get(request):
+        request.app["gets"].append(request.query_string)
+        await asyncio.sleep(0.05)
+        if "fail" in request.query:
+            raise web.HTTPInternalServerError()
+        return web.json_response({"query": request.query_string})
+
+    app.router.add_get("/", _get)
+    return await aiohttp_server(app)
+
+
+async def test_coalesced_get(sessions, slow_server):
+    """Test concurrent identical requests share response, cancelled waiter doesn't cancel it."""
+    client = CoalescingApiClient()
+    url = slow_server.make_url("/")
+
+    cancelled = asyncio.ensure_future(client.get(url, params={"a": "1", "b": "2"}))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    responses = await asyncio.gather(
+        client.get(url, params=[("b", "2"), ("a", "1")]),
+        client.get(url, params={"a": "1", "b": "2"}),
+        client.get(url, params={"a": "1"}),
+        client.get(url, params={"a": "1", "b": "2"}, headers={"Accept-Language": "en"}),
+    )
+
+    assert responses[0] is responses[1]
+    assert [await response.json() for response in responses] == [
+        {"query": "a=1&b=2"},
+        {"query": "a=1&b=2"},
+        {"query": "a=1"},
+        {"query": "a=1&b=2"},
+    ]
+    assert len(slow_server.app["gets"]) == 3
+    assert not client._in_flight  # noqa: WPS437 protected attribute
+
+    failed = await asyncio.gather(
+        client.get(url, params={"fail": "1"}), client.get(url, params={"fail": "1"}),
+    )
+    assert failed[0] is failed[1]
+    assert failed[0].status == 500
+    await sessions.close()
+
+
+async def test_gather_bounded(sessions, slow_server):
+    """Test client sends specs with bounded concurrency, error statuses are item errors."""
+    client = TestApiClient()
+    url = slow_server.make_url("/")
+
+    res = await client.gather_bounded(
+        [
+            url.with_query(id="1"),
+            RequestSpec(url, kwargs={"params": {"fail": "1"}}),
+            RequestSpec(url, "get", {"params": {"id": "2"}}),
+        ],
+        concurrency=2,
+        raise_for_status=True,
+    )
+
+    assert [await response.json() for response in (res.results[0], res.results[2])] == [
+        {"query": "id=1"},
+        {"query": "id=2"},
+    ]
+    assert res.errors[1].status == 500
+    assert res.stats[:3] == (3, 3, 1)
+    items = [item async for item in client.map([url], concurrency=1)]
+    assert items[0].result.status == 200
+    await sessions.close()
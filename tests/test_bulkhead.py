@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from toolset.decorators import (
+    AioBulkhead,
+    Bulkhead,
+    BulkheadFullError,
+    FailFastError,
+    aio_bulkhead,
+    aio_timeout,
+    bulkhead,
+    timeout,
+)
+
+
+def test_bulkhead_rejects_over_queue():
+    """Test calls over slots wait, calls over queue are rejected."""
+    release = threading.Event()
+    limited = bulkhead(max_concurrent=1, max_waiting=1)
+
+    @limited
+    def call():
+        release.wait(1)
+        return "ok"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(call())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while limited.stats.waiting < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(BulkheadFullError):
+        call()
+    release.set()
+    for thread in threads:  # noqa: WPS440 block variables overlap
+        thread.join()
+
+    stats = limited.stats
+    assert results == ["ok", "ok"]
+    assert (stats.active, stats.waiting, stats.accepted, stats.rejected) == (0, 0, 2, 1)
+    assert stats.wait_time_max > 0
+
+
+def test_bulkhead_max_wait():
+    """Test call waiting longer than max_wait is rejected."""
+    limited = Bulkhead(max_concurrent=1, max_waiting=1, max_wait=0.01)
+    limited.acquire()
+
+    with pytest.raises(FailFastError):
+        limited.acquire()
+
+    assert limited.stats.rejected == 1
+    assert limited.stats.wait_time_total >= 0.01
+
+
+async def test_aio_bulkhead():
+    """Test waiting calls get slots in FIFO order, calls over queue are rejected."""
+    limited = aio_bulkhead(max_concurrent=1, max_waiting=2)
+    order = []
+
+    @limited
+    async def call(name):
+        order.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    tasks = [asyncio.ensure_future(call(name)) for name in ("a", "b", "c")]
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await call("d")
+
+    assert await asyncio.gather(*tasks) == ["a", "b", "c"]
+    assert order == ["a", "b", "c"]
+    assert limited.stats[:4] == (0, 0, 3, 1)
+
+
+async def test_aio_bulkhead_cancel_and_max_wait():
+    """Test cancelled and timed out waiting calls leave queue without taking slot."""
+    limited = AioBulkhead(max_concurrent=1, max_waiting=2, max_wait=0.01)
+    await limited.acquire()
+
+    cancelled = asyncio.ensure_future(limited.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(BulkheadFullError):
+        await limited.acquire()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    limited.release()
+    assert limited.stats[:4] == (0, 0, 1, 1)
+    await limited.acquire()
+    assert limited.stats.active == 1
+
+
+def test_timeout():
+    """Test sync call is timed out, result of fast call is returned."""
+    release = threading.Event()
+
+    @timeout(0.01, max_workers=2)
+    def call(wait):
+        if wait:
+            release.wait(1)
+        return wait
+
+    with pytest.raises(FutureTimeoutError):
+        call(True)
+    release.set()
+    assert call(False) is False
+
+    call.shutdown()
+    with pytest.raises(RuntimeError):
+        call(False)
+
+
+def test_timeout_cancels_waiting_call():
+    """Test call waiting for thread is cancelled on timeout."""
+    release = threading.Event()
+    calls = []
+
+    @timeout(0.01, max_workers=1, max_waiting=1)
+    def call(index):
+        calls.append(index)
+        release.wait(1)
+
+    with pytest.raises(FutureTimeoutError):
+        call(0)
+    with pytest.raises(FutureTimeoutError):
+        call(1)
+    release.set()
+    call.shutdown()
+
+    # the second call waited for thread and was cancelled on timeout
+    assert calls == [0]
+
+
+def test_timeout_rejects_over_limit():
+    """Test call is rejected at once when all threads are busy."""
+    release = threading.Event()
+
+    @timeout(0.01, max_workers=1)
+    def call():
+        release.wait(1)
+
+    with pytest.raises(FutureTimeoutError):
+        call()
+    with pytest.raises(BulkheadFullError):
+        call()
+    release.set()
+    call.shutdown()
+
+
+def test_timeout_requires_workers():
+    """Test thread pool of timeout is bounded."""
+    with pytest.raises(ValueError):
+        timeout(1, max_workers=0)
+
+
+async def test_aio_timeout():
+    """Test async call is cancelled after timeout."""
+
+    @aio_timeout(0.01)
+    async def call(wait):
+        await asyncio.sleep(wait)
+        return wait
+
+    with pytest.raises(asyncio.TimeoutError):
+        await call(1)
+    assert await call(0) == 0
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from toolset.decorators import Cache, CacheStats, CacheStatus, aio_cached, cached
+
+
+@pytest.fixture()
+def clock(mocker):
+    """Mock of time.monotonic."""
+    return mocker.patch("toolset.decorators.caching.time.monotonic", return_value=0)
+
+
+def test_lru_and_ttl(clock):
+    """Test least recently used entry is evicted, expired entries are missed."""
+    cache = Cache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.lookup("a") == (CacheStatus.fresh, 1)
+    cache.set("c", 3)
+
+    assert cache.lookup("b") == (CacheStatus.miss, None)
+    clock.return_value = 10
+    assert cache.lookup("a") == (CacheStatus.miss, None)
+    assert cache.stats == CacheStats(hits=1, stale_hits=0, misses=2, evictions=1, size=1)
+
+
+def test_cached(clock, mocker):
+    """Test results are cached by args, errors aren't cached."""
+    func = mocker.Mock(side_effect=[1, ValueError, 2, 3])
+    decorated = cached(ttl=10)(lambda *args, **kwargs: func())
+
+    assert decorated(1, key="a") == 1
+    assert decorated(1, key="a") == 1
+    with pytest.raises(ValueError):
+        decorated(2)
+    assert decorated(2) == 2
+    decorated.invalidate(1, key="a")
+    assert decorated(1, key="a") == 3
+
+    assert decorated.cache.stats == CacheStats(
+        hits=1, stale_hits=0, misses=4, evictions=0, size=2,
+    )
+
+
+def test_cached_key_builder(mocker):
+    """Test custom key builder makes keys of unhashable args."""
+    func = mocker.Mock(return_value="user")
+    decorated = cached(key=lambda user: user["id"])(func)
+
+    decorated({"id": 1, "name": "Ivan"})
+    decorated({"id": 1, "name": "Ivan Ivanov"})
+
+    func.assert_called_once()
+
+
+def test_cached_single_flight():
+    """Test concurrent misses of key share one call."""
+    calls = []
+    release = threading.Event()
+
+    @cached()
+    def load(key):
+        calls.append(key)
+        release.wait(1)
+        return key
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(load("a"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:  # noqa: WPS440 block variables overlap
+        thread.join()
+
+    assert calls == ["a"]
+    assert results == ["a"] * 5
+
+
+def test_cached_stale_while_revalidate(clock):
+    """Test stale value is returned while it's reloaded in background."""
+    values = iter([1, 2])
+    reloaded = threading.Event()
+
+    @cached(ttl=10, stale_ttl=5)
+    def load():
+        value = next(values)
+        if value == 2:
+            reloaded.set()
+        return value
+
+    assert load() == 1
+    clock.return_value = 12
+    assert load() == 1
+    assert reloaded.wait(1)
+    for _ in range(100):  # noqa: WPS122 unused variable
+        if load.cache.lookup(())[1] == 2:
+            break
+        time.sleep(0.01)
+    assert load() == 2
+    clock.return_value = 100
+    assert load.cache.lookup(()) == (CacheStatus.miss, None)
+
+
+async def test_aio_cached_single_flight():
+    """Test concurrent misses await one task, caller cancellation doesn't cancel it."""
+    calls = []
+
+    @aio_cached(ttl=10)
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    cancelled = asyncio.ensure_future(load("a"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await asyncio.gather(load("a"), load("a"), load("b")) == ["a", "a", "b"]
+    assert calls == ["a", "b"]
+    assert await load("a") == "a"
+    assert load.cache.stats.hits == 1
+
+
+async def test_aio_cached_stale_while_revalidate(clock):
+    """Test stale value is returned and reloaded in background task, errors aren't cached."""
+    values = iter([1, ValueError("reload failed"), 2, 3])
+
+    @aio_cached(ttl=10, stale_ttl=5)
+    async def load():
+        value = next(values)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    async def _run_background_tasks():
+        for _ in range(2):  # noqa: WPS122 unused variable
+            await asyncio.sleep(0)
+
+    assert await load() == 1
+    clock.return_value = 12
+    assert await load() == 1
+    await _run_background_tasks()
+    assert await load() == 1
+    await _run_background_tasks()
+
+    assert await load() == 2
+    load.invalidate()
+    assert await load() == 3
@@ -0,0 +1,163 @@
+from contextlib import nullcontext
+
+import pytest
+
+from toolset.decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    aio_retry,
+    circuit_breaker,
+    retry,
+)
+
+
+@pytest.fixture(autouse=True)
+def circuit_breakers(mocker):
+    """Don't share circuit breakers between tests."""
+    mocker.patch.dict("toolset.decorators.circuit_breakers._circuit_breakers", clear=True)
+
+
+@pytest.fixture()
+def clock(mocker):
+    """Mock of time.monotonic."""
+    return mocker.patch("toolset.decorators.circuit_breakers.time.monotonic", return_value=0)
+
+
+def _fail():
+    raise ValueError
+
+
+def test_consecutive_failures(clock, mocker):
+    """Test circuit is opened after consecutive failures, probe call closes it."""
+    func = mocker.Mock(side_effect=[ValueError, ValueError, "ok", *[ValueError] * 3, "ok"])
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10)
+    decorated = breaker(func)
+
+    for _ in range(2):  # noqa: WPS122 unused variable
+        with pytest.raises(ValueError):
+            decorated()
+    assert decorated() == "ok"
+    for _ in range(3):  # noqa: WPS122 unused variable
+        with pytest.raises(ValueError):
+            decorated()
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        decorated()
+    assert exc_info.value.retry_after == 10
+    assert func.call_count == 6
+
+    clock.return_value = 10
+    assert breaker.state == CircuitState.half_open
+    assert decorated() == "ok"
+    assert breaker.metrics == (CircuitState.closed, 7, 5, 1, 1, 0, 0)
+
+
+def test_failure_rate(clock):
+    """Test circuit is opened when failure rate in window reaches threshold."""
+    breaker = CircuitBreaker(
+        "test", failure_threshold=None, failure_rate_threshold=0.5, window_size=4, min_calls=4,
+    )
+    succeed = breaker(lambda: None)
+    fail = breaker(_fail)
+
+    for func in (succeed, fail, succeed, succeed):
+        with pytest.raises(ValueError) if func is fail else nullcontext():
+            func()
+    assert breaker.state == CircuitState.closed
+
+    with pytest.raises(ValueError):
+        fail()
+    assert breaker.state == CircuitState.open
+    assert breaker.metrics.failure_rate == 0.5
+
+
+def test_half_open_probe_limit(clock):
+    """Test only half_open_max_calls probes are passed, failed probe opens circuit."""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=1)
+    with pytest.raises(ValueError):
+        breaker(_fail)()
+    clock.return_value = 1
+
+    probe = breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.on_failure(ValueError(), probe)
+
+    assert probe
+    assert breaker.state == CircuitState.open
+    assert breaker.metrics.opened == 2
+
+
+def test_call_started_closed_isnt_probe(clock):
+    """Test calls admitted while circuit was closed don't close or open half-open circuit."""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=1)
+    slow_calls = [breaker.before_call() for _ in range(3)]
+    breaker.on_failure(ValueError(), slow_calls[0])
+    clock.return_value = 1
+
+    probe = breaker.before_call()
+    breaker.on_success(slow_calls[1])
+    breaker.on_failure(ValueError(), slow_calls[2])
+
+    assert slow_calls == [False, False, False]
+    assert probe
+    assert breaker.state == CircuitState.half_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.on_success(probe)
+    assert breaker.state == CircuitState.closed
+
+
+def test_not_counted_exceptions(clock):
+    """Test exceptions not listed in `exceptions` aren't failures."""
+    breaker = CircuitBreaker("test", failure_threshold=1, exceptions=(KeyError,))
+
+    with pytest.raises(ValueError):
+        breaker(_fail)()
+
+    assert breaker.metrics.failures == 0
+    assert breaker.state == CircuitState.closed
+
+
+def test_shared_by_name_and_not_retried(clock, mocker):
+    """Test functions share breaker by name, open circuit isn't retried."""
+    sleep = mocker.patch("toolset.decorators.retrying.sleep")
+    func = mocker.Mock(side_effect=ValueError)
+
+    @retry(ValueError, CircuitOpenError, attempts=5, wait_time_seconds=0)
+    @circuit_breaker("dependency", failure_threshold=2)
+    def first():
+        func()
+
+    @circuit_breaker("dependency")
+    def second():
+        func()
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        first()
+
+    assert func.call_count == 2
+    assert sleep.call_count == 2
+    assert exc_info.value.retry_attempts == 3
+    with pytest.raises(CircuitOpenError):
+        second()
+    circuit_breaker("dependency").reset()
+    assert circuit_breaker("dependency").state == CircuitState.closed
+
+
+async def test_async_function(clock):
+    """Test async functions are decorated."""
+    breaker = circuit_breaker("aio", failure_threshold=1)
+
+    @aio_retry(ValueError, attempts=3, wait_time_seconds=0)
+    @breaker
+    async def dummy_func():
+        raise ValueError
+
+    with pytest.raises(CircuitOpenError):
+        await dummy_func()
+
+    assert breaker.metrics.calls == 1
+    assert breaker.metrics.rejected == 1
+
@@ -1,8 +1,9 @@
 import pytest
 from aiohttp import ClientConnectorError
 from aiohttp.client_reqrep import ConnectionKey
+from asynctest import CoroutineMock
 
-from toolset.decorators import aio_retry, retry
+from toolset.decorators import RetryBudget, aio_retry, retry
 from toolset.drf.exceptions_utils import BaseCustomError
 
 
@@ -99,3 +100,86 @@ async def test_aio_retry_with_client_connection_failed(mocker):
         await dummy_func()
 
     assert mock.call_count == attempts
+
+
+def test_retry_waits(mocker):
+    """Test breaks grow with backoff up to max_wait, no break after the last attempt."""
+    sleep = mocker.patch("toolset.decorators.retrying.sleep")
+    on_retry = mocker.Mock()
+
+    @retry(ValueError, attempts=4, wait_time_seconds=1, backoff=3, max_wait=5, on_retry=on_retry)
+    def dummy_func():
+        raise ValueError
+
+    with pytest.raises(ValueError) as exc_info:
+        dummy_func()
+
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 3, 5]
+    assert [call.args[0] for call in on_retry.call_args_list] == [1, 2, 3]
+    assert exc_info.value.retry_attempts == 4
+
+
+def test_retry_full_jitter(mocker):
+    """Test break is random from 0 to backoff break."""
+    sleep = mocker.patch("toolset.decorators.retrying.sleep")
+    uniform = mocker.patch("toolset.decorators.retrying.random.uniform", return_value=0.1)
+    func = mocker.Mock(side_effect=[ValueError, ValueError, "result"])
+
+    assert retry(ValueError, wait_time_seconds=1, jitter=True)(func)() == "result"
+
+    assert [call.args for call in uniform.call_args_list] == [(0, 1), (0, 2)]
+    assert [call.args[0] for call in sleep.call_args_list] == [0.1, 0.1]
+
+
+def test_retry_deadline(mocker):
+    """Test error is raised if the next break exceeds deadline."""
+    clock = mocker.patch("toolset.decorators.retrying.time.monotonic", return_value=0)
+    sleep = mocker.patch("toolset.decorators.retrying.sleep")
+    sleep.side_effect = lambda wait: setattr(clock, "return_value", clock.return_value + wait)
+    func = mocker.Mock(side_effect=ValueError)
+
+    with pytest.raises(ValueError) as exc_info:
+        retry(ValueError, attempts=10, wait_time_seconds=1, backoff=2, deadline=5)(func)()
+
+    # breaks 1 and 2 fit into deadline, 1 + 2 + 4 doesn't
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 2]
+    assert exc_info.value.retry_attempts == 3
+
+
+def test_retry_budget(mocker):
+    """Test retries are disabled when budget is over and enabled after refill."""
+    mocker.patch("toolset.decorators.retrying.sleep")
+    monotonic = mocker.patch("toolset.decorators.retrying.time.monotonic", return_value=0)
+    budget = RetryBudget(capacity=2, refill_rate=0.5)
+    func = mocker.Mock(side_effect=ValueError)
+    decorated = retry(ValueError, attempts=5, wait_time_seconds=0, budget=budget)(func)
+
+    with pytest.raises(ValueError):
+        decorated()
+    assert func.call_count == 3
+    assert budget.tokens == 0
+
+    with pytest.raises(ValueError):
+        decorated()
+    assert func.call_count == 4
+
+    monotonic.return_value = 2
+    assert budget.tokens == 1
+
+
+async def test_aio_retry_budget(mocker):
+    """Test aio_retry shares budget and reports attempts."""
+    sleep = mocker.patch("toolset.decorators.retrying.asyncio.sleep", CoroutineMock())
+    budget = RetryBudget(capacity=1, refill_rate=0)
+    on_retry = mocker.Mock()
+
+    @aio_retry(ValueError, attempts=3, wait_time_seconds=1, budget=budget, on_retry=on_retry)
+    async def dummy_func():
+        raise ValueError
+
+    with pytest.raises(ValueError) as exc_info:
+        await dummy_func()
+
+    assert exc_info.value.retry_attempts == 2
+    sleep.assert_awaited_once_with(1)
+    on_retry.assert_called_once()
@@ -1,7 +1,10 @@
 import json
+import typing as tp
 from unittest.mock import MagicMock
 
 import pytest
+from pika.frame import Method
+from pika.spec import Basic
 
 BLOCKING_DELIVERY_TAG = "tag"
 
@@ -66,3 +69,79 @@ def message_factory(connection_mock, channel_mock):
         channel_mock.start_consuming = MagicMock(side_effect=_on_message_callback)
 
     return factory
+
+
+@pytest.fixture()
+def messages_factory(connection_mock, channel_mock):
+    """Factory of several messages delivered with delivery tags 1, 2, ..."""
+    channel_mock.connection = connection_mock
+
+    def factory(messages):
+        def _on_message_callback():
+            for delivery_tag, (routing_key, message) in enumerate(messages, 1):
+                message_mock = MagicMock()
+                message_mock.routing_key = routing_key
+                message_mock.delivery_tag = delivery_tag
+                message_body = json.dumps(message).encode()
+                channel_mock.on_message_callback(
+                    channel_mock, message_mock, MagicMock(), message_body,
+                )
+
+        channel_mock.start_consuming = MagicMock(side_effect=_on_message_callback)
+
+    return factory
+
+
+class FakeImplChannel:
+    """Asynchronous channel confirming messages when connection processes events."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.published: tp.List[bytes] = []
+        # bodies of messages to nack
+        self.nack: tp.Set[bytes] = set()
+        self.confirms = True
+        self._ack_nack_callback: tp.Optional[tp.Callable[[Method], None]] = None
+        self._select_ok_callback: tp.Optional[tp.Callable[[tp.Any], None]] = None
+        # messages published on current channel, delivery tags start from 1 on every channel
+        self._channel_published: tp.List[bytes] = []
+        self._confirmed = 0
+
+    def confirm_delivery(self, ack_nack_callback, callback):
+        """Turn on confirm mode on a new channel."""
+        self._ack_nack_callback = ack_nack_callback
+        self._select_ok_callback = callback
+        self._channel_published = []
+        self._confirmed = 0
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        """Publish without waiting."""
+        self.published.append(body)
+        self._channel_published.append(body)
+
+    def process_data_events(self, time_limit):
+        """Nack messages one by one, ack the rest with single multiple ack."""
+        if self._select_ok_callback:
+            self._select_ok_callback(None)
+            self._select_ok_callback = None
+        if not self.confirms or self._confirmed == len(self._channel_published):
+            return
+        for delivery_tag, body in enumerate(self._channel_published, 1):
+            if delivery_tag > self._confirmed and body in self.nack:
+                self._ack_nack_callback(Method(1, Basic.Nack(delivery_tag=delivery_tag)))
+        self._confirmed = len(self._channel_published)
+        self._ack_nack_callback(
+            Method(1, Basic.Ack(delivery_tag=self._confirmed, multiple=True)),
+        )
+
+
+@pytest.fixture()
+def impl_channel(channel_mock, connection_mock, mocker):
+    """Underlying channel of channel mock."""
+    impl = FakeImplChannel()
+    channel_mock._impl = impl  # noqa: WPS437 mock of pika internals
+    channel_mock.is_open = True
+    channel_mock.connection = connection_mock
+    connection_mock.process_data_events = MagicMock(side_effect=impl.process_data_events)
+    mocker.patch.dict("toolset.event_bus.django.connection_pool._pools", clear=True)
+    return impl
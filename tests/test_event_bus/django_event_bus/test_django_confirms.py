@@ -0,0 +1,97 @@
+import pytest
+from pika.exceptions import NackError
+
+from tests.django.models import OutboxEvent
+from toolset.event_bus.django import BaseProducer
+from toolset.event_bus.django.base import DEFAULT_PROPERTIES
+from toolset.event_bus.django.confirms import publish_confirmed
+from toolset.event_bus.django.outbox import OutboxRelay
+from toolset.event_bus.django.producers import ConnectionMock
+
+
+class Producer(BaseProducer):
+    """Test producer."""
+
+    exchange = "some_exchange"
+
+
+def test_publish_confirmed(connection_mock, channel_mock, impl_channel):
+    """Test messages are published at once and nacked ones are returned."""
+    impl_channel.nack = {b"2"}
+    messages = [("some_exchange", "user_updated", str(index).encode()) for index in range(4)]
+
+    assert publish_confirmed(connection_mock, messages, DEFAULT_PROPERTIES) == [2]
+
+    assert impl_channel.published == [b"0", b"1", b"2", b"3"]
+    connection_mock.process_data_events.assert_called()
+    channel_mock.close.assert_called_once()
+
+
+def test_publish_confirmed_timeout(connection_mock, impl_channel):
+    """Test messages which are not confirmed in time are returned."""
+    impl_channel.confirms = False
+    messages = [("some_exchange", "user_updated", b"1"), ("some_exchange", "user_updated", b"2")]
+
+    assert publish_confirmed(connection_mock, messages, DEFAULT_PROPERTIES, timeout=0.01) == [
+        0,
+        1,
+    ]
+
+
+def test_publish_many_in_ctx(blocking_connection_mock, connection_mock, impl_channel):
+    """Test producer returns nacked events and keeps connection of context manager."""
+    impl_channel.nack = {b'{"id": 1}'}
+
+    with Producer() as producer:
+        nacked = producer.publish_many(
+            [("user_updated", {"id": 0}), ("user_updated", {"id": 1})],
+        )
+        connection_mock.close.assert_not_called()
+
+    assert nacked == [("user_updated", {"id": 1})]
+    assert producer.publish_many([]) == []
+    blocking_connection_mock.assert_called_once()
+
+
+def test_publish_many_persistent(blocking_connection_mock, impl_channel):
+    """Test persistent producer publishes through pooled connection."""
+    producer = Producer(persistent=True)
+
+    assert producer.publish_many([("user_updated", {"id": 1})]) == []
+    assert producer.publish_many([("user_updated", {"id": 2})]) == []
+
+    assert impl_channel.published == [b'{"id": 1}', b'{"id": 2}']
+    blocking_connection_mock.assert_called_once()
+
+
+def test_confirm_delivery_raises_nack(blocking_connection_mock, impl_channel, mocker):
+    """Test publish() in confirm mode raises NackError after retries."""
+    mocker.patch("toolset.decorators.retrying.sleep")
+    impl_channel.nack = {b'{"id": 1}'}
+
+    with pytest.raises(NackError):
+        Producer(confirm_delivery=True).publish("user_updated", {"id": 1})
+
+    assert len(impl_channel.published) == 5
+
+    Producer(confirm_delivery=True).publish("user_updated", {"id": 2})
+    assert impl_channel.published[-1] == b'{"id": 2}'
+
+
+def test_connection_mock_confirms(mocker):
+    """Test publish_many works with connection mock for tests."""
+    mocker.patch("toolset.event_bus.django.base.pika.BlockingConnection", ConnectionMock)
+
+    assert Producer().publish_many([("user_updated", {"id": 1})]) == []
+
+
+@pytest.mark.django_db()
+def test_relay_keeps_nacked_events(blocking_connection_mock, impl_channel):
+    """Test nacked events stay in outbox."""
+    for index in range(3):
+        OutboxEvent.objects.publish("some_exchange", "user_updated", str(index).encode())
+    impl_channel.nack = {b"1"}
+
+    assert OutboxRelay(OutboxEvent, confirm_delivery=True).relay_batch() == 2
+
+    assert OutboxEvent.objects.get().body == "1"
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from pika.exceptions import AMQPConnectionError, StreamLostError
+from structlog.testing import capture_logs
+
+from toolset.event_bus.django import BaseProducer
+from toolset.event_bus.django.base import pika_parameters
+from toolset.event_bus.django.connection_pool import ThreadLocalChannelPool
+
+
+class Producer(BaseProducer):
+    """Test producer."""
+
+    exchange = "some_exchange"
+
+
+@pytest.fixture()
+def pool():
+    """Channel pool."""
+    return ThreadLocalChannelPool(pika_parameters)
+
+
+def test_connection_reused_in_thread(blocking_connection_mock, pool):
+    """Test the same connection is used by the same thread."""
+    assert pool.get_channel() is pool.get_channel()
+    blocking_connection_mock.assert_called_once()
+
+
+def test_connection_per_thread(blocking_connection_mock, pool):
+    """Test every thread has its own connection."""
+    pool.get_channel()
+    thread = threading.Thread(target=pool.get_channel)
+    thread.start()
+    thread.join()
+
+    assert blocking_connection_mock.call_count == 2
+
+
+def test_reconnect_after_fork(mocker, blocking_connection_mock, connection_mock, pool):
+    """Test connection inherited from parent process is not used and not closed."""
+    pool.get_channel()
+    mocker.patch("toolset.event_bus.django.connection_pool.os.getpid", return_value=-1)
+    pool.get_channel()
+
+    assert blocking_connection_mock.call_count == 2
+    connection_mock.close.assert_not_called()
+
+
+def test_reconnect_stale_connection(blocking_connection_mock, connection_mock, pool):
+    """Test stale connection is closed and recreated, reconnect is logged."""
+    pool.get_channel()
+    connection_mock.process_data_events.side_effect = StreamLostError
+    with capture_logs() as logs:
+        pool.get_channel()
+
+    assert blocking_connection_mock.call_count == 2
+    connection_mock.close.assert_called_once()
+    assert logs[0]["log_level"] == "info"
+
+
+def test_connection_reused_after_heartbeat_timeout(
+    mocker, blocking_connection_mock, connection_mock, pool,
+):
+    """Test connection idle longer than heartbeat timeout is reused if it's alive."""
+    monotonic = mocker.patch("toolset.event_bus.django.connection_pool.time.monotonic")
+    monotonic.return_value = 0
+    pool.get_channel()
+    # RabbitMQ default heartbeat timeout is 60 seconds
+    monotonic.return_value = 10 * 60
+    pool.get_channel()
+
+    blocking_connection_mock.assert_called_once()
+    connection_mock.process_data_events.assert_called_once_with(time_limit=0)
+
+
+def test_reconnect_idle_connection(blocking_connection_mock, pool):
+    """Test connection idle for too long is recreated."""
+    pool.max_idle = 0.000001
+    pool.get_channel()
+    pool.get_channel()
+
+    assert blocking_connection_mock.call_count == 2
+
+
+def test_persistent_publish(mocker, blocking_connection_mock, channel_mock):
+    """Test producer publishes events through the same connection and retries on error."""
+    mocker.patch("toolset.decorators.retrying.sleep")
+    mocker.patch.dict("toolset.event_bus.django.connection_pool._pools", clear=True)
+    producer = Producer(persistent=True)
+
+    producer.publish("foo", {"id": 1})
+    channel_mock.basic_publish.side_effect = [AMQPConnectionError, None]
+    producer.publish("foo", {"id": 2})
+
+    assert channel_mock.basic_publish.call_count == 3
+    assert blocking_connection_mock.call_count == 2
@@ -1,10 +1,14 @@
+import threading
 from unittest.mock import MagicMock
 
 import pytest
 from structlog.testing import capture_logs
 
-from toolset.event_bus.django import BaseConsumer
-from toolset.event_bus.django.consumers.constants import CONSUMER_CONNECTION_PREFETCH_COUNT
+from toolset.event_bus.django import BaseConsumer, ShardedConsumer
+from toolset.event_bus.django.consumers.constants import (
+    CONSUMER_CONNECTION_PREFETCH_COUNT,
+    ConsumerBaseException,
+)
 from tests.test_event_bus.django_event_bus.conftest import BLOCKING_DELIVERY_TAG
 
 queue_name = "foo_queue"
@@ -188,3 +192,150 @@ def test_consumer_unexpect_error(
     channel_mock.basic_nack.assert_called_once_with(
         delivery_tag=BLOCKING_DELIVERY_TAG, requeue=requeue,
     )
+
+
+def test_sharded_consumer(blocking_connection_mock, channel_mock, message_factory):
+    """Test every assigned shard queue declared, bound and consumed."""
+    message_factory({"data": {"id": 1}}, f"{routing_key}.2")
+    callback_mock = MagicMock()
+
+    consumer = ShardedConsumer(queue_name, callback_mock, shards=3, instance=0, instances=2)
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    assert [call[0][0] for call in channel_mock.queue_declare.call_args_list] == [
+        f"{queue_name}.0",
+        f"{queue_name}.2",
+    ]
+    assert [call[0] for call in channel_mock.queue_bind.call_args_list] == [
+        (f"{queue_name}.0", exchange_name),
+        (f"{queue_name}.2", exchange_name),
+    ]
+    assert [call[1]["queue"] for call in channel_mock.basic_consume.call_args_list] == [
+        f"{queue_name}.0",
+        f"{queue_name}.2",
+    ]
+    callback_mock.assert_called_once_with(f"{routing_key}.2", {"data": {"id": 1}})
+
+
+
+def test_sharded_consumer_rejects_workers():
+    """Test sharded consumer can't run callbacks in workers as it breaks order of shard."""
+    with pytest.raises(ValueError):
+        ShardedConsumer(queue_name, MagicMock(), shards=3, workers=2)
+
+
+@pytest.fixture()
+def threadsafe_callbacks(connection_mock, channel_mock):
+    """Callbacks passed to connection thread, they are run on processing data events."""
+    callbacks = []
+    channel_mock.connection = connection_mock
+    connection_mock.add_callback_threadsafe = MagicMock(side_effect=callbacks.append)
+
+    def _process_data_events(time_limit):
+        while callbacks:
+            callbacks.pop(0)()
+
+    connection_mock.process_data_events = MagicMock(side_effect=_process_data_events)
+    return callbacks
+
+
+def test_consumer_workers(
+    blocking_connection_mock, channel_mock, message_factory, threadsafe_callbacks,
+):
+    """Test callback is run in worker and message acked from connection thread."""
+    message_factory({"data": {"id": 1}}, routing_key)
+    callback_threads = []
+    ack_threads = []
+    channel_mock.basic_ack.side_effect = lambda **_: ack_threads.append(threading.get_ident())
+
+    consumer = BaseConsumer(
+        queue_name, lambda *_: callback_threads.append(threading.get_ident()), workers=2,
+    )
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    assert callback_threads and callback_threads[0] != threading.get_ident()
+    assert ack_threads == [threading.get_ident()]
+    channel_mock.basic_ack.assert_called_once_with(delivery_tag=BLOCKING_DELIVERY_TAG)
+
+
+def test_consumer_workers_error(
+    mocker, blocking_connection_mock, channel_mock, message_factory, threadsafe_callbacks,
+):
+    """Test failed message nacked from connection thread, worker db connections are closed."""
+    close_old_connections = mocker.patch(
+        "toolset.event_bus.django.consumers.base.close_old_connections",
+    )
+    message_factory({"data": {"id": 1}}, routing_key)
+
+    consumer = BaseConsumer(
+        queue_name, MagicMock(side_effect=KeyError), requeue_msg=False, workers=2,
+    )
+    with pytest.raises(KeyError):
+        consumer.start_consuming(exchange_name, [routing_key])
+
+    channel_mock.basic_nack.assert_called_once_with(
+        delivery_tag=BLOCKING_DELIVERY_TAG, requeue=False,
+    )
+    assert close_old_connections.call_count == 2
+
+
+def test_stop_consuming(blocking_connection_mock, connection_mock, channel_mock):
+    """Test consumer is stopped from connection thread."""
+    channel_mock.connection = connection_mock
+    consumer = BaseConsumer(queue_name, MagicMock())
+    channel_mock.start_consuming = MagicMock(side_effect=consumer.stop_consuming)
+
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    connection_mock.add_callback_threadsafe.assert_called_once_with(channel_mock.stop_consuming)
+    with pytest.raises(ConsumerBaseException):
+        consumer.stop_consuming()
+
+
+def test_batch_consumer(blocking_connection_mock, connection_mock, channel_mock, messages_factory):
+    """Test messages are processed in batches and acked with multiple flag."""
+    messages_factory([(routing_key, {"id": index}) for index in range(3)])
+    batch_callback = MagicMock()
+
+    consumer = BaseConsumer(queue_name, None, batch_callback=batch_callback, batch_size=2)
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    assert [call.args for call in batch_callback.call_args_list] == [
+        ([(routing_key, {"id": 0}), (routing_key, {"id": 1})],),
+        ([(routing_key, {"id": 2})],),
+    ]
+    assert [call.kwargs for call in channel_mock.basic_ack.call_args_list] == [
+        {"delivery_tag": 2, "multiple": True},
+        {"delivery_tag": 3, "multiple": True},
+    ]
+    assert connection_mock.remove_timeout.call_count == 2
+
+
+def test_batch_consumer_timeout(
+    blocking_connection_mock, connection_mock, channel_mock, messages_factory,
+):
+    """Test incomplete batch is processed on timeout."""
+    messages_factory([(routing_key, {"id": 1})])
+    batch_callback = MagicMock()
+    consumer = BaseConsumer(
+        queue_name, None, batch_callback=batch_callback, batch_size=10, batch_timeout=0.5,
+    )
+
+    def _start_consuming(side_effect=channel_mock.start_consuming.side_effect):
+        side_effect()
+        delay, on_timeout = connection_mock.call_later.call_args.args
+        assert delay == 0.5
+        on_timeout()
+        batch_callback.assert_called_once_with([(routing_key, {"id": 1})])
+
+    channel_mock.start_consuming.side_effect = _start_consuming
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    batch_callback.assert_called_once()
+    connection_mock.remove_timeout.assert_not_called()
+
+
+def test_batch_consumer_without_callback():
+    """Test either callback or batch callback required."""
+    with pytest.raises(ConsumerBaseException):
+        BaseConsumer(queue_name, None)
@@ -0,0 +1,93 @@
+import datetime as dt
+import json
+import time
+import uuid
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.utils.encoders import JSONEncoder
+
+from toolset.event_bus.django import BaseProducer, FastJSONEncoder
+
+BENCHMARK_ROUNDS = 2000
+
+body = {
+    "id": 1,
+    "big_id": 2 ** 70,
+    "name": "Иван",
+    "title": gettext_lazy("title"),
+    "active": True,
+    "manager": None,
+    "rate": 0.5,
+    "salary": Decimal("10.25"),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "created_at": dt.datetime(2021, 5, 1, 10, 20, 30, 123456, tzinfo=dt.timezone.utc),
+    "updated_at": dt.datetime(2021, 5, 1, 10, 20, tzinfo=dt.timezone(dt.timedelta(hours=3))),
+    "seen_at": dt.datetime(2021, 5, 1, 10, 20),
+    "birthday": dt.date(1990, 1, 2),
+    "starts_at": dt.time(9, 30),
+    "tags": ("a", "b"),
+    "grades": {1: "junior", 2: "middle"},
+}
+
+
+def _drf_dumps(obj) -> bytes:
+    """Encode as BaseProducer with DRF encoder does."""
+    return json.dumps(obj, ensure_ascii=False, cls=JSONEncoder).encode("utf-8")
+
+
+@pytest.mark.parametrize("orjson_installed", [True, False])
+def test_same_output_as_drf(mocker, orjson_installed):
+    """Test output is the same as DRF encoder gives with and without orjson."""
+    if not orjson_installed:
+        mocker.patch("toolset.event_bus.django.encoders.orjson", None)
+    small_ints_body = {**body, "big_id": 1}
+
+    assert FastJSONEncoder.dumps(body) == _drf_dumps(body)
+    assert FastJSONEncoder.dumps(small_ints_body) == _drf_dumps(small_ints_body)
+    tricky_strings = ["a,b", 'x": "y', "\\", '\\"', {"k,:": ["", {}]}, "end,"]
+    assert FastJSONEncoder.dumps(tricky_strings) == _drf_dumps(tricky_strings)
+    assert FastJSONEncoder.dumps("a, b: c") == _drf_dumps("a, b: c")
+
+
+def test_unknown_type():
+    """Test unknown types aren't encoded."""
+    with pytest.raises(TypeError):
+        FastJSONEncoder.dumps({"producer": object()})
+
+
+@pytest.mark.parametrize("orjson_installed", [True, False])
+def test_producer_uses_fast_encoder(mocker, orjson_installed):
+    """Test producer encodes bodies with FastJSONEncoder.dumps as with DRF encoder."""
+    if not orjson_installed:
+        mocker.patch("toolset.event_bus.django.encoders.orjson", None)
+    channel = MagicMock()
+
+    class Producer(BaseProducer):  # noqa: WPS431 test class
+        exchange = "some_exchange"
+        json_encoder = FastJSONEncoder
+
+    connection = MagicMock()
+    connection.channel.return_value = channel
+    mocker.patch.object(Producer, "_get_rabbit_connection", return_value=connection)
+    Producer().publish("user_updated", {"id": 1, "name": "Иван"})
+
+    assert channel.basic_publish.call_args.args[2] == '{"id": 1, "name": "Иван"}'.encode("utf-8")
+
+
+@pytest.mark.slow
+def test_benchmark_encoders():
+    """Compare DRF and fast encoders, run with -s to see results."""
+    small_ints_body = {**body, "big_id": 1}
+    started_at = time.monotonic()
+    for _ in range(BENCHMARK_ROUNDS):
+        _drf_dumps(small_ints_body)
+    drf_time = time.monotonic() - started_at
+    started_at = time.monotonic()
+    for _ in range(BENCHMARK_ROUNDS):
+        FastJSONEncoder.dumps(small_ints_body)
+    fast_time = time.monotonic() - started_at
+
+    print(f"DRF: {drf_time:.3f}s, fast: {fast_time:.3f}s")  # noqa: WPS421 print results
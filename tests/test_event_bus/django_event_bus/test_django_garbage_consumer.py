@@ -1,8 +1,12 @@
 import json
-from unittest.mock import MagicMock
+import time
+from unittest.mock import ANY, MagicMock
+
+import pytest
 
 from toolset.event_bus.constants import GARBAGE_QUEUE_SUFFIX, POST_RETRY_EXCHANGE_SUFFIX
 from toolset.event_bus.django import GarbageConsumer
+from toolset.event_bus.django.consumers.garbage_consumer import ROUTING_KEY_HEADER
 from tests.test_event_bus.django_event_bus.conftest import BLOCKING_DELIVERY_TAG
 
 EXCHANGE_NAME = "test"
@@ -100,4 +104,37 @@ def test_consumer_process_and_move_to_garbage(
         exchange=post_retry_exchange_name,
         routing_key=garbage_queue_name,
         body=json.dumps(garbage_message).encode(),
+        properties=ANY,
+    )
+    properties = channel_mock.basic_publish.call_args.kwargs["properties"]
+    assert properties.headers == {ROUTING_KEY_HEADER: routing_keys[0]}
+    assert properties.timestamp == pytest.approx(time.time(), abs=5)
+
+
+def test_batch_bisected_to_garbage_queue(
+    blocking_connection_mock, channel_mock, messages_factory,
+):
+    """Test only failed message of failed batch is moved to garbage queue."""
+    routing_key = "foo"
+    messages_factory([(routing_key, {"id": index}) for index in range(4)])
+    processed = []
+
+    def batch_callback(messages):
+        if (routing_key, {"id": 2}) in messages:
+            raise ValueError("bad message")
+        processed.extend(message for _, message in messages)
+
+    consumer = GarbageConsumerForTest(
+        "test_queue", None, store_failed=True, batch_callback=batch_callback, batch_size=4,
     )
+    consumer.start_consuming("test_exchange", [routing_key])
+
+    assert processed == [{"id": 0}, {"id": 1}, {"id": 3}]
+    channel_mock.basic_publish.assert_called_once()
+    moved = json.loads(channel_mock.basic_publish.call_args.kwargs["body"])
+    assert moved == {"id": 2, "error": "ValueError('bad message')"}
+    assert [call.kwargs for call in channel_mock.basic_ack.call_args_list] == [
+        {"delivery_tag": 2, "multiple": True},
+        {"delivery_tag": 3},
+        {"delivery_tag": 4, "multiple": True},
+    ]
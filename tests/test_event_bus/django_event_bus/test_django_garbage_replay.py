@@ -0,0 +1,138 @@
+import json
+import time
+from io import StringIO
+from unittest.mock import MagicMock
+
+import pika
+import pytest
+from django.core.management import call_command
+
+from toolset.event_bus.django.consumers.garbage_consumer import ROUTING_KEY_HEADER
+from toolset.event_bus.django.garbage_replay import GarbageFilter, GarbageReplay
+
+queue_name = "test_queue"
+garbage_queue_name = "test_queue.garbage"
+post_retry_exchange_name = "test.retry.post"
+
+
+@pytest.fixture()
+def garbage_queue(channel_mock, impl_channel):
+    """Fill garbage queue got by basic_get with messages given by test."""
+    queue = []
+
+    def _basic_get(queue_name):
+        assert queue_name == garbage_queue_name
+        if not queue:
+            return None, None, None
+        routing_key, age, payload = queue.pop(0)
+        properties = pika.BasicProperties(
+            headers={ROUTING_KEY_HEADER: routing_key},
+            timestamp=int(time.time() - age) if age is not None else None,
+        )
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        _basic_get.delivery_tag += 1
+        return MagicMock(delivery_tag=_basic_get.delivery_tag), properties, body
+
+    _basic_get.delivery_tag = 0
+    channel_mock.basic_get = MagicMock(side_effect=_basic_get)
+    return queue
+
+
+@pytest.fixture()
+def garbage(garbage_queue):
+    """Messages of different errors, routing keys and age."""
+    garbage_queue.extend(
+        [
+            ("user.updated", 10, {"id": 1, "error": "KeyError('id')"}),
+            ("user.created", 100, {"id": 2, "error": "ValueError('bad')"}),
+            ("user.updated", 1000, {"id": 3, "error": "KeyError('name')"}),
+            ("user.updated", None, {"id": 4}),
+            ("user.updated", 10, b"not json"),
+        ],
+    )
+
+
+def _republished(impl_channel):
+    return [json.loads(body)["id"] for body in impl_channel.published]
+
+
+def test_replay_all(blocking_connection_mock, channel_mock, impl_channel, garbage):
+    """Test every message is republished to queue without error and acked."""
+    stats = GarbageReplay(queue_name, "test").replay(batch_size=2)
+
+    assert _republished(impl_channel) == [1, 2, 3, 4]
+    assert json.loads(impl_channel.published[0]) == {"id": 1}
+    assert (stats.read, stats.matched, stats.republished, stats.failed) == (5, 4, 4, 0)
+    assert [call.kwargs for call in channel_mock.basic_ack.call_args_list] == [
+        {"delivery_tag": 1},
+        {"delivery_tag": 2},
+        {"delivery_tag": 3},
+        {"delivery_tag": 4},
+    ]
+
+
+@pytest.mark.parametrize(
+    ("garbage_filter", "expected"),
+    [
+        (GarbageFilter(error="KeyError"), [1, 3]),
+        (GarbageFilter(routing_key="user.up*"), [1, 3, 4]),
+        (GarbageFilter(min_age=50), [2, 3]),
+        (GarbageFilter(max_age=500), [1, 2]),
+        (GarbageFilter(error="KeyError", max_age=500), [1]),
+    ],
+)
+def test_replay_filtered(blocking_connection_mock, impl_channel, garbage, garbage_filter, expected):
+    """Test only matching messages are republished."""
+    GarbageReplay(queue_name, "test").replay(garbage_filter)
+
+    assert _republished(impl_channel) == expected
+
+
+def test_replay_nacked_stay(blocking_connection_mock, channel_mock, impl_channel, garbage_queue):
+    """Test nacked messages are not acked, limit is respected."""
+    garbage_queue.extend([("user.updated", 0, {"id": index}) for index in range(5)])
+    impl_channel.nack = {b'{"id": 1}'}
+
+    stats = GarbageReplay(queue_name, "test").replay(limit=3, batch_size=2)
+
+    assert (stats.matched, stats.republished, stats.failed) == (3, 2, 1)
+    assert [call.kwargs for call in channel_mock.basic_ack.call_args_list] == [
+        {"delivery_tag": 1},
+        {"delivery_tag": 3},
+    ]
+
+
+def test_replay_rate(blocking_connection_mock, connection_mock, impl_channel, garbage_queue):
+    """Test replay sleeps to keep rate."""
+    garbage_queue.extend([("user.updated", 0, {"id": index}) for index in range(4)])
+
+    GarbageReplay(queue_name, "test").replay(batch_size=2, rate=1)
+
+    assert connection_mock.sleep.call_count == 2
+    assert connection_mock.sleep.call_args.args[0] == pytest.approx(4, abs=0.5)
+
+
+def test_replay_garbage_command(blocking_connection_mock, impl_channel, garbage):
+    """Test dry run summarizes garbage by error class and doesn't republish."""
+    stdout = StringIO()
+    call_command("replay_garbage", queue_name, "test", "--dry-run", stdout=stdout)
+
+    assert not impl_channel.published
+    assert stdout.getvalue().splitlines() == [
+        "KeyError: 2",
+        "ValueError: 1",
+        "<unknown>: 1",
+        "<invalid message>: 1",
+        "Read 5 messages, 4 match filter",
+    ]
+
+
+def test_replay_garbage_command_publishes(blocking_connection_mock, impl_channel, garbage):
+    """Test command republishes filtered messages."""
+    stdout = StringIO()
+    call_command(
+        "replay_garbage", queue_name, "test", "--error=ValueError", "--rate=1000", stdout=stdout,
+    )
+
+    assert _republished(impl_channel) == [2]
+    assert stdout.getvalue().splitlines()[-1] == "Republished 1, failed 0"
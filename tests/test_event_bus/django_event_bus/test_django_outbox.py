@@ -0,0 +1,144 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from pika.exceptions import StreamLostError
+
+from tests.django.models import OutboxEvent
+from toolset.event_bus.django import BaseProducer
+from toolset.event_bus.django.base import DEFAULT_PROPERTIES
+from toolset.event_bus.django.outbox import OutboxRelay
+
+pytestmark = pytest.mark.django_db
+
+
+class Producer(BaseProducer):
+    """Test outbox producer."""
+
+    exchange = "some_exchange"
+    outbox_model = OutboxEvent
+
+
+@pytest.fixture(autouse=True)
+def channel_pools(mocker):
+    """Don't share pooled connections between tests."""
+    mocker.patch.dict("toolset.event_bus.django.connection_pool._pools", clear=True)
+
+
+def test_publish_writes_to_outbox(blocking_connection_mock):
+    """Test producer with outbox doesn't connect to rabbit."""
+    Producer().publish("user_updated", {"name": "Иван"})
+
+    event = OutboxEvent.objects.get()
+    assert (event.exchange, event.routing_key) == ("some_exchange", "user_updated")
+    assert event.body == '{"name": "Иван"}'
+    blocking_connection_mock.assert_not_called()
+
+
+def test_outbox_rolled_back_with_transaction():
+    """Test event is not written if transaction is rolled back."""
+    with pytest.raises(ValueError), transaction.atomic():
+        Producer().publish("user_updated", {"id": 1})
+        raise ValueError
+
+    assert not OutboxEvent.objects.exists()
+
+
+def test_relay_batch(blocking_connection_mock, impl_channel):
+    """Test relay publishes events in order with confirms and deletes them."""
+    for index in range(3):
+        Producer().publish("user_updated", {"id": index})
+
+    assert OutboxRelay(OutboxEvent, batch_size=2).relay_batch() == 2
+
+    assert impl_channel.published == [b'{"id": 0}', b'{"id": 1}']
+    assert OutboxEvent.objects.count() == 1
+
+
+def test_relay_batch_without_confirms(blocking_connection_mock, channel_mock):
+    """Test relay publishes events in order and deletes them without confirms."""
+    for index in range(3):
+        Producer().publish("user_updated", {"id": index})
+
+    assert OutboxRelay(OutboxEvent, batch_size=2, confirm_delivery=False).relay_batch() == 2
+
+    assert [call.args for call in channel_mock.basic_publish.call_args_list] == [
+        ("some_exchange", "user_updated", b'{"id": 0}', DEFAULT_PROPERTIES),
+        ("some_exchange", "user_updated", b'{"id": 1}', DEFAULT_PROPERTIES),
+    ]
+    assert OutboxEvent.objects.count() == 1
+
+
+def test_relay_marks_sent(blocking_connection_mock, channel_mock):
+    """Test relay can keep published rows."""
+    Producer().publish("user_updated", {"id": 1})
+
+    relay = OutboxRelay(OutboxEvent, delete_sent=False, confirm_delivery=False)
+    assert relay.relay_batch() == 1
+    assert relay.relay_batch() == 0
+
+    assert OutboxEvent.objects.get().sent_at is not None
+    channel_mock.basic_publish.assert_called_once()
+
+
+def test_relay_failure_keeps_events(blocking_connection_mock, channel_mock):
+    """Test events are kept if publishing failed."""
+    Producer().publish("user_updated", {"id": 1})
+    channel_mock.basic_publish.side_effect = StreamLostError
+
+    with pytest.raises(StreamLostError):
+        OutboxRelay(OutboxEvent, confirm_delivery=False).relay_batch()
+
+    assert OutboxEvent.objects.count() == 1
+
+
+def test_relay_outbox_command(blocking_connection_mock, channel_mock):
+    """Test command relays all pending events."""
+    for index in range(5):
+        Producer().publish("user_updated", {"id": index})
+
+    call_command("relay_outbox", "django.OutboxEvent", "--batch-size=2", "--once", "--no-confirm")
+
+    assert channel_mock.basic_publish.call_count == 5
+    assert not OutboxEvent.objects.exists()
+
+
+def test_relay_outbox_command_confirms(blocking_connection_mock, impl_channel):
+    """Test command waits for confirms by default, nacked events stay in outbox."""
+    for index in range(3):
+        Producer().publish("user_updated", {"id": index})
+    impl_channel.nack = {b'{"id": 1}'}
+
+    call_command("relay_outbox", "django.OutboxEvent", "--batch-size=3", "--once")
+
+    assert OutboxEvent.objects.get().body == '{"id": 1}'
+
+
+def test_relay_run_until_stopped(blocking_connection_mock, channel_mock):
+    """Test relay publishes pending events and waits for new ones until stopped."""
+    Producer().publish("user_updated", {"id": 1})
+    relay = OutboxRelay(OutboxEvent, confirm_delivery=False)
+    channel_mock.basic_publish.side_effect = lambda *_: relay.stop()
+
+    relay.run(interval=0)
+
+    channel_mock.basic_publish.assert_called_once()
+    assert not OutboxEvent.objects.exists()
+
+
+def test_relay_run_survives_errors(blocking_connection_mock, channel_mock, mocker):
+    """Test relay logs error of batch, recycles db connections and keeps running."""
+    close_old_connections = mocker.patch("toolset.event_bus.django.outbox.close_old_connections")
+    Producer().publish("user_updated", {"id": 1})
+    relay = OutboxRelay(OutboxEvent, confirm_delivery=False)
+
+    def _basic_publish(*args):
+        channel_mock.basic_publish.side_effect = lambda *_: relay.stop()
+        raise StreamLostError
+
+    channel_mock.basic_publish.side_effect = _basic_publish
+
+    relay.run(interval=0)
+
+    assert channel_mock.basic_publish.call_count == 2
+    assert close_old_connections.call_count == 2
+    assert not OutboxEvent.objects.exists()
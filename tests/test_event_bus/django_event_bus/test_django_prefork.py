@@ -0,0 +1,107 @@
+import os
+import signal
+import time
+
+import pytest
+from django.core.management import call_command
+
+from toolset.event_bus.django.consumers.constants import ConsumerBaseException
+from toolset.event_bus.django.prefork import STOP_SIGNALS, PreforkRunner
+
+LOG_PATH_ENV = "TEST_PREFORK_LOG"
+
+
+class FakeConsumer:
+    """Consumer writing its lifecycle to log, the first `deaths` starts fail."""
+
+    def __init__(self, log_path: str, deaths: int, workers: int) -> None:
+        """Init."""
+        self.log_path = log_path
+        self.deaths = deaths
+        self.workers = workers
+        self.started = False
+        self.stopped = False
+        self.parent_pid = os.getppid()
+
+    def start_consuming(self) -> None:
+        """Consume until stopped, stop master when all workers are started."""
+        starts = self._log("started")
+        if starts <= self.deaths:
+            return
+        self.started = True
+        if starts >= self.deaths + self.workers:
+            os.kill(self.parent_pid, signal.SIGTERM)
+        while not self.stopped:
+            time.sleep(0.01)
+        self._log("stopped")
+
+    def stop_consuming(self) -> None:
+        """Stop consuming."""
+        if not self.started:
+            raise ConsumerBaseException("Consumer is not started")
+        self.stopped = True
+
+    def _log(self, event: str) -> int:
+        with open(self.log_path, "a") as log:
+            log.write(f"{event}\n")
+        with open(self.log_path) as log:
+            return log.read().count("started")
+
+
+def make_consumer() -> FakeConsumer:
+    """Consumer factory for command test."""
+    return FakeConsumer(os.environ[LOG_PATH_ENV], deaths=0, workers=2)
+
+
+def test_dead_workers_restarted(tmp_path):
+    """Test dead worker is restarted, running worker is drained on stop."""
+    log_path = tmp_path / "log"
+
+    PreforkRunner(
+        lambda: FakeConsumer(str(log_path), deaths=2, workers=1), processes=1, restart_delay=0,
+    ).run()
+
+    assert log_path.read_text().split() == ["started", "started", "started", "stopped"]
+
+
+def test_run_consumers_command(monkeypatch, tmp_path):
+    """Test every worker is stopped gracefully."""
+    log_path = tmp_path / "log"
+    monkeypatch.setenv(LOG_PATH_ENV, str(log_path))
+
+    call_command(
+        "run_consumers",
+        "tests.test_event_bus.django_event_bus.test_django_prefork.make_consumer",
+        "--processes=2",
+    )
+
+    assert sorted(log_path.read_text().split()) == ["started", "started", "stopped", "stopped"]
+
+
+@pytest.fixture()
+def stop_signal_handlers():
+    """Restore signal handlers changed by worker code run in test process."""
+    handlers = {signum: signal.getsignal(signum) for signum in STOP_SIGNALS}
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def test_worker_stops_consumer_on_signal(tmp_path, stop_signal_handlers):
+    """Test worker stops consuming on SIGTERM."""
+    log_path = tmp_path / "log"
+    consumer = FakeConsumer(str(log_path), deaths=0, workers=1)
+    consumer.parent_pid = os.getpid()
+
+    PreforkRunner(lambda: consumer, processes=1)._run_worker()  # noqa: WPS437 protected
+
+    assert consumer.stopped
+
+
+def test_worker_exits_before_start(stop_signal_handlers):
+    """Test worker just exits on SIGTERM if consumer isn't started."""
+    consumer = FakeConsumer("", deaths=0, workers=1)
+    consumer.start_consuming = lambda: os.kill(os.getpid(), signal.SIGTERM)
+
+    with pytest.raises(SystemExit):
+        PreforkRunner(lambda: consumer, processes=1)._run_worker()  # noqa: WPS437 protected
@@ -0,0 +1,448 @@
+import json
+import os
+import threading
+import time
+import typing as tp
+from collections import deque
+from functools import partial
+from unittest.mock import MagicMock
+
+import pika
+import pytest
+from pika.frame import Method
+from pika.spec import Basic
+
+from toolset.event_bus.django import (
+    BaseConsumer,
+    BaseProducer,
+    OverflowPolicy,
+    PendingQueueFullError,
+    SelectConsumer,
+    SelectProducer,
+)
+from toolset.event_bus.django.consumers.constants import ConsumerBaseException
+
+queue_name = "foo_queue"
+exchange_name = "foo_exchange"
+routing_key = "bar.updated"
+
+BENCHMARK_URL_ENV = "RABBITMQ_BENCHMARK_URL"
+BENCHMARK_MESSAGES = 20000
+
+
+class FakeIOLoop:
+    """IOLoop running callbacks, timers are run when there are no callbacks."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.callbacks: tp.Deque[tp.Callable[[], None]] = deque()
+        self.timers: tp.List[tp.Tuple[float, tp.Callable[[], None]]] = []
+        self.stopped = False
+
+    def add_callback_threadsafe(self, callback):
+        """Add callback."""
+        self.callbacks.append(callback)
+
+    def call_later(self, delay, callback):
+        """Add timer."""
+        timer = (delay, callback)
+        self.timers.append(timer)
+        return timer
+
+    def remove_timeout(self, timer):
+        """Remove timer."""
+        self.timers.remove(timer)
+
+    def start(self):
+        """Run callbacks until stopped."""
+        self.stopped = False
+        while not self.stopped:
+            if self.callbacks:
+                self.callbacks.popleft()()
+            elif self.timers:
+                self.timers.pop(0)[1]()
+            else:
+                time.sleep(0.001)
+
+    def stop(self):
+        """Stop."""
+        self.stopped = True
+
+    def close(self):
+        """Close."""
+
+
+class FakeSelectConnection:
+    """SelectConnection opening channel given by test."""
+
+    channel_factory: tp.Callable[["FakeSelectConnection"], MagicMock]
+    # connection attempts which fail
+    failures = 0
+
+    def __init__(
+        self,
+        params,
+        on_open_callback,
+        on_open_error_callback,
+        on_close_callback,
+        custom_ioloop=None,
+    ):
+        """Schedule connection opening."""
+        self.ioloop = custom_ioloop or FakeIOLoop()
+        self.is_open = False
+        self.is_closed = False
+        self._on_close_callback = on_close_callback
+
+        if FakeSelectConnection.failures:
+            FakeSelectConnection.failures -= 1
+            self.is_closed = True
+            self.ioloop.add_callback_threadsafe(
+                lambda: on_open_error_callback(self, pika.exceptions.AMQPConnectionError()),
+            )
+            return
+
+        def _open():
+            self.is_open = True
+            on_open_callback(self)
+
+        self.ioloop.add_callback_threadsafe(_open)
+
+    def channel(self, on_open_callback):
+        """Open channel."""
+        channel = self.channel_factory(self)
+        self.ioloop.add_callback_threadsafe(lambda: on_open_callback(channel))
+
+    def close(self):
+        """Close connection."""
+        self.is_open = False
+        self.is_closed = True
+        self.ioloop.add_callback_threadsafe(lambda: self._on_close_callback(self, None))
+
+
+@pytest.fixture()
+def select_channel(mocker):
+    """Channel of fake SelectConnection, messages given by test are delivered to consumer."""
+    channel = MagicMock()
+    channel.is_open = True
+    channel.consumer_tags = []
+    channel.messages = []
+    channel.consumer = None
+
+    def _channel_factory(connection):
+        channel.connection = connection
+        def _deliver(delivery_tag, message):
+            method = MagicMock(routing_key=routing_key, delivery_tag=delivery_tag)
+            channel.on_message_callback(channel, method, MagicMock(), json.dumps(message).encode())
+
+        def _basic_consume(queue, on_message_callback):
+            channel.consumer_tags.append(queue)
+            channel.on_message_callback = on_message_callback
+            for delivery_tag, message in enumerate(channel.messages, 1):
+                connection.ioloop.add_callback_threadsafe(
+                    lambda tag=delivery_tag, body=message: _deliver(tag, body),
+                )
+            if channel.consumer:
+                connection.ioloop.add_callback_threadsafe(channel.consumer.stop_consuming)
+
+        def _basic_cancel(consumer_tag, callback=None):
+            channel.consumer_tags.remove(consumer_tag)
+            if callback:
+                connection.ioloop.add_callback_threadsafe(lambda: callback(None))
+
+        def _add_on_close_callback(callback):
+            channel.on_close_callback = callback
+
+        channel.add_on_close_callback = MagicMock(side_effect=_add_on_close_callback)
+        channel.basic_consume = MagicMock(side_effect=_basic_consume)
+        channel.basic_cancel = MagicMock(side_effect=_basic_cancel)
+        return channel
+
+    mocker.patch.object(
+        FakeSelectConnection, "channel_factory", staticmethod(_channel_factory), create=True,
+    )
+    mocker.patch.object(FakeSelectConnection, "failures", 0)
+    mocker.patch(
+        "toolset.event_bus.django.select_transport.pika.SelectConnection", FakeSelectConnection,
+    )
+    mocker.patch("toolset.event_bus.django.select_transport.IOLoop", FakeIOLoop)
+    return channel
+
+
+def test_select_consumer(select_channel):
+    """Test messages are consumed until consumer is stopped."""
+    select_channel.messages = [{"id": 1}, {"id": 2}]
+    callback = MagicMock()
+    consumer = SelectConsumer(queue_name, callback)
+    select_channel.consumer = consumer
+
+    consumer.start_consuming(exchange_name, [routing_key])
+
+    select_channel.basic_qos.assert_called_once_with(prefetch_count=10)
+    select_channel.queue_declare.assert_called_once_with(queue_name, durable=True)
+    select_channel.queue_bind.assert_called_once_with(
+        queue_name, exchange_name, routing_key=routing_key,
+    )
+    assert [call.args for call in callback.call_args_list] == [
+        (routing_key, {"id": 1}),
+        (routing_key, {"id": 2}),
+    ]
+    assert [call.kwargs for call in select_channel.basic_ack.call_args_list] == [
+        {"delivery_tag": 1},
+        {"delivery_tag": 2},
+    ]
+
+
+def test_select_consumer_error(select_channel):
+    """Test unexpected error stops consuming and it's raised."""
+    select_channel.messages = [{"id": 1}]
+
+    with pytest.raises(KeyError):
+        SelectConsumer(queue_name, MagicMock(side_effect=KeyError)).start_consuming(
+            exchange_name, [routing_key],
+        )
+
+    select_channel.basic_nack.assert_called_once_with(delivery_tag=1, requeue=True)
+
+
+def test_select_consumer_workers_and_batches(select_channel):
+    """Test batches are processed by workers and acked before connection is closed."""
+    select_channel.messages = [{"id": index} for index in range(5)]
+    batch_callback = MagicMock()
+    consumer = SelectConsumer(
+        queue_name, None, workers=2, batch_callback=batch_callback, batch_size=2,
+    )
+    select_channel.consumer = consumer
+
+    with consumer:
+        consumer.start_consuming(exchange_name, [routing_key])
+
+    assert sorted(
+        message["id"] for call in batch_callback.call_args_list for _, message in call.args[0]
+    ) == [0, 1, 2, 3, 4]
+    assert sorted(
+        call.kwargs["delivery_tag"] for call in select_channel.basic_ack.call_args_list
+    ) == [1, 2, 3, 4, 5]
+
+
+def test_select_consumer_connection_error(select_channel):
+    """Test connection error is raised."""
+    FakeSelectConnection.failures = 1
+
+    with pytest.raises(pika.exceptions.AMQPConnectionError):
+        SelectConsumer(queue_name, MagicMock()).start_consuming(exchange_name, [routing_key])
+
+
+def test_select_consumer_channel_closed(select_channel):
+    """Test consuming is stopped if channel is closed by broker."""
+    error = pika.exceptions.ChannelClosedByBroker(404, "NOT_FOUND")
+    select_channel.messages = [{"id": 1}]
+    consumer = SelectConsumer(queue_name, MagicMock())
+    select_channel.basic_ack.side_effect = lambda **_: select_channel.on_close_callback(
+        select_channel, error,
+    )
+
+    with pytest.raises(pika.exceptions.ChannelClosedByBroker):
+        consumer.start_consuming(exchange_name, [routing_key])
+
+    with pytest.raises(ConsumerBaseException):
+        consumer.stop_consuming()
+
+
+class Producer(SelectProducer):
+    """Test producer."""
+
+    exchange = "some_exchange"
+
+
+def test_select_producer(select_channel):
+    """Test queued messages are published in background and on close."""
+    FakeSelectConnection.failures = 1
+
+    with Producer(reconnect_delay=0) as producer:
+        for index in range(3):
+            producer.publish("user_updated", {"id": index})
+
+    assert [call.args[:3] for call in select_channel.basic_publish.call_args_list] == [
+        ("some_exchange", "user_updated", b'{"id": 0}'),
+        ("some_exchange", "user_updated", b'{"id": 1}'),
+        ("some_exchange", "user_updated", b'{"id": 2}'),
+    ]
+
+    producer.publish("user_updated", {"id": 3})
+    producer.close()
+    assert select_channel.basic_publish.call_count == 4
+
+
+def test_select_producer_reconnect(select_channel):
+    """Test message is published after connection is reopened."""
+
+    def _basic_publish(*args):
+        select_channel.basic_publish.side_effect = None
+        select_channel.connection.close()
+        raise pika.exceptions.ChannelWrongStateError
+
+    select_channel.basic_publish.side_effect = _basic_publish
+
+    with Producer(reconnect_delay=0) as producer:
+        producer.publish("user_updated", {"id": 1})
+
+    assert [call.args[2] for call in select_channel.basic_publish.call_args_list] == [
+        b'{"id": 1}',
+        b'{"id": 1}',
+    ]
+
+
+def test_select_producer_close_timeout(select_channel):
+    """Test close doesn't wait for unavailable broker longer than close_timeout."""
+    FakeSelectConnection.failures = 10 ** 9
+    producer = Producer(reconnect_delay=0, close_timeout=0.05)
+
+    producer.publish("user_updated", {"id": 1})
+    producer.close()
+
+    select_channel.basic_publish.assert_not_called()
+
+
+def _confirm(select_channel, method):
+    """Send confirm of the last published message on current channel."""
+    callback = select_channel.confirm_delivery.call_args[1]["ack_nack_callback"]
+    delivery_tag = select_channel.basic_publish.call_count - select_channel.published_before
+    select_channel.connection.ioloop.add_callback_threadsafe(
+        lambda: callback(Method(1, method(delivery_tag=delivery_tag))),
+    )
+
+
+def test_select_producer_confirms(select_channel):
+    """Test close waits for confirms, nacked messages are counted."""
+    select_channel.published_before = 0
+    select_channel.basic_publish.side_effect = lambda *args: _confirm(
+        select_channel, Basic.Nack if args[2] == b'{"id": 1}' else Basic.Ack,
+    )
+
+    with Producer(reconnect_delay=0, confirm_delivery=True) as producer:
+        for index in range(3):
+            producer.publish("user_updated", {"id": index})
+
+    assert select_channel.basic_publish.call_count == 3
+    assert producer.nacked == 1
+    assert not producer._unconfirmed  # noqa: WPS437 test of internals
+
+
+def test_select_producer_republishes_unconfirmed(select_channel):
+    """Test messages unconfirmed before connection is lost are published after reconnect."""
+
+    def _basic_publish(*args):
+        if select_channel.basic_publish.call_count == 2:
+            select_channel.published_before = 2
+            select_channel.basic_publish.side_effect = lambda *_: _confirm(
+                select_channel, Basic.Ack,
+            )
+            select_channel.connection.close()
+
+    select_channel.basic_publish.side_effect = _basic_publish
+
+    with Producer(reconnect_delay=0, confirm_delivery=True) as producer:
+        producer.publish("user_updated", {"id": 0})
+        producer.publish("user_updated", {"id": 1})
+
+    assert [call.args[2] for call in select_channel.basic_publish.call_args_list] == [
+        b'{"id": 0}',
+        b'{"id": 1}',
+        b'{"id": 0}',
+        b'{"id": 1}',
+    ]
+
+
+def test_select_producer_overflow_raise(select_channel):
+    """Test publish raises error when queue is full and policy is raise."""
+    FakeSelectConnection.failures = 10 ** 9
+    producer = Producer(
+        reconnect_delay=0,
+        close_timeout=0.01,
+        max_pending=1,
+        overflow_policy=OverflowPolicy.raise_error,
+    )
+
+    producer.publish("user_updated", {"id": 1})
+    with pytest.raises(PendingQueueFullError):
+        producer.publish("user_updated", {"id": 2})
+    producer.close()
+
+
+def test_select_producer_overflow_block(select_channel):
+    """Test publish waits until unconfirmed message is confirmed when queue is full."""
+    select_channel.published_before = 0
+    producer = Producer(reconnect_delay=0, confirm_delivery=True, max_pending=1)
+    producer.publish("user_updated", {"id": 1})
+    blocked = threading.Thread(target=producer.publish, args=("user_updated", {"id": 2}))
+    blocked.start()
+    blocked.join(0.05)
+    assert blocked.is_alive()
+
+    select_channel.basic_publish.side_effect = lambda *_: _confirm(select_channel, Basic.Ack)
+    _confirm(select_channel, Basic.Ack)
+    blocked.join(1)
+    producer.close()
+
+    assert not blocked.is_alive()
+    assert select_channel.basic_publish.call_count == 2
+
+
+def _benchmark(func: tp.Callable[[], None]) -> float:
+    started_at = time.monotonic()
+    func()
+    return BENCHMARK_MESSAGES / (time.monotonic() - started_at)
+
+
+class BenchmarkProducer(BaseProducer):
+    """Benchmark producer."""
+
+    exchange = "toolset_benchmark"
+
+
+class BenchmarkSelectProducer(SelectProducer):
+    """Benchmark producer."""
+
+    exchange = "toolset_benchmark"
+
+
+def _publish_all(producer: BaseProducer) -> None:
+    with producer:
+        for index in range(BENCHMARK_MESSAGES):
+            producer.publish("benchmark", {"id": index})
+
+
+def _consume_all(consumer_class: tp.Type[BaseConsumer], url_params: pika.URLParameters) -> None:
+    consumed = []
+
+    def _callback(routing_key, message):
+        consumed.append(message)
+        if len(consumed) == BENCHMARK_MESSAGES:
+            consumer.stop_consuming()
+
+    consumer = consumer_class(
+        "toolset_benchmark", _callback, url_params=url_params, prefetch_count=100,
+    )
+    consumer.start_consuming("toolset_benchmark", ["benchmark"])
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(BENCHMARK_URL_ENV not in os.environ, reason="rabbit is required")
+def test_benchmark_transports():
+    """Compare throughput of blocking and select transports, run with -s to see results."""
+    url_params = pika.URLParameters(os.environ[BENCHMARK_URL_ENV])
+    with pika.BlockingConnection(url_params) as connection:
+        channel = connection.channel()
+        channel.exchange_declare("toolset_benchmark", durable=True)
+        channel.queue_declare("toolset_benchmark", durable=True)
+        channel.queue_purge("toolset_benchmark")
+
+    results = {
+        "blocking publish": _benchmark(partial(_publish_all, BenchmarkProducer(url_params))),
+        "blocking consume": _benchmark(lambda: _consume_all(BaseConsumer, url_params)),
+        "select publish": _benchmark(partial(_publish_all, BenchmarkSelectProducer(url_params))),
+        "select consume": _benchmark(lambda: _consume_all(SelectConsumer, url_params)),
+    }
+    for name, rate in results.items():
+        print(f"{name}: {rate:.0f} messages/s")  # noqa: WPS421 print results
+
@@ -0,0 +1,149 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from asynctest import CoroutineMock
+
+from toolset.event_bus.aio import BufferedProducer, OverflowPolicy, PublishResult
+
+
+@pytest.fixture()
+def producer_mock():
+    """Producer mock publishing every message successfully."""
+    producer = MagicMock()
+    producer.publish_many = CoroutineMock(
+        side_effect=lambda items: [PublishResult(routing_key) for routing_key, _ in items],
+    )
+    producer.teardown = CoroutineMock()
+    return producer
+
+
+def published(producer_mock):
+    """Get all published (routing_key, data) pairs."""
+    return [item for call in producer_mock.publish_many.call_args_list for item in call[0][0]]
+
+
+async def test_publish_returns_before_flush(producer_mock):
+    """Test message is buffered and published in background by time."""
+    producer = BufferedProducer(producer_mock, flush_interval=0.01)
+
+    await producer.publish("foo", {"id": 1})
+    assert producer.buffered == 1
+    producer_mock.publish_many.assert_not_called()
+
+    await asyncio.sleep(0.05)
+    assert published(producer_mock) == [("foo", {"id": 1})]
+    await producer.teardown()
+
+
+async def test_flush_by_batch_size(producer_mock):
+    """Test full batch is published without waiting for flush interval."""
+    producer = BufferedProducer(producer_mock, batch_size=2, flush_interval=10)
+
+    await producer.publish("foo", {"id": 1})
+    await producer.publish("foo", {"id": 2})
+    await asyncio.sleep(0.01)
+
+    producer_mock.publish_many.assert_called_once_with([("foo", {"id": 1}), ("foo", {"id": 2})])
+    await producer.teardown()
+
+
+async def test_teardown_flushes_buffer(producer_mock):
+    """Test buffered messages are published on teardown."""
+    producer = BufferedProducer(producer_mock, batch_size=2, flush_interval=10)
+    for index in range(3):
+        await producer.publish("foo", {"id": index})
+
+    await producer.teardown()
+
+    assert published(producer_mock) == [("foo", {"id": index}) for index in range(3)]
+    producer_mock.teardown.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected_ids"),
+    [(OverflowPolicy.drop_new, [0, 1]), (OverflowPolicy.drop_oldest, [1, 2])],
+)
+async def test_overflow_drop(producer_mock, policy, expected_ids):
+    """Test messages dropped according to policy when buffer is full."""
+    producer = BufferedProducer(
+        producer_mock, buffer_size=2, flush_interval=10, overflow_policy=policy,
+    )
+    for index in range(3):
+        await producer.publish("foo", {"id": index})
+
+    assert producer.dropped == 1
+    await producer.teardown()
+    assert published(producer_mock) == [("foo", {"id": index}) for index in expected_ids]
+
+
+async def test_overflow_block(producer_mock):
+    """Test publisher waits until buffer is flushed when buffer is full."""
+    producer = BufferedProducer(producer_mock, buffer_size=1, batch_size=10, flush_interval=10)
+
+    await producer.publish("foo", {"id": 1})
+    await asyncio.wait_for(producer.publish("foo", {"id": 2}), timeout=1)
+
+    assert producer.dropped == 0
+    await producer.teardown()
+    assert published(producer_mock) == [("foo", {"id": 1}), ("foo", {"id": 2})]
+
+
+async def test_teardown_waits_for_in_flight_batch(producer_mock):
+    """Test batch being published by background task isn't lost on teardown."""
+    publish_many = producer_mock.publish_many.side_effect
+
+    async def _slow_publish_many(items):
+        await asyncio.sleep(0.02)
+        return publish_many(items)
+
+    producer_mock.publish_many.side_effect = _slow_publish_many
+    producer = BufferedProducer(producer_mock, batch_size=2, flush_interval=10)
+    for index in range(3):
+        await producer.publish("foo", {"id": index})
+    await asyncio.sleep(0)
+
+    await producer.teardown()
+
+    assert published(producer_mock) == [("foo", {"id": index}) for index in range(3)]
+    assert producer.failed == 0
+
+
+async def test_flush_keeps_order_with_background_flush(producer_mock):
+    """Test flush called during background flush publishes its batches after it."""
+    publish_many = producer_mock.publish_many.side_effect
+    finished = []
+
+    async def _publish_many(items):
+        # the first batch is the slowest one
+        await asyncio.sleep(0.02 if not finished else 0)
+        finished.extend(items)
+        return publish_many(items)
+
+    producer_mock.publish_many.side_effect = _publish_many
+    producer = BufferedProducer(producer_mock, batch_size=2, flush_interval=10)
+    for index in range(2):
+        await producer.publish("foo", {"id": index})
+    await asyncio.sleep(0)
+    for index in range(2, 4):
+        await producer.publish("foo", {"id": index})
+
+    await producer.flush()
+
+    assert finished == [("foo", {"id": index}) for index in range(4)]
+    await producer.teardown()
+
+
+async def test_failed_messages_counted(producer_mock):
+    """Test messages of failed batches and failed results are counted."""
+    producer_mock.publish_many.side_effect = [
+        ConnectionError,
+        [PublishResult("foo"), PublishResult("foo", ConnectionError())],
+    ]
+    producer = BufferedProducer(producer_mock, batch_size=2, flush_interval=10)
+    for index in range(4):
+        await producer.publish("foo", {"id": index})
+
+    await producer.teardown()
+
+    assert producer.failed == 3
@@ -0,0 +1,168 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from aio_pika.pool import Pool
+from asynctest import CoroutineMock
+
+from toolset.event_bus.aio import (
+    BaseConsumer,
+    BaseGarbageConsumer,
+    BaseProducer,
+    ClaimCheck,
+    FileSystemBlobStore,
+    load_body,
+)
+from toolset.event_bus.aio.claim_check import CLAIM_CHECK_HEADER, CLAIM_CHECK_KEY
+
+LARGE_BODY = {"data": "x" * 100}
+
+
+class Producer(BaseProducer):
+    """Test producer."""
+
+    exchange_name = "test_exchange"
+
+
+class GarbageConsumer(BaseGarbageConsumer):
+    """Test garbage consumer."""
+
+    exchange_name = "test"
+
+
+@pytest.fixture()
+def blob_store_mock():
+    """Blob store mock."""
+    blob_store = MagicMock()
+    blob_store.put = CoroutineMock(return_value="ref")
+    blob_store.get = CoroutineMock(return_value=json.dumps(LARGE_BODY).encode())
+    blob_store.delete = CoroutineMock()
+    return blob_store
+
+
+async def test_file_system_blob_store(tmp_path):
+    """Test body stored, fetched and deleted."""
+    blob_store = FileSystemBlobStore(tmp_path)
+
+    ref = await blob_store.put(b"body")
+    assert await blob_store.get(ref) == b"body"
+
+    await blob_store.delete(ref)
+    await blob_store.delete(ref)
+    assert not list(tmp_path.iterdir())
+
+    with pytest.raises(ValueError):
+        await blob_store.get("../ref")
+
+
+@pytest.mark.parametrize(
+    ("data", "expected_body", "expected_headers"),
+    [
+        ({"id": 1}, {"id": 1}, {}),
+        (LARGE_BODY, {CLAIM_CHECK_KEY: "ref"}, {CLAIM_CHECK_HEADER: "ref"}),
+    ],
+)
+async def test_producer_offloads_large_body(  # noqa: WPS211 too many arguments
+    loop, connection_mock, channel_mock, blob_store_mock, data, expected_body, expected_headers,
+):
+    """Test only bodies larger than threshold stored in blob store."""
+    producer = Producer(
+        Pool(lambda: connection_mock),
+        Pool(lambda: channel_mock),
+        blob_store=blob_store_mock,
+        claim_check_threshold=50,
+    )
+
+    await producer.publish("foo", data)
+
+    exchange = await producer.get_exchange(channel_mock)
+    message = exchange.publish.call_args[0][0]
+    assert json.loads(message.body) == expected_body
+    assert message.headers == expected_headers
+    await producer.teardown()
+
+
+@pytest.mark.parametrize(
+    ("publish_error", "deleted"), [(ConnectionError, True), (asyncio.TimeoutError, False)],
+)
+async def test_producer_deletes_body_of_failed_message(
+    loop, connection_mock, channel_mock, blob_store_mock, publish_error, deleted,
+):
+    """Test offloaded body is deleted if publishing failed, but kept if it timed out."""
+    producer = Producer(
+        Pool(lambda: connection_mock),
+        Pool(lambda: channel_mock),
+        blob_store=blob_store_mock,
+        claim_check_threshold=50,
+    )
+    exchange = await producer.get_exchange(channel_mock)
+    exchange.publish.side_effect = publish_error
+
+    with pytest.raises(publish_error):
+        await producer.publish("foo", LARGE_BODY)
+
+    assert blob_store_mock.delete.called is deleted
+    await producer.teardown()
+
+
+async def test_consumer_loads_body_lazily(
+    robust_connection_mock, rabbit_message_factory, full_queue_factory, blob_store_mock,
+):
+    """Test callback receives claim check and blob deleted after ack."""
+    bodies = []
+
+    async def callback(message_body, routing_key):
+        assert isinstance(message_body, ClaimCheck)
+        bodies.append(await load_body(message_body))
+
+    message = rabbit_message_factory({CLAIM_CHECK_KEY: "ref"}, "foo", {CLAIM_CHECK_HEADER: b"ref"})
+    full_queue_factory([message])
+
+    async with BaseConsumer("test_queue", blob_store=blob_store_mock) as consumer:
+        await consumer.consume(callback, "test_exchange", ["foo"])
+        await asyncio.sleep(0.01)
+
+    assert bodies == [LARGE_BODY]
+    assert message.ack.called
+    blob_store_mock.delete.assert_called_once_with("ref")
+
+
+async def test_garbage_consumer_keeps_reference(
+    robust_connection_mock, rabbit_message_factory, full_queue_factory, blob_store_mock,
+):
+    """Test reference moved to garbage queue and blob is kept."""
+    message = rabbit_message_factory({CLAIM_CHECK_KEY: "ref"}, "foo", {CLAIM_CHECK_HEADER: "ref"})
+    full_queue_factory([message])
+
+    async with GarbageConsumer("test_queue", blob_store=blob_store_mock) as consumer:
+        await consumer.consume(CoroutineMock(side_effect=KeyError), "test_exchange", ["foo"])
+        await asyncio.sleep(0.01)
+
+    exchange_mock = consumer._post_retry_exchange  # noqa: WPS441 control variable after block
+    garbage_message = exchange_mock.publish.call_args[0][0]
+    assert json.loads(garbage_message.body) == {CLAIM_CHECK_KEY: "ref", "error": repr(KeyError())}
+    assert garbage_message.headers == {CLAIM_CHECK_HEADER: "ref"}
+    blob_store_mock.get.assert_not_called()
+    blob_store_mock.delete.assert_not_called()
+
+
+async def test_consumer_passes_body_with_claim_check_key(
+    robust_connection_mock, rabbit_message_factory, full_queue_factory, blob_store_mock,
+):
+    """Test usual body having claim_check key reaches callback unchanged."""
+    bodies = []
+
+    async def callback(message_body, routing_key):
+        bodies.append(message_body)
+
+    body = {CLAIM_CHECK_KEY: "coat", "id": 1}
+    full_queue_factory([rabbit_message_factory(body, "foo")])
+
+    async with BaseConsumer("test_queue", blob_store=blob_store_mock) as consumer:
+        await consumer.consume(callback, "test_exchange", ["foo"])
+        await asyncio.sleep(0.01)
+
+    assert bodies == [body]
+    blob_store_mock.get.assert_not_called()
+    blob_store_mock.delete.assert_not_called()
@@ -5,7 +5,7 @@ import pytest
 from asynctest import CoroutineMock
 from structlog.testing import capture_logs
 
-from toolset.event_bus.aio.consumers import BaseClient, BaseConsumer
+from toolset.event_bus.aio.consumers import BaseClient, BaseConsumer, ShardedConsumer
 
 
 async def test_client_connect(robust_connection_mock, connection_mock, channel_mock):
@@ -168,3 +168,40 @@ async def test_base_consumer_not_blocking(
 
     assert enter_.call_count == call_count
     assert exit_.call_count == 0
+
+
+async def test_sharded_consumer_declarations(
+    robust_connection_mock, channel_mock, queue_mock,
+):
+    """Test queues of assigned shards declared and bound with routing keys of shards."""
+    callback = CoroutineMock()
+
+    async with ShardedConsumer("test_queue", shards=4, instance=1, instances=2) as consumer:
+        await consumer.consume(callback, "test_exchange", ["foo"], prefetch_count=1)
+
+    assert [call[0][0] for call in channel_mock.declare_queue.call_args_list] == [
+        "test_queue.1",
+        "test_queue.3",
+    ]
+    assert {call[1]["routing_key"] for call in queue_mock.bind.call_args_list} == {
+        "foo.1",
+        "foo.3",
+    }
+
+
+async def test_sharded_consumer_keeps_order(
+    robust_connection_mock, channel_mock, full_queue_factory, rabbit_message_factory,
+):
+    """Test messages of shard are processed one by one in order of delivery."""
+    processed = []
+
+    async def callback(message_body, routing_key):
+        await asyncio.sleep(0.01 / message_body["id"])
+        processed.append(message_body["id"])
+
+    full_queue_factory([rabbit_message_factory({"id": index}, "foo.0") for index in (1, 2, 3)])
+
+    async with ShardedConsumer("test_queue", shards=1) as consumer:
+        await consumer.consume(callback, "test_exchange", ["foo"], prefetch_count=10)
+
+    assert processed == [1, 2, 3]
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import pytest
+from asynctest import CoroutineMock
+
+from toolset.event_bus.aio import HealthCheckedPool, get_rabbit_channel_pool
+
+
+def item_factory():
+    """Create a new mocked connection/channel."""
+    item = MagicMock()
+    item.is_closed = False
+    item.close = CoroutineMock()
+    item.channel = CoroutineMock(side_effect=lambda: MagicMock(is_closed=False))
+    return item
+
+
+@pytest.fixture()
+def constructor():
+    """Pool item constructor."""
+    return CoroutineMock(side_effect=item_factory)
+
+
+async def test_prewarm(constructor):
+    """Test items created in advance and reused then."""
+    pool = HealthCheckedPool(constructor, max_size=3)
+    await pool.prewarm(2)
+
+    async with pool.acquire():
+        async with pool.acquire():
+            assert pool.metrics.in_use == 2
+
+    assert constructor.call_count == 2
+    assert pool.metrics.size == 2
+    assert pool.metrics.idle == 2
+    assert pool.metrics.acquired == 2
+
+
+async def test_closed_item_evicted(constructor):
+    """Test closed item is not returned from pool."""
+    pool = HealthCheckedPool(constructor, max_size=1)
+    async with pool.acquire() as item:
+        item.is_closed = True
+
+    async with pool.acquire() as new_item:
+        assert new_item is not item
+
+    assert pool.metrics.evictions == 1
+    assert pool.metrics.size == 1
+
+
+async def test_closed_idle_item_evicted(constructor):
+    """Test item closed while idle is evicted on acquire."""
+    pool = HealthCheckedPool(constructor, max_size=1)
+    await pool.prewarm(1)
+    async with pool.acquire() as item:
+        closed_item = item
+    closed_item.is_closed = True
+
+    async with pool.acquire() as item:
+        assert item is not closed_item
+    assert pool.metrics.evictions == 1
+
+
+async def test_channels_spread_across_connections(constructor):
+    """Test channels opened on every connection in round-robin."""
+    connection_pool = HealthCheckedPool(constructor, max_size=2)
+    channel_pool = await get_rabbit_channel_pool(connection_pool, max_size=4, prewarm=4)
+
+    assert channel_pool.metrics.size == 4
+    assert constructor.call_count == 2
+    connections = connection_pool._items  # noqa: WPS437 protected attribute
+    assert [connection.channel.call_count for connection in connections] == [2, 2]
+
+
+async def test_close(constructor):
+    """Test all items closed with pool."""
+    pool = HealthCheckedPool(constructor, max_size=2)
+    await pool.prewarm(2)
+    items = list(pool._items)  # noqa: WPS437 protected attribute
+
+    await pool.close()
+
+    assert pool.is_closed
+    assert all(item.close.called for item in items)
@@ -0,0 +1,99 @@
+import json
+from unittest.mock import MagicMock
+
+import aio_pika
+import pytest
+from aio_pika.pool import Pool
+from asynctest import CoroutineMock
+
+from toolset.event_bus.aio import BaseProducer
+from toolset.event_bus.sharding import get_shard
+
+
+class Producer(BaseProducer):
+    """Test producer."""
+
+    exchange_name = "test_exchange"
+
+
+@pytest.fixture()
+async def producer(loop, connection_mock, channel_mock):
+    """Producer with pools returning mocked connection and channel."""
+    producer = Producer(Pool(lambda: connection_mock), Pool(lambda: channel_mock))
+    yield producer
+    await producer.teardown()
+
+
+async def test_exchange_declared_once_per_channel(producer, channel_mock):
+    """Test exchange declared on first publish only."""
+    await producer.publish("foo", {"id": 1})
+    await producer.publish("bar", {"id": 2})
+
+    channel_mock.declare_exchange.assert_called_once_with(
+        "test_exchange", type=aio_pika.ExchangeType.TOPIC, durable=True,
+    )
+    exchange = await producer.get_exchange(channel_mock)
+    assert exchange.publish.call_count == 2
+    message, routing_key = exchange.publish.call_args_list[0][0]
+    assert json.loads(message.body) == {"id": 1}
+    assert routing_key == "foo"
+
+
+async def test_exchange_redeclared_after_channel_recreated(producer, channel_mock):
+    """Test exchange declared again when underlying channel changed."""
+    await producer.publish("foo", {"id": 1})
+    channel_mock.channel = MagicMock()
+    await producer.publish("foo", {"id": 1})
+
+    assert channel_mock.declare_exchange.call_count == 2
+
+
+async def test_skip_exchange_declaration(producer, channel_mock, exchange_mock_factory):
+    """Test exchange is not declared on broker when it is known to exist."""
+    channel_mock.get_exchange = CoroutineMock(side_effect=exchange_mock_factory)
+    producer.skip_exchange_declaration = True
+
+    await producer.publish("foo", {"id": 1})
+
+    channel_mock.declare_exchange.assert_not_called()
+    channel_mock.get_exchange.assert_called_once_with("test_exchange", ensure=False)
+
+
+async def test_publish_many(producer, channel_mock):
+    """Test all messages published with single exchange declaration."""
+    items = [(f"key.{index}", {"id": index}) for index in range(5)]
+
+    results = await producer.publish_many(items, max_in_flight=2)
+
+    assert [result.routing_key for result in results] == [key for key, _ in items]
+    assert all(result.ok for result in results)
+    channel_mock.declare_exchange.assert_called_once()
+    exchange = await producer.get_exchange(channel_mock)
+    assert exchange.publish.call_count == len(items)
+
+
+async def test_publish_many_async_iterable_with_failures(producer, channel_mock):
+    """Test failed messages reported per item and don't stop publishing."""
+
+    async def items():
+        for index in range(3):
+            yield "key", {"id": index}
+
+    exchange = await producer.get_exchange(channel_mock)
+    exchange.publish = CoroutineMock(side_effect=[None, ValueError, None])
+
+    results = await producer.publish_many(items())
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert isinstance(results[1].exception, ValueError)
+
+
+async def test_sharded_publish(producer, channel_mock):
+    """Test message routed to shard by hash of shard key."""
+    producer.shards = 4
+    producer.shard_key = "data.id"
+
+    await producer.publish("foo", {"data": {"id": 7}})
+
+    exchange = await producer.get_exchange(channel_mock)
+    assert exchange.publish.call_args[0][1] == f"foo.{get_shard(7, 4)}"
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from asynctest import CoroutineMock
+
+from toolset.event_bus.aio import BaseProducer, DiskSpool, PublishResult, SpoolingProducer
+
+
+class Producer(BaseProducer):
+    """Test producer."""
+
+    exchange_name = "test_exchange"
+
+
+@pytest.fixture()
+def producer_mock(mocker):
+    """Producer with mocked publishing."""
+    producer = Producer(mocker.MagicMock(), mocker.MagicMock())
+    producer.publish = CoroutineMock()
+    producer.publish_many = CoroutineMock(
+        side_effect=lambda items: [PublishResult(routing_key) for routing_key, _ in items],
+    )
+    producer.teardown = CoroutineMock()
+    return producer
+
+
+def published(producer_mock):
+    """Get all (routing_key, data) pairs passed to publish_many."""
+    return [item for call in producer_mock.publish_many.call_args_list for item in call[0][0]]
+
+
+def test_spool_segments(tmp_path):
+    """Test messages split into segments and read in order."""
+    spool = DiskSpool(tmp_path, segment_size=28)
+    for index in range(4):
+        spool.append("foo", f'{{"id": {index}}}'.encode())
+
+    segments = sorted(tmp_path.iterdir())
+    assert len(segments) == 2
+    assert spool.read(segments[0]) == [("foo", b'{"id": 0}'), ("foo", b'{"id": 1}')]
+    assert spool.oldest() == segments[0]
+
+
+def test_spool_drops_oldest_segment(tmp_path):
+    """Test the oldest segments dropped when spool exceeds max size."""
+    spool = DiskSpool(tmp_path, segment_size=14, max_size=30)
+    for index in range(4):
+        spool.append("foo", f'{{"id": {index}}}'.encode())
+
+    assert spool.dropped_segments == 2
+    assert spool.read(spool.oldest()) == [("foo", b'{"id": 2}')]
+
+
+def test_spool_reopened(tmp_path):
+    """Test segments left from previous run are picked up."""
+    spool = DiskSpool(tmp_path)
+    spool.append("foo", b"1")
+    spool.close()
+
+    reopened = DiskSpool(tmp_path)
+    reopened.append("bar", b"2")
+
+    assert reopened.pending
+    assert len(list(tmp_path.iterdir())) == 2
+    assert reopened.read(reopened.oldest()) == [("foo", b"1")]
+
+
+def test_spool_ignores_foreign_files(tmp_path):
+    """Test files which aren't numbered segments are ignored."""
+    (tmp_path / "backup.spool").write_bytes(b"foo\t1\n")
+    (tmp_path / "00000000000000000009.spool").write_bytes(b"foo\t2\n")
+
+    spool = DiskSpool(tmp_path)
+    spool.append("bar", b"3")
+
+    assert list(spool._segments) == [  # noqa: WPS437 test of internals
+        tmp_path / "00000000000000000009.spool",
+        tmp_path / "00000000000000000010.spool",
+    ]
+
+
+async def test_failed_publish_spooled_and_replayed(tmp_path, producer_mock):
+    """Test message spooled while broker is down and republished in order then."""
+    producer = SpoolingProducer(producer_mock, DiskSpool(tmp_path), batch_size=2)
+    producer_mock.publish.side_effect = ConnectionError
+
+    await producer.publish("foo", {"id": 1})
+    await producer.publish("foo", {"id": 2})
+    await producer.publish("foo", {"id": 3})
+
+    # only the first message tried to be published, the others spooled to keep order
+    assert producer_mock.publish.call_count == 1
+    await producer.replay()
+
+    assert published(producer_mock) == [("foo", {"id": index}) for index in (1, 2, 3)]
+    assert not producer.spool.pending
+    await producer.teardown()
+
+
+async def test_replay_stops_on_failure(tmp_path, producer_mock):
+    """Test replay continues from the first not published message."""
+    producer = SpoolingProducer(producer_mock, DiskSpool(tmp_path), batch_size=2)
+    for index in range(3):
+        producer.spool.append("foo", producer_mock.encode({"id": index}))
+    producer_mock.publish_many.side_effect = [
+        [PublishResult("foo"), PublishResult("foo", ConnectionError())],
+        [PublishResult("foo"), PublishResult("foo")],
+    ]
+
+    await producer.replay()
+    assert producer.spool.pending
+    await producer.replay()
+
+    assert published(producer_mock)[2:] == [("foo", {"id": 1}), ("foo", {"id": 2})]
+    assert not producer.spool.pending
+    await producer.teardown()
+
+
+async def test_publish_many_spools_failed(tmp_path, producer_mock):
+    """Test failed messages of bulk publishing spooled and reported as published."""
+    producer = SpoolingProducer(producer_mock, DiskSpool(tmp_path))
+    producer_mock.publish_many.side_effect = [
+        [PublishResult("foo"), PublishResult("bar", ConnectionError())],
+    ]
+
+    results = await producer.publish_many([("foo", {"id": 1}), ("bar", {"id": 2})])
+
+    assert all(result.ok for result in results)
+    assert producer.spool.read(producer.spool.oldest()) == [("bar", b'{"id": 2}')]
+    await producer.teardown()
+
+
+async def test_setup_replays_previous_run(tmp_path, producer_mock):
+    """Test messages spooled by previous run are republished after setup without publishing."""
+    spool = DiskSpool(tmp_path)
+    spool.append("foo", producer_mock.encode({"id": 1}))
+    spool.close()
+    producer = SpoolingProducer(producer_mock, DiskSpool(tmp_path))
+
+    await producer.setup()
+    await asyncio.sleep(0.05)
+
+    assert published(producer_mock) == [("foo", {"id": 1})]
+    assert not producer.spool.pending
+    await producer.teardown()
@@ -0,0 +1,32 @@
+import pytest
+
+from toolset.event_bus.sharding import assign_shards, get_shard, route_to_shard
+
+
+def test_shard_is_stable():
+    """Test the same key always goes to the same shard."""
+    assert get_shard(42, 8) == get_shard("42", 8)
+    assert len({get_shard(key, 8) for key in range(100)}) == 8
+
+
+def test_route_to_shard_nested_key():
+    """Test routing key of shard built from nested shard key."""
+    shard = get_shard(7, 4)
+    assert route_to_shard("user.updated", {"data": {"id": 7}}, "data.id", 4) == (
+        f"user.updated.{shard}"
+    )
+
+
+@pytest.mark.parametrize(
+    ("instance", "instances", "expected"),
+    [(0, 1, [0, 1, 2, 3, 4]), (0, 2, [0, 2, 4]), (1, 2, [1, 3]), (2, 3, [2])],
+)
+def test_assign_shards(instance, instances, expected):
+    """Test shards spread across consumer instances."""
+    assert assign_shards(5, instance, instances) == expected
+
+
+def test_assign_shards_wrong_instance():
+    """Test instance index validated."""
+    with pytest.raises(ValueError):
+        assign_shards(5, 2, 2)
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from toolset.aio.fan_out import fan_out, gather_bounded
+
+
+class Upstream:
+    """Fake upstream counting concurrent calls."""
+
+    def __init__(self):
+        """Init."""
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+
+    async def __call__(self, delay):
+        """Answer after `delay` seconds, fail for negative delay."""
+        self.calls.append(delay)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(abs(delay))
+        finally:
+            self.active -= 1
+        if delay < 0:
+            raise ValueError(delay)
+        return delay * 10
+
+
+async def test_gather_bounded():
+    """Test results are in order of specs, errors are collected, concurrency is limited."""
+    upstream = Upstream()
+    progress = []
+
+    res = await gather_bounded(
+        upstream, [0.03, 0.01, -0.01, 0.02, 0], concurrency=2, on_progress=progress.append,
+    )
+
+    assert res.results == [0.3, 0.1, None, 0.2, 0]
+    assert list(res.errors) == [2]
+    assert isinstance(res.errors[2], ValueError)
+    assert upstream.max_active == 2
+    assert [stats.completed for stats in progress] == [1, 2, 3, 4, 5]
+    assert res.stats.total == 5
+    assert res.stats.failed == 1
+    assert res.stats.latency_max >= 0.03
+    assert res.stats.latency_avg < res.stats.latency_max
+
+
+async def test_fan_out_as_completed():
+    """Test items are yielded as they complete, specs are taken lazily."""
+    upstream = Upstream()
+
+    indexes = [
+        item.index async for item in fan_out(upstream, (delay for delay in (0.03, 0.01, 0.02)), 3)
+    ]
+
+    assert indexes == [1, 2, 0]
+
+
+async def test_fan_out_stopped():
+    """Test pending calls are cancelled when iterator is closed."""
+    upstream = Upstream()
+    items = fan_out(upstream, [0, 1, 1, 1], concurrency=2)
+
+    assert (await items.__anext__()).result == 0
+    await items.aclose()
+    await asyncio.sleep(0)
+
+    assert upstream.active == 0
+    assert len(upstream.calls) == 3
+
+
+async def test_fan_out_rate(mocker):
+    """Test calls are started with rate limit."""
+    upstream = Upstream()
+    loop = asyncio.get_event_loop()
+    starts = []
+    upstream_call = upstream.__call__
+
+    async def _call(delay):
+        starts.append(loop.time())
+        return await upstream_call(delay)
+
+    await gather_bounded(_call, [0, 0, 0], concurrency=3, rate=50)
+
+    assert starts[2] - starts[0] == pytest.approx(0.04, abs=0.015)
+
+
+async def test_fan_out_specs_error():
+    """Test error of specs iterable is raised."""
+
+    def _specs():
+        yield 0
+        raise KeyError("spec")
+
+    with pytest.raises(KeyError):
+        await gather_bounded(Upstream(), _specs())
@@ -0,0 +1,160 @@
+import pytest
+import requests
+
+from toolset.http_cache import HttpCache, HttpCacheStats, get_ttl, parse_cache_control
+from toolset.sync.base_api_client import BaseApiClient
+
+DATE = "Mon, 19 Oct 2026 10:00:00 GMT"
+
+
+@pytest.fixture()
+def clock(mocker):
+    """Mock of time.monotonic."""
+    return mocker.patch("toolset.http_cache.time.monotonic", return_value=0)
+
+
+@pytest.mark.parametrize(
+    ("headers", "ttl"),
+    [
+        ({"Cache-Control": "public, max-age=60"}, 60),
+        ({"cache-control": "max-age=60", "Age": "20"}, 40),
+        ({"Cache-Control": "no-cache, max-age=60"}, 0),
+        ({"Cache-Control": "no-store"}, None),
+        ({"Expires": "Mon, 19 Oct 2026 10:05:00 GMT", "Date": DATE}, 300),
+        ({"Expires": "0", "Date": DATE}, 0),
+        ({"Expires": "Mon, 19 Oct 2026 10:05:00 GMT"}, 0),
+        ({"Cache-Control": "max-age=abc"}, 0),
+        ({}, 0),
+    ],
+)
+def test_get_ttl(headers, ttl):
+    """Test freshness is got from Cache-Control, Age and Expires."""
+    assert get_ttl(headers) == ttl
+
+
+def test_parse_cache_control():
+    """Test directives are parsed."""
+    assert parse_cache_control('Max-Age=10, private="x", no-cache') == {
+        "max-age": "10",
+        "private": "x",
+        "no-cache": None,
+    }
+
+
+def test_cache_key_and_vary(clock):
+    """Test key includes params and vary headers, Vary of response is respected."""
+    cache = HttpCache(vary_headers=["Authorization"])
+    key = cache.make_key("http://hrm/users", {"id": 1, "a": "b"}, {"Authorization": "x"})
+    assert key == cache.make_key(
+        "http://hrm/users", [("a", "b"), ("id", "1")], {"authorization": "x"},
+    )
+    assert key != cache.make_key("http://hrm/users", [("a", "b")], {"Authorization": "x"})
+    assert key != cache.make_key("http://hrm/users", {"id": 1, "a": "b"}, {"Authorization": "y"})
+
+    headers = {"Cache-Control": "max-age=10", "Vary": "Accept-Language"}
+    cache.set(key, "http://hrm/users", "ru", headers, {"Accept-Language": "ru"}, 10)
+    assert cache.get(key, {"Accept-Language": "ru"}).response == "ru"
+    assert cache.get(key, {"Accept-Language": "en"}) is None
+    assert cache.set(key, "url", "any", {"Vary": "*", "Cache-Control": "max-age=1"}, {}, 1) is None
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"a": [1, 2], "id": 3},
+        [("id", 3), ("a", 1), ("a", 2)],
+        "a=1&id=3&a=2",
+        b"a=1&id=3&a=2",
+    ],
+)
+def test_cache_key_params(params):
+    """Test query string and sequence values of mapping give the same key as pairs."""
+    cache = HttpCache()
+
+    assert cache.make_key("http://hrm/users", params, {}) == cache.make_key(
+        "http://hrm/users", [("a", "1"), ("a", "2"), ("id", "3")], {},
+    )
+    assert cache.make_key("http://hrm/users", params, {}) != cache.make_key(
+        "http://hrm/users", [("a", "2"), ("a", "1"), ("id", "3")], {},
+    )
+
+
+def test_cache_expiration_and_revalidation(clock):
+    """Test expired entries are returned for revalidation only if they have validators."""
+    cache = HttpCache(route_ttls={"*/departments/*": 100})
+    cache.set("etag", "http://hrm/users", "a", {"ETag": '"1"'}, {}, 1)
+    cache.set("no validators", "http://hrm/users", "b", {"Cache-Control": "max-age=10"}, {}, 1)
+    cache.set("route", "http://hrm/departments/?id=1", "c", {}, {}, 1)
+    no_store = {"Cache-Control": "no-store"}
+    assert cache.set("no-store", "http://hrm/departments/", "d", no_store, {}, 1) is None
+    clock.return_value = 10
+
+    entry = cache.get("etag", {})
+    assert not entry.is_fresh
+    assert entry.conditional_headers == {"If-None-Match": '"1"'}
+    assert cache.get("no validators", {}) is None
+    assert cache.get("route", {}).is_fresh
+
+    cache.revalidated(entry, "http://hrm/users", {"Cache-Control": "max-age=5", "ETag": '"2"'})
+    assert entry.is_fresh
+    assert entry.etag == '"2"'
+    assert cache.stats == HttpCacheStats(
+        hits=1, revalidated=1, misses=1, stored=3, evictions=0, entries=2, size_bytes=9,
+    )
+
+
+def test_cache_memory_bound(clock):
+    """Test least recently used entries are evicted when size exceeds max_bytes."""
+    cache = HttpCache(max_bytes=250)
+    headers = {"Cache-Control": "max-age=10"}
+    for key in ("a", "b", "c"):
+        cache.set(key, "url", key, headers, {}, 50)
+    cache.get("a", {})
+    cache.set("d", "url", "d", headers, {}, 50)
+
+    assert cache.get("b", {}) is None
+    assert cache.stats.evictions == 1
+    assert cache.stats.size_bytes == 3 * 73
+    assert cache.set("big", "url", "big", headers, {}, 1000) is None
+    cache.clear()
+    assert cache.stats.entries == 0
+
+
+class CachedApiClient(BaseApiClient):
+    """Sync api client with cache."""
+
+    service_name = "test"
+    cache = HttpCache()
+
+
+def _response(status, headers, content=b""):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = content  # noqa: WPS437 protected attribute
+    response._content_consumed = True  # noqa: WPS437 protected attribute
+    return response
+
+
+def test_sync_client_cache(clock, mocker):
+    """Test sync client returns cached response and revalidates it with If-None-Match."""
+    client = CachedApiClient()
+    client.cache.clear()
+    session_get = mocker.patch.object(
+        client.session,
+        "get",
+        side_effect=[
+            _response(200, {"ETag": '"1"', "Cache-Control": "max-age=10"}, b'{"id": 1}'),
+            _response(304, {"Cache-Control": "max-age=10"}),
+            _response(500, {}),
+        ],
+    )
+
+    first = client.get("http://hrm/users/1", params={"expand": "roles"})
+    assert client.get("http://hrm/users/1", params={"expand": "roles"}) is first
+    clock.return_value = 10
+    assert client.get("http://hrm/users/1", params={"expand": "roles"}).json() == {"id": 1}
+    assert client.get("http://hrm/users/2").status_code == 500
+
+    assert session_get.call_count == 3
+    assert session_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"1"'}
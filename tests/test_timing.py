@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from toolset.decorators import Histogram, HistogramExporter, HistogramRegistry, timed, timing
+
+
+@pytest.fixture()
+def histograms():
+    """Registry of test."""
+    return HistogramRegistry()
+
+
+@pytest.fixture()
+def perf_counter(mocker):
+    """Mock of time.perf_counter, every call takes 0.5 seconds."""
+    clock = iter(index * 0.5 for index in range(100))
+    return mocker.patch(
+        "toolset.decorators.timing.time.perf_counter", side_effect=lambda: next(clock),
+    )
+
+
+def test_histogram_percentiles():
+    """Test percentiles have bounded relative error."""
+    histogram = Histogram(resolution=1)
+    for value in range(1, 10001):
+        histogram.record(value)
+
+    assert histogram.percentile(50) == pytest.approx(5000, rel=0.04)
+    assert histogram.percentile(99) == pytest.approx(9900, rel=0.04)
+    assert histogram.percentile(100) == 10000
+    assert histogram.percentile(0) == 1
+
+    snapshot = histogram.snapshot("test", (("a", "1"),), reset=True)
+    assert (snapshot.count, snapshot.sum, snapshot.min, snapshot.max) == (10000, 50005000, 1, 10000)
+    assert snapshot.labels == {"a": "1"}
+    assert sum(count for _, count in snapshot.buckets) == 10000
+    assert len(snapshot.buckets) < 300
+    assert histogram.count == 0
+    assert histogram.percentile(50) == 0
+
+
+def test_timed(histograms, perf_counter):
+    """Test durations of calls are recorded by name and labels, errors included."""
+
+    @timed("load", labels={"source": "db"}, histograms=histograms)
+    def load(fail=False):
+        if fail:
+            raise ValueError
+
+    @timed(histograms=histograms)
+    def other():
+        """Other function."""
+
+    load()
+    with pytest.raises(ValueError):
+        load(fail=True)
+    other()
+
+    snapshots = {snapshot.name: snapshot for snapshot in histograms.collect()}
+    assert snapshots["load"].count == 2
+    assert snapshots["load"].sum == pytest.approx(1)
+    assert snapshots["load"].labels == {"source": "db"}
+    assert snapshots["tests.test_timing.test_timed.<locals>.other"].count == 1
+    assert not histograms.collect()
+
+
+async def test_timed_async_sampling(histograms, mocker):
+    """Test async function is decorated, only sampled calls are recorded."""
+    mocker.patch("toolset.decorators.timing.random.random", side_effect=[0.1, 0.9, 0.2])
+
+    @timed("fetch", sample_rate=0.5, histograms=histograms)
+    async def fetch():
+        await asyncio.sleep(0)
+        return "ok"
+
+    assert [await fetch() for _ in range(3)] == ["ok"] * 3  # noqa: WPS122 unused variable
+
+    assert histograms.collect()[0].count == 2
+
+
+def test_timed_memory(histograms, mocker):
+    """Test memory of sampled calls is traced, tracing is stopped after call."""
+    tracemalloc = mocker.patch("toolset.decorators.timing.tracemalloc")
+    tracemalloc.is_tracing.return_value = False
+    tracemalloc.get_traced_memory.side_effect = [(1000, 1000), (1500, 5000)]
+
+    @timed("build", trace_memory_rate=1, histograms=histograms)
+    def build():
+        """Build."""
+
+    build()
+
+    tracemalloc.start.assert_called_once()
+    tracemalloc.stop.assert_called_once()
+    memory = [snapshot for snapshot in histograms.collect() if snapshot.name != "build"]
+    assert memory[0].name == "build.memory_bytes"
+    assert memory[0].max == 4000
+    tracemalloc.reset_peak.assert_called_once()
+
+
+def test_memory_tracer_concurrent_calls(mocker):
+    """Test peak is reset at start of call, peaks before reset are kept for calls in progress."""
+    tracemalloc = mocker.patch("toolset.decorators.timing.tracemalloc")
+    tracemalloc.is_tracing.return_value = False
+    tracemalloc.get_traced_memory.side_effect = [(100, 100), (200, 900), (150, 300), (120, 400)]
+    tracer = timing._MemoryTracer()  # noqa: WPS437 test of internals
+
+    first = tracer.start()
+    second = tracer.start()
+
+    assert tracer.stop(second) == 100
+    assert tracer.stop(first) == 800
+    tracemalloc.stop.assert_called_once()
+
+
+def test_memory_tracer_without_reset_peak(mocker):
+    """Test net growth of memory is measured if tracemalloc can't reset peak."""
+    tracemalloc = mocker.patch("toolset.decorators.timing.tracemalloc")
+    del tracemalloc.reset_peak  # noqa: WPS420 python < 3.9
+    tracemalloc.get_traced_memory.side_effect = [(1000, 1000), (1500, 5000)]
+    tracer = timing._MemoryTracer()  # noqa: WPS437 test of internals
+
+    assert tracer.stop(tracer.start()) == 500
+
+
+def test_exporter(histograms, perf_counter, mocker):
+    """Test exporter sends collected snapshots to sink, errors of sink are logged."""
+    sink = mocker.Mock(side_effect=[ConnectionError, None])
+    exporter = HistogramExporter(sink, interval=0.01, histograms=histograms)
+    timed("job", histograms=histograms)(lambda: None)()
+
+    exporter.export()
+    exporter.export()
+    exporter.start()
+    timed("job", histograms=histograms)(lambda: None)()
+    exporter.stop()
+
+    assert sink.call_count == 2
+    assert sink.call_args.args[0][0].name == "job"
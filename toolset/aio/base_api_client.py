@@ -1,32 +1,87 @@
+import asyncio
 import os
 import typing as tp
 from collections.abc import Iterable
+from functools import partial
 
 from aiohttp import ClientResponse, ClientSession
 from aiohttp.typedefs import StrOrURL
+import structlog
 
+from toolset.aio.fan_out import (
+    DEFAULT_CONCURRENCY,
+    REQUEST_SPEC,
+    FanOutItem,
+    FanOutResult,
+    FanOutStats,
+    RequestSpec,
+    fan_out,
+    gather_bounded,
+)
+from toolset.aio.sessions import DEFAULT_SESSION, SessionRegistry, sessions
+from toolset.http_cache import (
+    CACHEABLE_STATUS,
+    DEFAULT_VARY_HEADERS,
+    NOT_MODIFIED_STATUS,
+    HttpCache,
+    make_request_key,
+)
 from toolset.typing_helpers import JSON_DICT, JSON_MAPPING
 
+logger = structlog.get_logger("toolset.aio.base_api_client")
+
 OPTIONAL_JSON_MAPPING = tp.Optional[JSON_MAPPING]
 PARAMS_TYPE = tp.Tuple[str, tp.Union[str, int]]
+PROGRESS_CALLBACK = tp.Optional[tp.Callable[[FanOutStats], None]]
 
 
 class BaseApiClient:
-    """Base api client."""
+    """
+    Base api client.
+
+    Clients use shared session `session_name` of `sessions` registry, so they share
+    connection pool and dns cache. Set `session_name = None` to use own session.
+    Set `cache` to cache responses of GET requests (see HttpCache).
+    Set `coalesce_requests` to share one response between concurrent identical GET requests,
+    they are identical by url, params, other kwargs and values of `coalesce_headers`.
+    """
 
     service_token: tp.Optional[str] = os.environ.get("SERVICE_SECRET")
     service_name: str
 
     default_timeout = 120
 
+    session_name: tp.Optional[str] = DEFAULT_SESSION
+    sessions: SessionRegistry = sessions
+    cache: tp.Optional[HttpCache] = None
+    coalesce_requests = False
+    coalesce_headers: tp.Tuple[str, ...] = DEFAULT_VARY_HEADERS
+
     def __init__(self):
         """Init."""
-        self.session = ClientSession()
+        self._session: tp.Optional[ClientSession] = None
+        self._in_flight: tp.Dict[tp.Hashable, asyncio.Future] = {}  # type: ignore
         self.secret_headers = {"X-SERVICE-SECRET": f"{self.service_token}:{self.service_name}"}
 
+    @property
+    def session(self) -> ClientSession:
+        """Get session, it's created on first use inside running loop."""
+        if self.session_name is not None:
+            return self.sessions.get(self.session_name)
+        if self._session is None or self._session.closed:
+            self._session = ClientSession()
+        return self._session
+
+    @session.setter
+    def session(self, session: ClientSession) -> None:
+        """Use own session."""
+        self.session_name = None
+        self._session = session
+
     async def close(self):
-        """Close session."""
-        await self.session.close()
+        """Close own session, shared sessions are closed by registry (see close_sessions)."""
+        if self._session is not None:
+            await self._session.close()
 
     def make_params(self, params: JSON_DICT) -> tp.List[PARAMS_TYPE]:
         """Make params for request from dict to tuple-like list."""
@@ -47,11 +102,11 @@ class BaseApiClient:
         return headers
 
     async def get(self, url: StrOrURL, allow_redirects: bool = True, **kwargs) -> ClientResponse:
-        """Get."""
+        """Get, cached and coalesced responses are returned with read body, don't modify them."""
         kwargs = self._update_kwargs(**kwargs)
-        return await self.session.get(
-            url, allow_redirects=allow_redirects, **{"timeout": self.default_timeout, **kwargs},
-        )
+        if self.coalesce_requests:
+            return await self._coalesced_get(url, allow_redirects, kwargs)
+        return await self._get(url, allow_redirects, kwargs)
 
     async def post(
         self,
@@ -87,6 +142,134 @@ class BaseApiClient:
         kwargs = self._update_kwargs(**kwargs)
         return await self.session.delete(url, **{"timeout": self.default_timeout, **kwargs})
 
+    def map(  # noqa: WPS211 too many arguments
+        self,
+        specs: tp.Iterable[REQUEST_SPEC],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: tp.Optional[float] = None,
+        raise_for_status: bool = False,
+        on_progress: PROGRESS_CALLBACK = None,
+    ) -> tp.AsyncIterator[FanOutItem]:
+        """
+        Send requests with bounded concurrency, yield FanOutItem as requests complete.
+
+        Response (with read body) or error of request is in item, errors don't stop
+        other requests. Call `aclose()` of iterator to cancel pending requests after break.
+
+        Parameters:
+            specs: RequestSpec or url for GET request
+            concurrency: max number of concurrent requests
+            rate: max number of requests started per second
+            raise_for_status: error statuses are errors of items
+            on_progress: callback called with FanOutStats after every request
+
+        """
+        return fan_out(
+            partial(self._send_spec, raise_for_status=raise_for_status),
+            specs,
+            concurrency,
+            rate,
+            on_progress,
+        )
+
+    async def gather_bounded(  # noqa: WPS211 too many arguments
+        self,
+        specs: tp.Iterable[REQUEST_SPEC],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: tp.Optional[float] = None,
+        raise_for_status: bool = False,
+        on_progress: PROGRESS_CALLBACK = None,
+    ) -> FanOutResult:
+        """Send requests like `map`, get FanOutResult with items in order of specs and stats."""
+        return await gather_bounded(
+            partial(self._send_spec, raise_for_status=raise_for_status),
+            specs,
+            concurrency,
+            rate,
+            on_progress,
+        )
+
+    async def _send_spec(self, spec: REQUEST_SPEC, raise_for_status: bool) -> ClientResponse:
+        if not isinstance(spec, RequestSpec):
+            spec = RequestSpec(spec)
+        response = await getattr(self, spec.method.lower())(spec.url, **spec.kwargs)
+        try:
+            # connection is released for the next request
+            await response.read()
+        finally:
+            response.release()
+        if raise_for_status:
+            response.raise_for_status()
+        return response
+
+    async def _get(
+        self, url: StrOrURL, allow_redirects: bool, kwargs: JSON_DICT,
+    ) -> ClientResponse:
+        if self.cache is not None:
+            return await self._cached_get(self.cache, url, allow_redirects, kwargs)
+        return await self.session.get(
+            url, allow_redirects=allow_redirects, **{"timeout": self.default_timeout, **kwargs},
+        )
+
+    async def _coalesced_get(
+        self, url: StrOrURL, allow_redirects: bool, kwargs: JSON_DICT,
+    ) -> ClientResponse:
+        request_key = make_request_key(
+            str(url), kwargs.get("params"), kwargs["headers"], self.coalesce_headers,
+        )
+        other_kwargs = tuple(
+            sorted(
+                (name, repr(kwarg))
+                for name, kwarg in kwargs.items()
+                if name not in {"params", "headers"}
+            ),
+        )
+        key = (request_key, allow_redirects, other_kwargs)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._read_get(url, allow_redirects, kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._on_coalesced_done(key, done))
+        # cancellation of a waiter doesn't cancel request of others
+        return await asyncio.shield(task)
+
+    async def _read_get(
+        self, url: StrOrURL, allow_redirects: bool, kwargs: JSON_DICT,
+    ) -> ClientResponse:
+        response = await self._get(url, allow_redirects, kwargs)
+        await response.read()
+        return response
+
+    def _on_coalesced_done(self, key: tp.Hashable, task: asyncio.Future) -> None:  # type: ignore
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]  # noqa: WPS420 request is finished
+        # error is retrieved, so it isn't logged by loop if every waiter is cancelled
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Coalesced request failed", exc=repr(task.exception()))
+
+    async def _cached_get(
+        self, cache: HttpCache, url: StrOrURL, allow_redirects: bool, kwargs: JSON_DICT,
+    ) -> ClientResponse:
+        request_headers = kwargs["headers"]
+        key = cache.make_key(str(url), kwargs.get("params"), request_headers)
+        entry = cache.get(key, request_headers)
+        if entry is not None and entry.is_fresh:
+            return entry.response
+        if entry is not None:
+            kwargs["headers"] = {**request_headers, **entry.conditional_headers}
+
+        response = await self.session.get(
+            url, allow_redirects=allow_redirects, **{"timeout": self.default_timeout, **kwargs},
+        )
+        if entry is not None and response.status == NOT_MODIFIED_STATUS:
+            response.release()
+            cache.revalidated(entry, str(url), response.headers)
+            return entry.response
+        if response.status == CACHEABLE_STATUS:
+            body = await response.read()
+            cache.set(key, str(url), response, response.headers, request_headers, len(body))
+        return response
+
     def _update_kwargs(self, **kwargs) -> JSON_DICT:
         """
         Update kwargs to request.
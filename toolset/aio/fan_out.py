@@ -0,0 +1,197 @@
+import asyncio
+import typing as tp
+from collections.abc import Sized
+
+import structlog
+from aiohttp.typedefs import StrOrURL
+
+logger = structlog.get_logger("toolset.aio.fan_out")
+
+T = tp.TypeVar("T")
+
+DEFAULT_CONCURRENCY = 10
+
+_DONE = object()
+
+
+class RequestSpec(tp.NamedTuple):
+    """Request of fan-out, kwargs are passed to method of api client."""
+
+    url: StrOrURL
+    method: str = "GET"
+    kwargs: tp.Mapping[str, tp.Any] = {}  # type: ignore  # noqa: WPS407 it's not mutated
+
+
+REQUEST_SPEC = tp.Union[RequestSpec, StrOrURL]
+
+
+class FanOutItem(tp.NamedTuple):
+    """Result of one request of fan-out."""
+
+    index: int
+    spec: tp.Any  # type: ignore
+    result: tp.Any  # type: ignore
+    error: tp.Optional[Exception]
+    latency: float
+
+
+class FanOutStats(tp.NamedTuple):
+    """Fan-out progress and latency stats snapshot."""
+
+    # None if specs are not sized (e.g. generator)
+    total: tp.Optional[int]
+    completed: int
+    failed: int
+    elapsed: float
+    latency_avg: float
+    latency_max: float
+
+
+class FanOutResult(tp.NamedTuple):
+    """Results of fan-out in order of specs."""
+
+    items: tp.List[FanOutItem]
+    stats: FanOutStats
+
+    @property
+    def results(self) -> tp.List[tp.Any]:  # type: ignore
+        """Get results in order of specs, None for failed requests."""
+        return [item.result for item in self.items]
+
+    @property
+    def errors(self) -> tp.Dict[int, Exception]:
+        """Get errors by index of spec."""
+        return {item.index: item.error for item in self.items if item.error is not None}
+
+
+class _RateLimiter:
+    """Spreads starts of calls evenly, `rate` calls per second."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1 / rate
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class _StatsCollector:
+    def __init__(self, total: tp.Optional[int]) -> None:
+        self._loop = asyncio.get_event_loop()
+        self._started_at = self._loop.time()
+        self._total = total
+        self._completed = 0
+        self._failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def stats(self) -> FanOutStats:
+        return FanOutStats(
+            total=self._total,
+            completed=self._completed,
+            failed=self._failed,
+            elapsed=self._loop.time() - self._started_at,
+            latency_avg=self._latency_total / self._completed if self._completed else 0,
+            latency_max=self._latency_max,
+        )
+
+    def add(self, item: FanOutItem) -> None:
+        self._completed += 1
+        self._failed += item.error is not None
+        self._latency_total += item.latency
+        self._latency_max = max(self._latency_max, item.latency)
+
+
+def fan_out(
+    call: tp.Callable[[T], tp.Awaitable[tp.Any]],  # type: ignore
+    specs: tp.Iterable[T],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: tp.Optional[float] = None,
+    on_progress: tp.Optional[tp.Callable[[FanOutStats], None]] = None,
+) -> tp.AsyncIterator[FanOutItem]:
+    """
+    Call `call` for every spec, at most `concurrency` at once, yield items as they complete.
+
+    Errors of calls are collected in items, they don't stop other calls.
+    Specs are taken lazily, so they can be a generator. Pending calls are cancelled
+    when iterator is closed (`await items.aclose()` after break).
+
+    Parameters:
+        call: coroutine function called with spec
+        specs: specs of calls
+        concurrency: max number of concurrent calls
+        rate: max number of calls started per second
+        on_progress: callback called with stats after every call
+
+    """
+    collector = _StatsCollector(len(specs) if isinstance(specs, Sized) else None)
+    return _fan_out(call, specs, concurrency, rate, collector, on_progress)
+
+
+async def gather_bounded(
+    call: tp.Callable[[T], tp.Awaitable[tp.Any]],  # type: ignore
+    specs: tp.Iterable[T],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: tp.Optional[float] = None,
+    on_progress: tp.Optional[tp.Callable[[FanOutStats], None]] = None,
+) -> FanOutResult:
+    """Call `call` for every spec like fan_out, get results in order of specs and stats."""
+    collector = _StatsCollector(len(specs) if isinstance(specs, Sized) else None)
+    items = [
+        item
+        async for item in _fan_out(call, specs, concurrency, rate, collector, on_progress)
+    ]
+    return FanOutResult(sorted(items, key=lambda item: item.index), collector.stats)
+
+
+async def _fan_out(  # noqa: WPS211 too many arguments
+    call: tp.Callable[[T], tp.Awaitable[tp.Any]],  # type: ignore
+    specs: tp.Iterable[T],
+    concurrency: int,
+    rate: tp.Optional[float],
+    collector: _StatsCollector,
+    on_progress: tp.Optional[tp.Callable[[FanOutStats], None]],
+) -> tp.AsyncIterator[FanOutItem]:
+    loop = asyncio.get_event_loop()
+    specs_iter = enumerate(specs)
+    completed: asyncio.Queue = asyncio.Queue()  # type: ignore
+    limiter = _RateLimiter(rate) if rate else None
+
+    async def _worker() -> None:  # noqa: WPS430 nested function
+        try:
+            for index, spec in specs_iter:
+                if limiter is not None:
+                    await limiter.wait()
+                started_at = loop.time()
+                try:
+                    res, error = await call(spec), None
+                except Exception as exc:
+                    res, error = None, exc
+                completed.put_nowait(FanOutItem(index, spec, res, error, loop.time() - started_at))
+        finally:
+            completed.put_nowait(_DONE)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(max(concurrency, 1))]
+    finished = 0
+    try:
+        while finished < len(workers):
+            item = await completed.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            collector.add(item)
+            if on_progress is not None:
+                on_progress(collector.stats)
+            yield item
+        # raise error of specs iterable
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+    logger.debug("Fan-out finished", **collector.stats._asdict())
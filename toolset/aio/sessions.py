@@ -0,0 +1,104 @@
+import asyncio
+import typing as tp
+
+import structlog
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.typedefs import StrOrURL
+
+logger = structlog.get_logger("toolset.aio.sessions")
+
+DEFAULT_SESSION = "default"
+
+
+class ConnectorSettings(tp.NamedTuple):
+    """Settings of TCPConnector of shared session."""
+
+    # max number of connections, 0 - no limit
+    limit: int = 100
+    # max number of connections to one host, 0 - no limit
+    limit_per_host: int = 30
+    # seconds resolved hosts are cached, None - forever
+    ttl_dns_cache: tp.Optional[int] = 300
+    # seconds idle connection is kept alive
+    keepalive_timeout: float = 30
+
+
+class _SharedSession(tp.NamedTuple):
+    session: ClientSession
+    loop: asyncio.AbstractEventLoop
+
+
+class SessionRegistry:
+    """
+    Process-wide aiohttp sessions shared by api clients.
+
+    Session is created by name on first use inside running loop, so clients can be
+    created on import. Sessions of closed loop (e.g. in tests) are created again.
+    """
+
+    def __init__(self) -> None:
+        """Init registry."""
+        self._settings: tp.Dict[str, ConnectorSettings] = {}
+        self._sessions: tp.Dict[str, _SharedSession] = {}
+
+    def configure(self, name: str = DEFAULT_SESSION, **settings: tp.Any) -> None:  # type: ignore
+        """
+        Set connector settings of session.
+
+        Parameters:
+            name: name of session
+            settings: fields of ConnectorSettings, they are applied to session created later
+
+        """
+        self._settings[name] = ConnectorSettings(**settings)
+
+    def get(self, name: str = DEFAULT_SESSION) -> ClientSession:
+        """Get session by name, create it if needed, should be called inside running loop."""
+        loop = asyncio.get_running_loop()
+        shared = self._sessions.get(name)
+        if shared is None or shared.session.closed or shared.loop is not loop:
+            settings = self._settings.get(name, ConnectorSettings())
+            connector = TCPConnector(**settings._asdict())
+            shared = _SharedSession(ClientSession(connector=connector), loop)
+            self._sessions[name] = shared
+            logger.debug("Shared session created", name=name, **settings._asdict())
+        return shared.session
+
+    async def prewarm(
+        self, urls: tp.Iterable[StrOrURL], connections: int = 1, name: str = DEFAULT_SESSION,
+    ) -> None:
+        """
+        Open connections to hosts in advance, so the first requests don't wait for dns and tls.
+
+        Parameters:
+            urls: urls requested with HEAD, one per host is enough
+            connections: number of concurrent connections opened to every url
+            name: name of session
+
+        """
+        session = self.get(name)
+
+        async def _head(url: StrOrURL) -> None:  # noqa: WPS430 nested function
+            try:
+                async with session.head(url, allow_redirects=False):
+                    pass  # noqa: WPS420 response is released to keep connection alive
+            except Exception as exc:
+                logger.warning("Couldn't prewarm connection", url=str(url), exc=repr(exc))
+
+        await asyncio.gather(*(_head(url) for url in urls for _ in range(connections)))
+
+    async def close(self, name: tp.Optional[str] = None) -> None:
+        """Close session by name or all sessions."""
+        names = [name] if name is not None else list(self._sessions)
+        for session_name in names:
+            shared = self._sessions.pop(session_name, None)
+            if shared is not None and not shared.session.closed:
+                await shared.session.close()
+
+
+sessions = SessionRegistry()
+
+
+async def close_sessions(*args: tp.Any) -> None:  # type: ignore
+    """Close shared sessions, e.g. as aiohttp app on_cleanup signal handler."""
+    await sessions.close()
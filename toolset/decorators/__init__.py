@@ -0,0 +1,28 @@
+from .caching import Cache, CacheStats, CacheStatus, aio_cached, cached, make_key
+from .circuit_breakers import (
+    CircuitBreaker,
+    CircuitBreakerMetrics,
+    CircuitOpenError,
+    CircuitState,
+    circuit_breaker,
+    get_circuit_breaker,
+)
+from .isolation import (
+    AioBulkhead,
+    Bulkhead,
+    BulkheadFullError,
+    BulkheadStats,
+    aio_bulkhead,
+    aio_timeout,
+    bulkhead,
+    timeout,
+)
+from .retrying import FailFastError, RetryBudget, aio_retry, retry
+from .timing import (
+    Histogram,
+    HistogramExporter,
+    HistogramRegistry,
+    HistogramSnapshot,
+    log_sink,
+    timed,
+)
@@ -0,0 +1,289 @@
+import asyncio
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+from enum import Enum
+from functools import wraps
+
+import structlog
+
+from toolset.typing_helpers import ASYNC_FUNC, FUNC_RESULT, TFunc
+
+logger = structlog.get_logger("toolset.decorators.caching")
+
+DEFAULT_MAXSIZE = 128
+DEFAULT_TTL = 60
+
+KeyBuilder = tp.Callable[..., tp.Hashable]
+
+_KWARGS_MARK = object()
+
+
+class CacheStatus(str, Enum):
+    """Result of cache lookup."""
+
+    fresh = "fresh"
+    stale = "stale"  # expired, but can be returned while value is reloaded
+    miss = "miss"
+
+
+class CacheStats(tp.NamedTuple):
+    """Cache stats snapshot."""
+
+    hits: int
+    stale_hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class _Entry(tp.NamedTuple):
+    value: tp.Any  # type: ignore
+    expires_at: float
+    stale_until: float
+
+
+class Cache:
+    """
+    Thread-safe LRU cache with TTL of entries.
+
+    Entries are evicted in LRU order when cache is full. Expired entries are returned
+    as stale for `stale_ttl` seconds after expiration, then they are removed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: tp.Optional[float] = DEFAULT_TTL,
+        stale_ttl: float = 0,
+    ) -> None:
+        """Init.
+
+        @param maxsize: max number of entries
+        @param ttl: seconds entry is fresh, None - entries don't expire
+        @param stale_ttl: seconds expired entry is returned as stale
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        self._data: "OrderedDict[tp.Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Get stats."""
+        with self._lock:
+            return CacheStats(
+                self._hits, self._stale_hits, self._misses, self._evictions, len(self._data),
+            )
+
+    def lookup(self, key: tp.Hashable) -> tp.Tuple[CacheStatus, tp.Any]:  # type: ignore
+        """Get status of key and its value (None if it's missed)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and now >= entry.stale_until:
+                del self._data[key]  # noqa: WPS420 remove expired entry
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return CacheStatus.miss, None
+            self._data.move_to_end(key)
+            if now < entry.expires_at:
+                self._hits += 1
+                return CacheStatus.fresh, entry.value
+            self._stale_hits += 1
+            return CacheStatus.stale, entry.value
+
+    def set(self, key: tp.Hashable, value: tp.Any) -> None:  # type: ignore  # noqa: A003
+        """Set value of key."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._data[key] = _Entry(value, expires_at, expires_at + self.stale_ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: tp.Hashable) -> None:
+        """Delete key."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Delete all keys."""
+        with self._lock:
+            self._data.clear()
+
+
+def make_key(*args, **kwargs) -> tp.Hashable:
+    """Make cache key of positional and keyword args, they should be hashable."""
+    if not kwargs:
+        return args
+    return (*args, _KWARGS_MARK, *sorted(kwargs.items()))
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: tp.Any = None  # type: ignore
+        self.error: tp.Optional[BaseException] = None
+
+
+class _SingleFlight:
+    """Calls of function for key shared by concurrent threads."""
+
+    def __init__(self) -> None:
+        self._flights: tp.Dict[tp.Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: tp.Hashable) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def run(self, key: tp.Hashable, func: tp.Callable[[], FUNC_RESULT]) -> FUNC_RESULT:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as exc:  # noqa: B902 error is passed to waiting threads
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]  # noqa: WPS420 flight is finished
+            flight.done.set()
+        return flight.result
+
+
+def cached(
+    maxsize: int = DEFAULT_MAXSIZE,
+    ttl: tp.Optional[float] = DEFAULT_TTL,
+    stale_ttl: float = 0,
+    key: KeyBuilder = make_key,
+) -> tp.Callable[[TFunc], TFunc]:
+    """Cache results of function in LRU cache with TTL.
+
+    Concurrent misses of key share one call of function (single-flight), errors aren't cached.
+    Stale entry is returned for `stale_ttl` seconds after expiration while it's reloaded
+    in background thread (stale-while-revalidate).
+    Decorated function has `cache` (Cache with stats) and `invalidate(*args, **kwargs)`.
+
+    @param maxsize: max number of entries
+    @param ttl: seconds entry is fresh, None - entries don't expire
+    @param stale_ttl: seconds expired entry is returned while it's reloaded
+    @param key: function making cache key of function args
+    """
+
+    def _cached(func: TFunc) -> TFunc:
+        cache = Cache(maxsize, ttl, stale_ttl)
+        flights = _SingleFlight()
+
+        def _load(cache_key: tp.Hashable, args, kwargs) -> FUNC_RESULT:
+            def _call() -> FUNC_RESULT:  # noqa: WPS430 nested function
+                res = func(*args, **kwargs)
+                cache.set(cache_key, res)
+                return res
+
+            return flights.run(cache_key, _call)
+
+        def _reload(cache_key: tp.Hashable, args, kwargs) -> None:
+            try:
+                _load(cache_key, args, kwargs)
+            except Exception as exc:
+                logger.warning("Couldn't reload cached value", func=func.__name__, exc=repr(exc))
+
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            cache_key = key(*args, **kwargs)
+            status, value = cache.lookup(cache_key)
+            if status == CacheStatus.fresh:
+                return value
+            if status == CacheStatus.stale:
+                if not flights.in_flight(cache_key):
+                    threading.Thread(
+                        target=_reload, args=(cache_key, args, kwargs), daemon=True,
+                    ).start()
+                return value
+            return _load(cache_key, args, kwargs)
+
+        _inner.cache = cache  # type: ignore
+        _inner.invalidate = lambda *args, **kwargs: cache.delete(  # type: ignore
+            key(*args, **kwargs),
+        )
+        return tp.cast(TFunc, _inner)
+
+    return _cached
+
+
+def aio_cached(
+    maxsize: int = DEFAULT_MAXSIZE,
+    ttl: tp.Optional[float] = DEFAULT_TTL,
+    stale_ttl: float = 0,
+    key: KeyBuilder = make_key,
+) -> tp.Callable[[ASYNC_FUNC], ASYNC_FUNC]:
+    """Cache results of async function in LRU cache with TTL.
+
+    The same as `cached`, concurrent misses await one task, stale entries are reloaded
+    in background task. Cancellation of a caller doesn't cancel the shared task.
+    """
+
+    def _cached(func: ASYNC_FUNC) -> ASYNC_FUNC:
+        cache = Cache(maxsize, ttl, stale_ttl)
+        flights: tp.Dict[tp.Hashable, asyncio.Future] = {}  # type: ignore
+
+        async def _load(cache_key: tp.Hashable, args, kwargs) -> FUNC_RESULT:
+            res = await func(*args, **kwargs)
+            cache.set(cache_key, res)
+            return res
+
+        def _on_done(cache_key: tp.Hashable, task: asyncio.Future) -> None:  # type: ignore
+            if flights.get(cache_key) is task:
+                del flights[cache_key]  # noqa: WPS420 flight is finished
+            # error is retrieved, so it isn't logged by loop if nobody awaits the task
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(
+                    "Couldn't load cached value", func=func.__name__, exc=repr(task.exception()),
+                )
+
+        def _get_flight(cache_key: tp.Hashable, args, kwargs) -> asyncio.Future:  # type: ignore
+            task = flights.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(_load(cache_key, args, kwargs))
+                flights[cache_key] = task
+                task.add_done_callback(lambda done: _on_done(cache_key, done))
+            return task
+
+        @wraps(func)
+        async def _inner(*args, **kwargs) -> FUNC_RESULT:
+            cache_key = key(*args, **kwargs)
+            status, value = cache.lookup(cache_key)
+            if status == CacheStatus.fresh:
+                return value
+            if status == CacheStatus.stale:
+                _get_flight(cache_key, args, kwargs)
+                return value
+            return await asyncio.shield(_get_flight(cache_key, args, kwargs))
+
+        _inner.cache = cache  # type: ignore
+        _inner.invalidate = lambda *args, **kwargs: cache.delete(  # type: ignore
+            key(*args, **kwargs),
+        )
+        return tp.cast(ASYNC_FUNC, _inner)
+
+    return _cached
@@ -0,0 +1,276 @@
+import asyncio
+import threading
+import time
+import typing as tp
+from collections import deque
+from enum import Enum
+from functools import wraps
+
+import structlog
+
+from toolset.decorators.retrying import FailFastError
+from toolset.typing_helpers import FUNC_RESULT, TFunc
+
+logger = structlog.get_logger("toolset.decorators.circuit_breakers")
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_WINDOW_SIZE = 20
+DEFAULT_MIN_CALLS = 10
+DEFAULT_RECOVERY_TIMEOUT = 30
+
+
+class CircuitState(str, Enum):
+    """State of circuit breaker."""
+
+    closed = "closed"  # calls are passed
+    open = "open"  # calls are rejected
+    half_open = "half_open"  # a few probe calls are passed
+
+
+class CircuitOpenError(FailFastError):
+    """Call is rejected by open circuit breaker, it's not retried by retry decorators."""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        """Init.
+
+        @param name: name of circuit breaker
+        @param retry_after: seconds left until probe calls are allowed
+        """
+        super().__init__(f"Circuit breaker {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreakerMetrics(tp.NamedTuple):
+    """Circuit breaker metrics snapshot."""
+
+    state: CircuitState
+    calls: int
+    failures: int
+    rejected: int
+    opened: int
+    consecutive_failures: int
+    # failure rate of calls in window
+    failure_rate: float
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker rejecting calls to failing dependency.
+
+    Circuit is opened after `failure_threshold` consecutive failures or if failure rate
+    of the last `window_size` calls reaches `failure_rate_threshold` (at least `min_calls`
+    calls are required). Open circuit rejects calls with CircuitOpenError for
+    `recovery_timeout` seconds, then up to `half_open_max_calls` concurrent probe calls
+    are passed: success closes circuit, failure opens it again.
+    Use instance as decorator of sync or async functions.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: tp.Optional[int] = DEFAULT_FAILURE_THRESHOLD,
+        failure_rate_threshold: tp.Optional[float] = None,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = 1,
+        exceptions: tp.Tuple[tp.Type[Exception], ...] = (Exception,),
+    ) -> None:
+        """Init.
+
+        @param name: name of circuit breaker (dependency)
+        @param failure_threshold: number of consecutive failures opening circuit
+        @param failure_rate_threshold: failure rate (0..1) in window opening circuit
+        @param window_size: number of the last calls to count failure rate
+        @param min_calls: min number of calls in window to count failure rate
+        @param recovery_timeout: seconds circuit is open before probe calls
+        @param half_open_max_calls: max number of concurrent probe calls
+        @param exceptions: exceptions counted as failures, other ones are passed as is
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.exceptions = exceptions
+
+        self._lock = threading.Lock()
+        self._state = CircuitState.closed
+        self._opened_at = 0.0
+        self._probes = 0
+        # results of the last calls, True is failure
+        self._window: tp.Deque[bool] = deque(maxlen=window_size)
+        self._consecutive_failures = 0
+        self._calls = 0
+        self._failures = 0
+        self._rejected = 0
+        self._opened = 0
+
+    def __call__(self, func: TFunc) -> TFunc:
+        """Decorate function."""
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_inner(*args, **kwargs) -> FUNC_RESULT:  # noqa: WPS430 nested
+                probe = self.before_call()
+                try:
+                    res = await func(*args, **kwargs)
+                except self.exceptions as exc:
+                    self.on_failure(exc, probe)
+                    raise
+                except BaseException:
+                    self.on_ignored(probe)
+                    raise
+                self.on_success(probe)
+                return res
+
+            return tp.cast(TFunc, _async_inner)
+
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            probe = self.before_call()
+            try:
+                res = func(*args, **kwargs)
+            except self.exceptions as exc:
+                self.on_failure(exc, probe)
+                raise
+            except BaseException:
+                self.on_ignored(probe)
+                raise
+            self.on_success(probe)
+            return res
+
+        return tp.cast(TFunc, _inner)
+
+    @property
+    def state(self) -> CircuitState:
+        """Get current state."""
+        with self._lock:
+            return self._get_state()
+
+    @property
+    def metrics(self) -> CircuitBreakerMetrics:
+        """Get metrics."""
+        with self._lock:
+            return CircuitBreakerMetrics(
+                state=self._get_state(),
+                calls=self._calls,
+                failures=self._failures,
+                rejected=self._rejected,
+                opened=self._opened,
+                consecutive_failures=self._consecutive_failures,
+                failure_rate=sum(self._window) / len(self._window) if self._window else 0,
+            )
+
+    def before_call(self) -> bool:
+        """Register call or raise CircuitOpenError if call isn't allowed.
+
+        Returns True if call is a probe call of half-open circuit, the result should be passed
+        to on_success, on_failure or on_ignored.
+        """
+        with self._lock:
+            state = self._get_state()
+            if state == CircuitState.open or (
+                state == CircuitState.half_open and self._probes >= self.half_open_max_calls
+            ):
+                self._rejected += 1
+                retry_after = max(self._opened_at + self.recovery_timeout - time.monotonic(), 0)
+                raise CircuitOpenError(self.name, retry_after)
+            self._calls += 1
+            if state == CircuitState.half_open:
+                self._probes += 1
+                return True
+            return False
+
+    def on_success(self, probe: bool = False) -> None:
+        """Register successful call, successful probe call closes circuit."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._window.append(False)
+            if probe and self._finish_probe():
+                self._close()
+
+    def on_failure(self, exc: Exception, probe: bool = False) -> None:
+        """Register failed call, failed probe call opens circuit again."""
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._window.append(True)
+            if probe:
+                if self._finish_probe():
+                    self._open(exc)
+            elif self._state == CircuitState.closed and self._is_threshold_reached():
+                self._open(exc)
+
+    def on_ignored(self, probe: bool = False) -> None:
+        """Register call finished with error which isn't failure."""
+        with self._lock:
+            if probe:
+                self._finish_probe()
+
+    def reset(self) -> None:
+        """Close circuit."""
+        with self._lock:
+            self._close()
+
+    def _get_state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.open
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = CircuitState.half_open
+            self._probes = 0
+        return self._state
+
+    def _finish_probe(self) -> bool:
+        """Release probe slot, return False if circuit isn't half-open since the probe started."""
+        if self._state != CircuitState.half_open:
+            return False
+        self._probes = max(self._probes - 1, 0)
+        return True
+
+    def _is_threshold_reached(self) -> bool:
+        if self.failure_threshold and self._consecutive_failures >= self.failure_threshold:
+            return True
+        if self.failure_rate_threshold is None or len(self._window) < self.min_calls:
+            return False
+        return sum(self._window) / len(self._window) >= self.failure_rate_threshold
+
+    def _open(self, exc: Exception) -> None:
+        self._state = CircuitState.open
+        self._opened_at = time.monotonic()
+        self._opened += 1
+        logger.warning("Circuit breaker is opened", name=self.name, exc=repr(exc))
+
+    def _close(self) -> None:
+        if self._state != CircuitState.closed:
+            logger.info("Circuit breaker is closed", name=self.name)
+        self._state = CircuitState.closed
+        self._window.clear()
+        self._consecutive_failures = 0
+
+
+_circuit_breakers: tp.Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **options: tp.Any) -> CircuitBreaker:  # type: ignore
+    """Get circuit breaker by name, it's created with `options` on the first call."""
+    with _circuit_breakers_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(name, **options)
+        return _circuit_breakers[name]
+
+
+def circuit_breaker(name: str, **options: tp.Any) -> CircuitBreaker:  # type: ignore
+    """
+    Decorate sync or async function with circuit breaker shared by name.
+
+    Functions decorated with the same name (e.g. calls of one dependency) share state,
+    the breaker is created with options of the first decorator. Options are CircuitBreaker's
+    ones. Put it above `retry` to fail fast without retries when circuit is open, below
+    `retry` CircuitOpenError isn't retried too, but every attempt is counted.
+    """
+    return get_circuit_breaker(name, **options)
@@ -0,0 +1,282 @@
+import asyncio
+import threading
+import time
+import typing as tp
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import wraps
+
+from toolset.decorators.retrying import FailFastError
+from toolset.typing_helpers import ASYNC_FUNC, FUNC_RESULT, TFunc
+
+
+class BulkheadFullError(FailFastError):
+    """Call is rejected by bulkhead: all slots are busy and waiting queue is full."""
+
+
+class BulkheadStats(tp.NamedTuple):
+    """Bulkhead stats snapshot."""
+
+    active: int
+    waiting: int
+    accepted: int
+    rejected: int
+    # seconds calls waited in queue
+    wait_time_total: float
+    wait_time_max: float
+
+
+class _BaseBulkhead:
+    def __init__(
+        self, max_concurrent: int, max_waiting: int = 0, max_wait: tp.Optional[float] = None,
+    ) -> None:
+        """Init.
+
+        @param max_concurrent: max number of concurrent calls
+        @param max_waiting: max number of calls waiting for slot, other calls are rejected
+        @param max_wait: max seconds call waits for slot, then it's rejected
+        """
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+
+        self._active = 0
+        self._waiting = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @property
+    def stats(self) -> BulkheadStats:
+        """Get stats."""
+        return BulkheadStats(
+            active=self._active,
+            waiting=self._waiting,
+            accepted=self._accepted,
+            rejected=self._rejected,
+            wait_time_total=self._wait_time_total,
+            wait_time_max=self._wait_time_max,
+        )
+
+    def _reject(self) -> BulkheadFullError:
+        self._rejected += 1
+        return BulkheadFullError(
+            f"Bulkhead is full: {self._active} calls are active, {self._waiting} are waiting",
+        )
+
+    def _record_wait(self, started_at: float) -> None:
+        wait_time = time.monotonic() - started_at
+        self._wait_time_total += wait_time
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+
+
+class Bulkhead(_BaseBulkhead):
+    """
+    Limit of concurrent calls of sync functions (in threads).
+
+    Calls over `max_concurrent` wait for slot, calls over `max_waiting` waiting ones
+    are rejected at once with BulkheadFullError. Use instance as decorator, functions
+    decorated with the same instance share its slots.
+    """
+
+    def __init__(
+        self, max_concurrent: int, max_waiting: int = 0, max_wait: tp.Optional[float] = None,
+    ) -> None:
+        """Init."""
+        super().__init__(max_concurrent, max_waiting, max_wait)
+        self._condition = threading.Condition()
+
+    def __call__(self, func: TFunc) -> TFunc:
+        """Decorate function."""
+
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            self.acquire()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.release()
+
+        return tp.cast(TFunc, _inner)
+
+    @property
+    def stats(self) -> BulkheadStats:
+        """Get stats."""
+        with self._condition:
+            return super().stats
+
+    def acquire(self) -> None:
+        """Take slot or raise BulkheadFullError."""
+        with self._condition:
+            if self._active < self.max_concurrent:
+                self._take()
+                return
+            if self._waiting >= self.max_waiting:
+                raise self._reject()
+            self._waiting += 1
+            started_at = time.monotonic()
+            try:
+                has_slot = self._condition.wait_for(
+                    lambda: self._active < self.max_concurrent, self.max_wait,
+                )
+            finally:
+                self._waiting -= 1
+                self._record_wait(started_at)
+            if not has_slot:
+                raise self._reject()
+            self._take()
+
+    def release(self) -> None:
+        """Free slot."""
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def _take(self) -> None:
+        self._active += 1
+        self._accepted += 1
+
+
+class AioBulkhead(_BaseBulkhead):
+    """
+    Limit of concurrent calls of async functions.
+
+    The same as Bulkhead, waiting calls get slots in FIFO order.
+    """
+
+    def __init__(
+        self, max_concurrent: int, max_waiting: int = 0, max_wait: tp.Optional[float] = None,
+    ) -> None:
+        """Init."""
+        super().__init__(max_concurrent, max_waiting, max_wait)
+        # futures are created in running loop, so bulkhead can be created on import
+        self._waiters: tp.Deque[asyncio.Future] = deque()  # type: ignore
+
+    def __call__(self, func: ASYNC_FUNC) -> ASYNC_FUNC:
+        """Decorate function."""
+
+        @wraps(func)
+        async def _inner(*args, **kwargs) -> FUNC_RESULT:
+            await self.acquire()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.release()
+
+        return tp.cast(ASYNC_FUNC, _inner)
+
+    async def acquire(self) -> None:
+        """Take slot or raise BulkheadFullError."""
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+            self._accepted += 1
+            return
+        if self._waiting >= self.max_waiting:
+            raise self._reject()
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        self._waiting += 1
+        started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            self._leave_queue(waiter)
+            raise self._reject()
+        except asyncio.CancelledError:
+            self._leave_queue(waiter)
+            raise
+        finally:
+            self._waiting -= 1
+            self._record_wait(started_at)
+        # slot is passed by release()
+        self._accepted += 1
+
+    def release(self) -> None:
+        """Free slot or pass it to the first waiting call."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _leave_queue(self, waiter: asyncio.Future) -> None:  # type: ignore
+        if waiter.done():
+            # slot was passed at the same time
+            self.release()
+            return
+        waiter.cancel()
+        self._waiters.remove(waiter)
+
+
+def bulkhead(
+    max_concurrent: int, max_waiting: int = 0, max_wait: tp.Optional[float] = None,
+) -> Bulkhead:
+    """Limit concurrent calls of sync function, see Bulkhead."""
+    return Bulkhead(max_concurrent, max_waiting, max_wait)
+
+
+def aio_bulkhead(
+    max_concurrent: int, max_waiting: int = 0, max_wait: tp.Optional[float] = None,
+) -> AioBulkhead:
+    """Limit concurrent calls of async function, see AioBulkhead."""
+    return AioBulkhead(max_concurrent, max_waiting, max_wait)
+
+
+def timeout(
+    seconds: float, max_workers: int, max_waiting: int = 0,
+) -> tp.Callable[[TFunc], TFunc]:
+    """Raise concurrent.futures.TimeoutError if function isn't finished in `seconds`.
+
+    Function is called in pool of `max_workers` threads (per decorated function).
+    Call waiting for thread is cancelled on timeout, running call can't be interrupted:
+    it's finished in background and keeps its thread busy. Calls over `max_workers` running
+    and `max_waiting` waiting ones are rejected at once with BulkheadFullError.
+    Thread-local state (e.g. django db connection) of caller isn't available in function.
+    The pool is shut down on interpreter exit, or earlier with `shutdown()` attribute
+    of decorated function.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+
+    def _timeout(func: TFunc) -> TFunc:
+        executor = ThreadPoolExecutor(max_workers, thread_name_prefix=f"timeout-{func.__name__}")
+        slots = threading.BoundedSemaphore(max_workers + max_waiting)
+
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            if not slots.acquire(blocking=False):
+                raise BulkheadFullError(f"{func.__name__}: all threads are busy")
+            try:
+                future = executor.submit(func, *args, **kwargs)
+            except BaseException:
+                slots.release()
+                raise
+            # slot is freed when call is finished or cancelled, not when caller stops waiting
+            future.add_done_callback(lambda _: slots.release())
+            try:
+                return future.result(seconds)
+            except FutureTimeoutError:
+                future.cancel()
+                raise
+
+        _inner.shutdown = executor.shutdown  # type: ignore
+        return tp.cast(TFunc, _inner)
+
+    return _timeout
+
+
+def aio_timeout(seconds: float) -> tp.Callable[[ASYNC_FUNC], ASYNC_FUNC]:
+    """Cancel async function and raise asyncio.TimeoutError if it isn't finished in `seconds`."""
+
+    def _timeout(func: ASYNC_FUNC) -> ASYNC_FUNC:
+        @wraps(func)
+        async def _inner(*args, **kwargs) -> FUNC_RESULT:
+            return await asyncio.wait_for(func(*args, **kwargs), seconds)
+
+        return tp.cast(ASYNC_FUNC, _inner)
+
+    return _timeout
@@ -0,0 +1,179 @@
+import asyncio
+import random
+import threading
+import time
+import typing as tp
+from functools import wraps
+from time import sleep
+
+import structlog
+
+from toolset.typing_helpers import ASYNC_FUNC, FUNC_RESULT, TFunc
+
+logger = structlog.get_logger("toolset.decorators.retrying")
+
+# called before sleep with number of failed attempt, its exception and seconds to wait
+OnRetry = tp.Callable[[int, Exception, float], None]
+
+
+class FailFastError(Exception):
+    """Error which is never retried by retry decorators (e.g. call rejected by circuit breaker)."""
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries of all functions sharing it (e.g. all calls in process).
+
+    Every retry takes a token, tokens are refilled with `refill_rate` per second up to
+    `capacity`. When tokens are over, retries are disabled and errors are raised at once,
+    so during outage callers don't multiply load on the failed service.
+    """
+
+    def __init__(self, capacity: float = 10, refill_rate: float = 1) -> None:
+        """Init.
+
+        @param capacity: max number of tokens (retries in a burst)
+        @param refill_rate: number of tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Get number of available tokens."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def acquire(self) -> bool:
+        """Take token for retry, return False if retry isn't allowed."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate,
+        )
+        self._updated_at = now
+
+
+class _RetryPolicy(tp.NamedTuple):
+    attempts: int
+    wait_time_seconds: float
+    backoff: float
+    jitter: bool
+    max_wait: tp.Optional[float]
+    deadline: tp.Optional[float]
+    budget: tp.Optional[RetryBudget]
+
+    def get_wait(self, attempt: int, started_at: float) -> tp.Optional[float]:
+        """Get seconds to wait after failed attempt (counted from 1), None if retries are over."""
+        if attempt >= self.attempts:
+            return None
+        wait = self.wait_time_seconds * self.backoff ** (attempt - 1)
+        if self.max_wait is not None:
+            wait = min(wait, self.max_wait)
+        if self.jitter:
+            # full jitter: callers failed at the same time don't retry at the same time
+            wait = random.uniform(0, wait)  # noqa: S311 not for security
+        if self.deadline is not None and time.monotonic() - started_at + wait >= self.deadline:
+            return None
+        if self.budget is not None and not self.budget.acquire():
+            logger.warning("Retry budget is exhausted", attempt=attempt)
+            return None
+        return wait
+
+    def on_error(
+        self, attempt: int, exc: Exception, started_at: float, on_retry: tp.Optional[OnRetry],
+    ) -> float:
+        """Get seconds to wait before the next attempt or raise error with attempt count."""
+        wait = None if isinstance(exc, FailFastError) else self.get_wait(attempt, started_at)
+        if wait is None:
+            exc.retry_attempts = attempt  # type: ignore
+            raise exc
+        logger.debug("Retry", attempt=attempt, wait=wait, exc=repr(exc))
+        if on_retry is not None:
+            on_retry(attempt, exc, wait)
+        return wait
+
+
+def retry(
+    *exceptions: tp.Type[Exception],
+    attempts: int = 3,
+    wait_time_seconds: float = 0.5,
+    backoff: float = 2,
+    jitter: bool = False,
+    max_wait: tp.Optional[float] = None,
+    deadline: tp.Optional[float] = None,
+    budget: tp.Optional[RetryBudget] = None,
+    on_retry: tp.Optional[OnRetry] = None,
+) -> tp.Callable[[TFunc], TFunc]:
+    """Try to call a func `attempts` times with `wait_time_seconds` breaks multiplied each time by `backoff`.
+
+    @param jitter: wait random time from 0 to the break (full jitter)
+    @param max_wait: max seconds of one break
+    @param deadline: max seconds of all attempts, error is raised if the next break exceeds it
+    @param budget: retry budget shared with other functions, retries are disabled if it's over
+    @param on_retry: function called before every break with attempt, exception and break
+    Raised error has `retry_attempts` attribute with number of attempts.
+    """
+    policy = _RetryPolicy(attempts, wait_time_seconds, backoff, jitter, max_wait, deadline, budget)
+
+    def _retry(func: TFunc) -> TFunc:
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            started_at = time.monotonic()
+            attempt = 1
+            while True:  # noqa: WPS457 infinite loop ends with return or raise
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as exc:
+                    sleep(policy.on_error(attempt, exc, started_at, on_retry))
+                attempt += 1
+
+        return tp.cast(TFunc, _inner)
+
+    return _retry
+
+
+def aio_retry(
+    *exceptions: tp.Type[Exception],
+    attempts: int = 3,
+    wait_time_seconds: float = 0.5,
+    backoff: float = 2,
+    jitter: bool = False,
+    max_wait: tp.Optional[float] = None,
+    deadline: tp.Optional[float] = None,
+    budget: tp.Optional[RetryBudget] = None,
+    on_retry: tp.Optional[OnRetry] = None,
+):
+    """Try to call a func `attempts` times with `wait_time_seconds` breaks multiplied each time by `backoff`.
+
+    Other params are the same as `retry` has.
+    """
+    policy = _RetryPolicy(attempts, wait_time_seconds, backoff, jitter, max_wait, deadline, budget)
+
+    def _retry(func: ASYNC_FUNC) -> ASYNC_FUNC:
+        @wraps(func)
+        async def _inner(*args, **kwargs) -> FUNC_RESULT:
+            started_at = time.monotonic()
+            attempt = 1
+            while True:  # noqa: WPS457 infinite loop ends with return or raise
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions as exc:
+                    await asyncio.sleep(policy.on_error(attempt, exc, started_at, on_retry))
+                attempt += 1
+
+        return tp.cast(ASYNC_FUNC, _inner)
+
+    return _retry
@@ -0,0 +1,368 @@
+import asyncio
+import random
+import threading
+import time
+import tracemalloc
+import typing as tp
+from functools import wraps
+
+import structlog
+
+from toolset.typing_helpers import FUNC_RESULT, TFunc
+
+logger = structlog.get_logger("toolset.decorators.timing")
+
+# 2 ** SUB_BUCKET_BITS buckets per power of two, relative error of value is < 2 ** -(bits - 1)
+SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF_SUB_BUCKETS = _SUB_BUCKETS >> 1
+
+SECONDS_RESOLUTION = 1e-6
+BYTES_RESOLUTION = 1
+DEFAULT_EXPORT_INTERVAL = 60
+MEMORY_SUFFIX = ".memory_bytes"
+
+Labels = tp.Tuple[tp.Tuple[str, str], ...]
+
+
+def _bucket_index(value: int) -> int:
+    """Get log-linear bucket of value: linear below _SUB_BUCKETS, then per power of two."""
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * _HALF_SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_bounds(index: int) -> tp.Tuple[int, int]:
+    """Get [lower, upper) bounds of bucket."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = index // _HALF_SUB_BUCKETS - 1
+    mantissa = index - shift * _HALF_SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class HistogramSnapshot(tp.NamedTuple):
+    """Histogram snapshot, values are in units of recorded values."""
+
+    name: str
+    labels: tp.Dict[str, str]
+    count: int
+    sum: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+    # (upper bound, count) of not empty buckets in ascending order
+    buckets: tp.Tuple[tp.Tuple[float, int], ...]
+
+
+class Histogram:
+    """
+    Streaming histogram with log-linear buckets (HDR-style).
+
+    Values are rounded to `resolution` and counted in buckets of fixed relative width,
+    so memory doesn't depend on number of values and percentiles have bounded error.
+    """
+
+    def __init__(self, resolution: float = SECONDS_RESOLUTION) -> None:
+        """Init.
+
+        @param resolution: the least distinguishable value (e.g. microsecond for seconds)
+        """
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._buckets: tp.Dict[int, int] = {}
+        self._count = 0
+        self._sum = 0.0
+        self._min = float("inf")
+        self._max = 0.0
+
+    @property
+    def count(self) -> int:
+        """Get number of recorded values."""
+        return self._count
+
+    def record(self, value: float) -> None:
+        """Record value, negative values are recorded as 0."""
+        value = max(value, 0)
+        index = _bucket_index(int(value / self.resolution))
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            self._count += 1
+            self._sum += value
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+
+    def percentile(self, percent: float) -> float:
+        """Get value at percentile (0-100), it's the middle of bucket bounded by min and max."""
+        with self._lock:
+            return self._percentile(percent)
+
+    def snapshot(self, name: str, labels: Labels, reset: bool = False) -> HistogramSnapshot:
+        """Get snapshot, reset collected values if `reset`."""
+        with self._lock:
+            snapshot = HistogramSnapshot(
+                name=name,
+                labels=dict(labels),
+                count=self._count,
+                sum=self._sum,
+                min=self._min if self._count else 0,
+                max=self._max,
+                p50=self._percentile(50),
+                p90=self._percentile(90),
+                p99=self._percentile(99),
+                buckets=tuple(
+                    (_bucket_bounds(index)[1] * self.resolution, count)
+                    for index, count in sorted(self._buckets.items())
+                ),
+            )
+            if reset:
+                self._reset()
+        return snapshot
+
+    def _percentile(self, percent: float) -> float:
+        if not self._count:
+            return 0
+        if percent <= 0:
+            return self._min
+        if percent >= 100:
+            return self._max
+        rank = percent / 100 * self._count
+        seen = 0
+        for index, count in sorted(self._buckets.items()):  # noqa: B007 index is used
+            seen += count
+            if seen >= rank:
+                break
+        lower, upper = _bucket_bounds(index)
+        value = (lower + upper) / 2 * self.resolution
+        return min(max(value, self._min), self._max)
+
+    def _reset(self) -> None:
+        self._buckets = {}
+        self._count = 0
+        self._sum = 0
+        self._min = float("inf")
+        self._max = 0
+
+
+class HistogramRegistry:
+    """Histograms keyed by name and labels."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self._histograms: tp.Dict[tp.Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        labels: tp.Optional[tp.Mapping[str, str]] = None,
+        resolution: float = SECONDS_RESOLUTION,
+    ) -> Histogram:
+        """Get histogram by name and labels, create it on first call."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(resolution))
+        return histogram
+
+    def collect(self, reset: bool = True) -> tp.List[HistogramSnapshot]:
+        """Get snapshots of not empty histograms, reset them if `reset` (delta export)."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+        return [
+            histogram.snapshot(name, labels, reset)
+            for (name, labels), histogram in histograms
+            if histogram.count
+        ]
+
+
+Sink = tp.Callable[[tp.List[HistogramSnapshot]], None]
+
+registry = HistogramRegistry()
+
+
+def log_sink(snapshots: tp.List[HistogramSnapshot]) -> None:
+    """Log snapshots without buckets."""
+    for snapshot in snapshots:
+        logger.info("Histogram", **snapshot._replace(buckets=())._asdict())
+
+
+class HistogramExporter:
+    """Periodic export of registry histograms to sink in background thread."""
+
+    def __init__(
+        self,
+        sink: Sink = log_sink,
+        interval: float = DEFAULT_EXPORT_INTERVAL,
+        histograms: HistogramRegistry = registry,
+    ) -> None:
+        """Init.
+
+        @param sink: callable getting list of snapshots, e.g. pushing them to statsd
+        @param interval: seconds between exports
+        @param histograms: registry to export, values are reset on every export
+        """
+        self.sink = sink
+        self.interval = interval
+        self.histograms = histograms
+        self._stopped = threading.Event()
+        self._thread: tp.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start export."""
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="histogram-exporter", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop export and export collected values."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def export(self) -> None:
+        """Export collected values, errors of sink are logged."""
+        snapshots = self.histograms.collect()
+        if not snapshots:
+            return
+        try:
+            self.sink(snapshots)
+        except Exception as exc:
+            logger.warning("Couldn't export histograms", exc=repr(exc))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.export()
+
+
+class _TracedCall:
+    """Traced memory at start of call and the highest peak seen during call."""
+
+    def __init__(self, started_with: int) -> None:
+        self.started_with = started_with
+        self.peak = started_with
+
+
+class _MemoryTracer:
+    """
+    Tracing of memory is started for sampled calls only, it's stopped after the last one.
+
+    Peak of traced memory is reset by tracemalloc.reset_peak() (python 3.9+) at start of every
+    call, peaks seen before reset are kept for calls in progress, so peak growth of the call
+    is measured. Without reset_peak() net growth (current minus start) is measured instead.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active: tp.Set[_TracedCall] = set()
+        self._started = False
+
+    def start(self) -> _TracedCall:
+        """Start tracing if needed, register traced call."""
+        with self._lock:
+            if not self._active and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            current, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, "reset_peak"):
+                for active in self._active:
+                    active.peak = max(active.peak, peak)
+                tracemalloc.reset_peak()
+            traced = _TracedCall(current)
+            self._active.add(traced)
+            return traced
+
+    def stop(self, traced: _TracedCall) -> int:
+        """Get peak (or net) growth of traced memory during call, stop tracing after last call."""
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            self._active.discard(traced)
+            if not self._active and self._started:
+                tracemalloc.stop()
+                self._started = False
+        if not hasattr(tracemalloc, "reset_peak"):
+            return max(current - traced.started_with, 0)
+        return max(traced.peak, peak) - traced.started_with
+
+
+_memory_tracer = _MemoryTracer()
+
+
+def timed(  # noqa: WPS231 sync and async wrappers
+    name: tp.Optional[str] = None,
+    labels: tp.Optional[tp.Mapping[str, str]] = None,
+    sample_rate: float = 1,
+    trace_memory_rate: float = 0,
+    histograms: HistogramRegistry = registry,
+) -> tp.Callable[[TFunc], TFunc]:
+    """Record duration (seconds) of sync or async function calls in histogram.
+
+    Failed calls are recorded too. Memory is traced with tracemalloc for sampled calls:
+    peak growth of traced memory (bytes, net growth before python 3.9) is recorded in
+    `<name>.memory_bytes` histogram, it's approximate, since allocations of other threads
+    and tasks are traced as well.
+    Tracing is expensive, keep `trace_memory_rate` low.
+
+    @param name: histogram name, module and qualified name of function by default
+    @param labels: histogram labels
+    @param sample_rate: fraction of calls to record
+    @param trace_memory_rate: fraction of recorded calls to trace memory
+    @param histograms: registry of histograms
+    """
+
+    def _timed(func: TFunc) -> TFunc:
+        histogram_name = name or f"{func.__module__}.{func.__qualname__}"
+        histogram = histograms.histogram(histogram_name, labels)
+        memory_histogram = histograms.histogram(
+            histogram_name + MEMORY_SUFFIX, labels, BYTES_RESOLUTION,
+        )
+
+        def _start() -> tp.Tuple[float, tp.Optional[_TracedCall]]:
+            traced: tp.Optional[_TracedCall] = None
+            if trace_memory_rate and random.random() < trace_memory_rate:  # noqa: S311 sampling
+                traced = _memory_tracer.start()
+            return time.perf_counter(), traced
+
+        def _finish(started_at: float, traced: tp.Optional[_TracedCall]) -> None:
+            histogram.record(time.perf_counter() - started_at)
+            if traced is not None:
+                memory_histogram.record(_memory_tracer.stop(traced))
+
+        def _sampled() -> bool:
+            return sample_rate >= 1 or random.random() < sample_rate  # noqa: S311 sampling
+
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_inner(*args, **kwargs) -> FUNC_RESULT:
+                if not _sampled():
+                    return await func(*args, **kwargs)
+                started_at, traced = _start()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _finish(started_at, traced)
+
+            return tp.cast(TFunc, _async_inner)
+
+        @wraps(func)
+        def _inner(*args, **kwargs) -> FUNC_RESULT:
+            if not _sampled():
+                return func(*args, **kwargs)
+            started_at, traced = _start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _finish(started_at, traced)
+
+        return tp.cast(TFunc, _inner)
+
+    return _timed
@@ -1,7 +1,12 @@
-from .consumers import BaseConsumer, BaseGarbageConsumer
+from .buffered_producer import BufferedProducer, OverflowPolicy
+from .claim_check import BlobStore, ClaimCheck, FileSystemBlobStore, load_body
+from .consumers import BaseConsumer, BaseGarbageConsumer, ShardedConsumer
+from .pools import HealthCheckedPool, PoolMetrics
 from .producers import (
     BaseProducer,
     BaseProducerMock,
+    PublishResult,
     get_rabbit_channel_pool,
     get_rabbit_connection_pool,
 )
+from .spool import DiskSpool, SpoolingProducer
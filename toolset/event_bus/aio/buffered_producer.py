@@ -0,0 +1,164 @@
+import asyncio
+import typing as tp
+from collections import deque
+from enum import Enum
+
+import structlog
+
+from toolset.event_bus.aio.producers import PUBLISH_ITEM, BaseProducer
+from toolset.typing_helpers import JSON
+
+logger = structlog.get_logger("toolset.event_bus.buffered_producer")
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+
+class OverflowPolicy(str, Enum):  # noqa: WPS600 subclassing builtin
+    """What to do with a new message when buffer is full."""
+
+    block = "block"
+    drop_new = "drop_new"
+    drop_oldest = "drop_oldest"
+
+
+class BufferedProducer:
+    """
+    Producer which publishes messages in background.
+
+    Wraps BaseProducer: .publish() puts a message into bounded in-memory buffer
+    and returns immediately, messages are published by background task in batches
+    (when batch_size messages are buffered or every flush_interval seconds).
+    Messages dropped on overflow are counted in `dropped`, messages which couldn't be
+    published in `failed`.
+
+    """
+
+    def __init__(
+        self,
+        producer: BaseProducer,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        overflow_policy: OverflowPolicy = OverflowPolicy.block,
+    ):
+        """
+        Define buffer params.
+
+        Parameters:
+            producer: producer used to publish batches
+            buffer_size: max number of messages waiting for publishing
+            batch_size: max number of messages published at once
+            flush_interval: max time in seconds message waits in buffer
+            overflow_policy: block publisher, drop new or drop oldest message if buffer is full
+
+        """
+        self.producer = producer
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self.failed = 0
+
+        self._buffer: tp.Deque[PUBLISH_ITEM] = deque()
+        self._batch_ready = asyncio.Event()
+        self._not_full = asyncio.Event()
+        # public and background flushes publish batches one by one to keep their order
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: tp.Optional["asyncio.Task[None]"] = None
+        self._stopping = False
+
+    @property
+    def buffered(self) -> int:
+        """Number of messages waiting for publishing."""
+        return len(self._buffer)
+
+    def start(self) -> None:
+        """Start background flushing (called on first publish if not started)."""
+        if self._flush_task is None:
+            self._stopping = False
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def publish(self, routing_key: str, data: JSON) -> None:
+        """Put message into buffer."""
+        self.start()
+        if len(self._buffer) >= self.buffer_size:
+            if self.overflow_policy == OverflowPolicy.drop_new:
+                self._drop("Buffer is full, message dropped", routing_key)
+                return
+            elif self.overflow_policy == OverflowPolicy.drop_oldest:
+                dropped_key, _ = self._buffer.popleft()
+                self._drop("Buffer is full, oldest message dropped", dropped_key)
+            else:
+                await self._wait_for_space()
+
+        self._buffer.append((routing_key, data))
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self) -> None:
+        """Publish all buffered messages."""
+        async with self._flush_lock:
+            while self._buffer:
+                batch_size = min(self.batch_size, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(batch_size)]
+                self._not_full.set()
+                try:
+                    await self._publish_batch(batch)
+                except asyncio.CancelledError:
+                    # return batch to buffer, it's published again by the next flush
+                    self._buffer.extendleft(reversed(batch))
+                    raise
+
+    async def teardown(self) -> None:
+        """Stop background flushing, publish buffered messages and close producer pools.
+
+        Background task finishes its current flush, it isn't cancelled in the middle of a batch.
+        """
+        if self._flush_task is not None:
+            self._stopping = True
+            self._batch_ready.set()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+        await self.producer.teardown()
+
+    async def _flush_periodically(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass  # noqa: WPS420 flush by time
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def _publish_batch(self, batch: tp.List[PUBLISH_ITEM]) -> None:
+        try:
+            results = await self.producer.publish_many(batch)
+        except Exception as exc:
+            self.failed += len(batch)
+            logger.error(
+                "Couldn't publish batch", size=len(batch), exc=str(exc), failed_total=self.failed,
+            )
+            return
+        failed = sum(not result.ok for result in results)
+        if failed:
+            self.failed += failed
+            logger.error(
+                "Some messages were not published",
+                size=len(batch),
+                failed=failed,
+                failed_total=self.failed,
+            )
+
+    async def _wait_for_space(self) -> None:
+        while len(self._buffer) >= self.buffer_size:
+            self._not_full.clear()
+            self._batch_ready.set()
+            await self._not_full.wait()
+
+    def _drop(self, event: str, routing_key: str) -> None:
+        self.dropped += 1
+        logger.warning(event, routing_key=routing_key, dropped=self.dropped)
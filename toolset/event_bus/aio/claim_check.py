@@ -0,0 +1,99 @@
+import asyncio
+import json
+import typing as tp
+import uuid
+from pathlib import Path
+
+import structlog
+from typing_extensions import Protocol
+
+from toolset.typing_helpers import FUNC_RESULT, JSON
+
+logger = structlog.get_logger("toolset.event_bus.claim_check")
+
+CLAIM_CHECK_KEY = "claim_check"
+# offloaded messages are marked by header, so usual bodies can have any keys
+CLAIM_CHECK_HEADER = "x-claim-check"
+DEFAULT_CLAIM_CHECK_THRESHOLD = 128 * 1024
+
+
+class BlobStore(Protocol):
+    """Storage of message bodies offloaded from broker."""
+
+    async def put(self, body: bytes) -> str:
+        """Store body, return reference to it."""
+
+    async def get(self, ref: str) -> bytes:
+        """Get body by reference."""
+
+    async def delete(self, ref: str) -> None:
+        """Delete body by reference."""
+
+
+class FileSystemBlobStore:
+    """Blob store keeping bodies in local (or mounted shared) directory."""
+
+    def __init__(self, directory: tp.Union[str, Path]) -> None:
+        """Init."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def put(self, body: bytes) -> str:
+        """Store body, return reference to it."""
+        ref = uuid.uuid4().hex
+        await self._run(self._get_path(ref).write_bytes, body)
+        return ref
+
+    async def get(self, ref: str) -> bytes:
+        """Get body by reference."""
+        return await self._run(self._get_path(ref).read_bytes)
+
+    async def delete(self, ref: str) -> None:
+        """Delete body by reference."""
+        try:
+            await self._run(self._get_path(ref).unlink)
+        except FileNotFoundError:
+            logger.debug("Blob already deleted", ref=ref)
+
+    def _get_path(self, ref: str) -> Path:
+        if not ref.isalnum():
+            raise ValueError(f"Invalid blob reference: {ref!r}")
+        return self.directory / ref
+
+    async def _run(self, func: tp.Callable[..., FUNC_RESULT], *args) -> FUNC_RESULT:
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+
+class ClaimCheck:
+    """
+    Message body stored in blob store.
+
+    Consumer passes it to callback instead of message body, body is fetched on .load().
+    """
+
+    def __init__(self, ref: str, blob_store: BlobStore) -> None:
+        """Init."""
+        self.ref = ref
+        self._blob_store = blob_store
+        self._body: tp.Optional[JSON] = None
+
+    async def load(self) -> JSON:
+        """Fetch message body from blob store."""
+        if self._body is None:
+            self._body = json.loads(await self._blob_store.get(self.ref))
+        return self._body
+
+
+def get_claim_check_ref(headers: tp.Optional[tp.Mapping[str, tp.Any]]) -> tp.Optional[str]:
+    """Get reference to body in blob store from headers of offloaded message, None for others."""
+    ref = (headers or {}).get(CLAIM_CHECK_HEADER)
+    if isinstance(ref, bytes):
+        ref = ref.decode()
+    return ref if isinstance(ref, str) else None
+
+
+async def load_body(message_body: tp.Union[JSON, ClaimCheck]) -> JSON:
+    """Get message body passed to consumer callback, fetch it from blob store if needed."""
+    if isinstance(message_body, ClaimCheck):
+        return await message_body.load()
+    return message_body
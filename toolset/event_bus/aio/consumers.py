@@ -9,7 +9,14 @@ from aio_pika import DeliveryMode, Exchange, ExchangeType
 from structlog import get_logger
 from typing_extensions import Protocol
 
+from toolset.event_bus.aio.claim_check import (
+    CLAIM_CHECK_HEADER,
+    BlobStore,
+    ClaimCheck,
+    get_claim_check_ref,
+)
 from toolset.event_bus.constants import GARBAGE_QUEUE_SUFFIX, POST_RETRY_EXCHANGE_SUFFIX
+from toolset.event_bus.sharding import assign_shards, shard_queue_name, sharded_routing_key
 from toolset.typing_helpers import JSON
 
 logger = get_logger("toolset.event_bus.consumers")
@@ -105,7 +112,13 @@ class BaseConsumer(BaseClient):
     queue: aio_pika.Queue
 
     def __init__(
-        self, queue_name: str, durable: bool = True, requeue_msg: bool = True, delay: int = 0,
+        self,
+        queue_name: str,
+        durable: bool = True,
+        requeue_msg: bool = True,
+        delay: int = 0,
+        blob_store: tp.Optional[BlobStore] = None,
+        delete_blobs: bool = True,
     ):
         """
         Define consumer params.
@@ -115,6 +128,10 @@ class BaseConsumer(BaseClient):
             durable: if set to True - queue survive broker restart
             requeue_msg: send message back to queue if consumer close unexpectedly
             delay: delay in seconds before processing unexpected exception
+            blob_store: store of offloaded message bodies, if provided callback receives
+                ClaimCheck instead of offloaded message body
+            delete_blobs: delete offloaded body after message processed
+                (set to False if message is consumed by several queues)
 
         It is prohibited to change params of existing queue.
         Queue params: durable.
@@ -125,6 +142,8 @@ class BaseConsumer(BaseClient):
         self._requeue_msg = requeue_msg
         self._queue_name = queue_name
         self._delay = delay
+        self._blob_store = blob_store
+        self._delete_blobs = delete_blobs
         self.bindings = {}
 
     def bind(self, exchange_name: str, routing_keys: tp.Iterable[str]):
@@ -217,7 +236,11 @@ class BaseConsumer(BaseClient):
                 return
 
             try:
-                await callback(message_body, message.routing_key, **context)
+                await callback(
+                    self._get_callback_body(message, message_body),
+                    message.routing_key,
+                    **context,
+                )
 
             except Exception as exc:
                 logger.error("Couldn't process message", exc=str(exc))
@@ -225,6 +248,24 @@ class BaseConsumer(BaseClient):
                 return
 
             message.ack()
+            await self._delete_blob(message)
+
+    def _get_callback_body(
+        self, message: aio_pika.IncomingMessage, message_body: JSON,
+    ) -> tp.Union[JSON, ClaimCheck]:
+        ref = get_claim_check_ref(message.headers)
+        if self._blob_store is not None and ref is not None:
+            return ClaimCheck(ref, self._blob_store)
+        return message_body
+
+    async def _delete_blob(self, message: aio_pika.IncomingMessage) -> None:
+        ref = get_claim_check_ref(message.headers)
+        if self._blob_store is None or not self._delete_blobs or ref is None:
+            return
+        try:
+            await self._blob_store.delete(ref)
+        except Exception as exc:
+            logger.error("Couldn't delete offloaded message body", exc=str(exc))
 
     async def _process_unexpected_exception(
         self, message: aio_pika.IncomingMessage, exc: Exception,
@@ -233,6 +274,73 @@ class BaseConsumer(BaseClient):
         message.nack(requeue=self._requeue_msg)
 
 
+class ShardedConsumer(BaseConsumer):
+    """
+    Consumer of sharded queues.
+
+    Declares queues `<queue_name>.<shard>` bound with `<routing_key>.<shard>` routing keys
+    for shards assigned to this consumer instance (see producer's `shards` attribute).
+    Shards are spread across instances: instance `i` of `n` consumes shards `i, i + n, ...`.
+
+    Messages of one shard are processed one by one in order of delivery,
+    shards are processed concurrently.
+
+    """
+
+    queues: tp.Dict[int, aio_pika.Queue]
+
+    def __init__(
+        self, queue_name: str, shards: int, instance: int = 0, instances: int = 1, **kwargs,
+    ):
+        """
+        Define sharding params.
+
+        Parameters:
+            queue_name: base name of the shard queues
+            shards: total number of shards
+            instance: index of this consumer instance (0..instances-1)
+            instances: total number of consumer instances
+
+        Other params are the same as BaseConsumer's.
+
+        """
+        super().__init__(queue_name, **kwargs)
+        self.shards = assign_shards(shards, instance, instances)
+        self.queues = {}
+
+    async def declare_main_queue(self) -> None:
+        """Declare queues of assigned shards."""
+        for shard in self.shards:
+            self.queues[shard] = await self.channel.declare_queue(  # type: ignore
+                shard_queue_name(self._queue_name, shard), durable=self._durable,
+            )
+
+    async def _bind_main_queue(self) -> None:
+        if not self.bindings:
+            raise ConsumerBaseException("At least one binding should be registered")
+        for shard, queue in self.queues.items():
+            for exchange_name, routing_keys in self.bindings.items():
+                await self._bind_queue(
+                    queue,
+                    exchange_name,
+                    [sharded_routing_key(routing_key, shard) for routing_key in routing_keys],
+                )
+
+    async def _listen_queue(self, callback: ProcessMessageFunctionType, context):
+        """Run consumer and get messages from every shard queue."""
+        await asyncio.gather(
+            *(self._listen_shard(queue, callback, context) for queue in self.queues.values()),
+        )
+
+    async def _listen_shard(
+        self, queue: aio_pika.Queue, callback: ProcessMessageFunctionType, context,
+    ) -> None:
+        async with queue.iterator() as queue_iter:
+            message: aio_pika.IncomingMessage
+            async for message in queue_iter:
+                await self._process_message(message, callback, context)
+
+
 class BaseGarbageConsumer(BaseConsumer):  # noqa: WPS214 too many methods
     """
     Consumer that stores failed messages in garbage queue.
@@ -245,6 +353,8 @@ class BaseGarbageConsumer(BaseConsumer):  # noqa: WPS214 too many methods
     If message rejected from garbage queue it goes back to the original queue
     for reprocessing.
 
+    Offloaded message bodies (claim checks) are moved to garbage queue as references.
+
     """
 
     exchange_name: str
@@ -309,8 +419,14 @@ class BaseGarbageConsumer(BaseConsumer):  # noqa: WPS214 too many methods
         body["error"] = repr(exc)
         body_bytes = json.dumps(body).encode()
 
+        # reference to offloaded body is kept, message is dead-lettered back with its headers
+        ref = get_claim_check_ref(message.headers)
         await exchange.publish(
-            aio_pika.Message(body_bytes, delivery_mode=DeliveryMode.PERSISTENT),
+            aio_pika.Message(
+                body_bytes,
+                delivery_mode=DeliveryMode.PERSISTENT,
+                headers={CLAIM_CHECK_HEADER: ref} if ref else None,
+            ),
             self._garbage_queue_name,
         )
         logger.info("Message moved to garbage queue")
@@ -0,0 +1,168 @@
+import asyncio
+import typing as tp
+from collections import deque
+
+import structlog
+from aio_pika.pool import Pool, PoolInvalidStateError
+
+logger = structlog.get_logger("toolset.event_bus.pools")
+
+T = tp.TypeVar("T")
+
+
+class PoolMetrics(tp.NamedTuple):
+    """Pool metrics snapshot."""
+
+    size: int
+    idle: int
+    in_use: int
+    evictions: int
+    acquired: int
+    acquire_wait_total: float
+    acquire_wait_max: float
+
+
+def _is_open(item: tp.Any) -> bool:  # type: ignore
+    return not item.is_closed
+
+
+class HealthCheckedPool(Pool[T]):
+    """
+    Pool of rabbit connections or channels.
+
+    Drop-in replacement for aio_pika Pool, which also:
+    - checks item on acquire and evicts closed ones
+    - can create items in advance (.prewarm())
+    - can share items in round-robin (.share()), e.g. to spread channels across connections
+    - collects metrics (.metrics)
+
+    """
+
+    def __init__(
+        self,
+        constructor: tp.Callable[[], tp.Awaitable[T]],
+        max_size: int,
+        is_alive: tp.Callable[[T], bool] = _is_open,
+    ) -> None:
+        """
+        Init pool.
+
+        Parameters:
+            constructor: coroutine function creating a new item
+            max_size: max number of items
+            is_alive: function checking item is usable
+
+        """
+        super().__init__(constructor, max_size=max_size)
+        self._constructor = constructor
+        self._max_size = max_size
+        self._is_alive = is_alive
+
+        self._items: tp.List[T] = []
+        self._idle: tp.Deque[T] = deque()
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._create_lock = asyncio.Lock()
+        self._next_shared = 0
+
+        self._in_use = 0
+        self._evictions = 0
+        self._acquired = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        """Get pool metrics."""
+        return PoolMetrics(
+            size=len(self._items),
+            idle=len(self._idle),
+            in_use=self._in_use,
+            evictions=self._evictions,
+            acquired=self._acquired,
+            acquire_wait_total=self._acquire_wait_total,
+            acquire_wait_max=self._acquire_wait_max,
+        )
+
+    async def prewarm(self, count: int) -> None:
+        """Create up to `count` items in advance."""
+        count = min(count, self._max_size) - len(self._items)
+        if count > 0:
+            self._idle.extend(await asyncio.gather(*(self._create() for _ in range(count))))
+            logger.debug("Pool prewarmed", size=len(self._items))
+
+    async def share(self) -> T:
+        """
+        Get item without acquiring it exclusively.
+
+        New items are created until max_size is reached, then existing items are
+        returned in round-robin. Use it for items which can be used concurrently (connections).
+        """
+        self._evict_closed()
+        async with self._create_lock:
+            if len(self._items) < self._max_size:
+                item = await self._create()
+                self._idle.append(item)
+                return item
+        self._next_shared = (self._next_shared + 1) % len(self._items)
+        return self._items[self._next_shared]
+
+    def put(self, item: T) -> None:
+        """Return acquired item to pool."""
+        if self._is_alive(item) and not self.is_closed:
+            self._idle.append(item)
+        else:
+            self._evict(item)
+        self._in_use -= 1
+        self._semaphore.release()
+
+    async def close(self) -> None:
+        """Close pool and all its items."""
+        await super().close()
+        items, self._items = self._items, []
+        self._idle.clear()
+        await asyncio.gather(*(item.close() for item in items), return_exceptions=True)  # type: ignore
+
+    async def _get(self) -> T:
+        if self.is_closed:
+            raise PoolInvalidStateError("get operation on closed pool")
+
+        loop = asyncio.get_event_loop()
+        started_at = loop.time()
+        await self._semaphore.acquire()
+        wait = loop.time() - started_at
+        self._acquired += 1
+        self._acquire_wait_total += wait
+        self._acquire_wait_max = max(self._acquire_wait_max, wait)
+
+        try:
+            item = await self._take()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self._in_use += 1
+        return item
+
+    async def _take(self) -> T:
+        while self._idle:
+            item = self._idle.popleft()
+            if self._is_alive(item):
+                return item
+            self._evict(item)
+        return await self._create()
+
+    async def _create(self) -> T:
+        item = await self._constructor()
+        self._items.append(item)
+        return item
+
+    def _evict_closed(self) -> None:
+        for item in [item for item in self._items if not self._is_alive(item)]:
+            self._evict(item)
+
+    def _evict(self, item: T) -> None:
+        if item in self._items:
+            self._items.remove(item)
+            self._evictions += 1
+            logger.warning("Closed item evicted from pool", item=repr(item))
+        if item in self._idle:
+            self._idle.remove(item)
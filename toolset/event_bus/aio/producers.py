@@ -1,64 +1,137 @@
+import asyncio
 import json
+import typing as tp
+import weakref
 
 import aio_pika
+import aiormq
 import structlog
 from aio_pika.pool import Pool
 
+from toolset.event_bus.aio.claim_check import (
+    CLAIM_CHECK_HEADER,
+    CLAIM_CHECK_KEY,
+    DEFAULT_CLAIM_CHECK_THRESHOLD,
+    BlobStore,
+)
+from toolset.event_bus.aio.pools import HealthCheckedPool
+from toolset.event_bus.sharding import route_to_shard
 from toolset.typing_helpers import JSON
 
 logger = structlog.get_logger("toolset.event_bus.producers")
 DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_IN_FLIGHT = 100
+
+PUBLISH_ITEM = tp.Tuple[str, JSON]
+PUBLISH_ITEMS = tp.Union[tp.Iterable[PUBLISH_ITEM], tp.AsyncIterable[PUBLISH_ITEM]]
+
+
+class PublishResult(tp.NamedTuple):
+    """Outcome of single message publishing."""
+
+    routing_key: str
+    exception: tp.Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Message published successfully."""
+        return self.exception is None
 
 
 async def get_rabbit_channel_pool(
-    pool: Pool[aio_pika.Connection], max_size: int = 10,
-) -> Pool[aio_pika.Channel]:
-    """Get rabbit channel pool."""
+    pool: Pool[aio_pika.Connection], max_size: int = 10, prewarm: int = 0,
+) -> HealthCheckedPool[aio_pika.Channel]:
+    """
+    Get rabbit channel pool.
+
+    Closed channels are evicted from pool on acquire.
+    If connection pool is HealthCheckedPool, channels are spread across its connections.
+    Set `prewarm` to open channels (and connections) in advance.
+    """
 
     async def get_rabbit_channel() -> aio_pika.Channel:
         """Get rabbit channel."""
         connection: aio_pika.Connection
+        if isinstance(pool, HealthCheckedPool):
+            connection = await pool.share()
+            return await connection.channel()
         async with pool.acquire() as connection:
             return await connection.channel()
 
-    return Pool(get_rabbit_channel, max_size=max_size)
+    channel_pool: HealthCheckedPool[aio_pika.Channel] = HealthCheckedPool(
+        get_rabbit_channel, max_size=max_size,
+    )
+    await channel_pool.prewarm(prewarm)
+    return channel_pool
 
 
 async def get_rabbit_connection_pool(
-    host: str, port: int, user: str, password: str, max_size: int = 2,
-) -> Pool[aio_pika.Connection]:
-    """Get rabbit connection pool."""
+    host: str, port: int, user: str, password: str, max_size: int = 2, prewarm: int = 0,
+) -> HealthCheckedPool[aio_pika.Connection]:
+    """
+    Get rabbit connection pool.
+
+    Closed connections are evicted from pool on acquire.
+    Set `prewarm` to open connections in advance.
+    """
 
     async def get_rabbit_connection() -> aio_pika.RobustConnection:
         """Get rabbit connection."""
         return await aio_pika.connect_robust(host=host, port=port, login=user, password=password)
 
-    return Pool(get_rabbit_connection, max_size=max_size)
+    connection_pool: HealthCheckedPool[aio_pika.Connection] = HealthCheckedPool(
+        get_rabbit_connection, max_size=max_size,
+    )
+    await connection_pool.prewarm(prewarm)
+    return connection_pool
 
 
 class BaseProducer:
     """Class to work with rabbitmq."""
 
     exchange_name: str
-
-    _exchange: aio_pika.Exchange
+    # set to True if exchange is declared elsewhere and known to exist
+    skip_exchange_declaration: bool = False
+    # if set, messages are routed to `<routing_key>.<shard>` by hash of data[shard_key]
+    shards: int = 0
+    shard_key: str = "id"
 
     def __init__(
         self,
         connection_pool: Pool[aio_pika.Connection],
         channel_pool: Pool[aio_pika.Channel],
         timeout: int = DEFAULT_TIMEOUT,
+        blob_store: tp.Optional[BlobStore] = None,
+        claim_check_threshold: int = DEFAULT_CLAIM_CHECK_THRESHOLD,
     ):
-        """Init."""
+        """
+        Init.
+
+        If blob_store is provided, bodies larger than claim_check_threshold bytes
+        are stored in it and message carries only the reference (claim check).
+        """
         self._connection_pool = connection_pool
         self._channel_pool = channel_pool
         self.timeout = timeout
+        self.blob_store = blob_store
+        self.claim_check_threshold = claim_check_threshold
+        # channel -> (underlying aiormq channel, exchange declared on it)
+        self._exchanges: tp.MutableMapping[
+            aio_pika.Channel, tp.Tuple[aiormq.Channel, aio_pika.Exchange],
+        ] = weakref.WeakKeyDictionary()
 
     async def get_exchange(self, channel: aio_pika.Channel) -> aio_pika.Exchange:
-        """Get exchange (declare if needed)."""
-        return await channel.declare_exchange(
-            self.exchange_name, type=aio_pika.ExchangeType.TOPIC, durable=True,
-        )
+        """
+        Get exchange (declare if needed).
+
+        Exchange is declared once per channel and cached.
+        It is declared again only if the underlying channel was recreated.
+        """
+        cached = self._exchanges.get(channel)
+        if cached is None or cached[0] is not channel.channel:
+            cached = (channel.channel, await self._declare_exchange(channel))
+            self._exchanges[channel] = cached
+        return cached[1]
 
     async def teardown(self) -> None:
         """Close pools."""
@@ -70,9 +143,109 @@ class BaseProducer:
         channel: aio_pika.Channel
         async with self._channel_pool.acquire() as channel:
             exchange = await self.get_exchange(channel)
+            await self._publish_message(exchange, routing_key, data)
+
+    async def publish_many(
+        self, items: PUBLISH_ITEMS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> tp.List[PublishResult]:
+        """
+        Publish many messages using single channel.
+
+        Parameters:
+            items: iterable or async iterable of (routing_key, data) pairs
+            max_in_flight: max number of messages being published concurrently
+
+        Failed messages don't stop publishing, result for every item
+        is returned in the order of items.
+
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+        tasks: tp.List[tp.Awaitable[PublishResult]] = []
+        channel: aio_pika.Channel
+        async with self._channel_pool.acquire() as channel:
+            exchange = await self.get_exchange(channel)
+            try:
+                async for routing_key, data in iterate_items(items):
+                    await semaphore.acquire()
+                    tasks.append(
+                        asyncio.ensure_future(
+                            self._publish_item(exchange, routing_key, data, semaphore),
+                        ),
+                    )
+            finally:
+                # wait for messages in flight before channel is returned to pool
+                results = await asyncio.gather(*tasks)
+        failed = sum(not result.ok for result in results)
+        logger.debug("Messages published", total=len(results), failed=failed)
+        return results
+
+    def get_routing_key(self, routing_key: str, data: JSON) -> str:
+        """Get routing key of message (routing key of shard if sharding is enabled)."""
+        if self.shards:
+            return route_to_shard(routing_key, data, self.shard_key, self.shards)
+        return routing_key
+
+    def encode(self, data: JSON) -> bytes:
+        """Encode data to message body."""
+        return json.dumps(data).encode()
+
+    def decode(self, body: bytes) -> JSON:
+        """Decode message body encoded with .encode()."""
+        return json.loads(body)
+
+    async def _publish_message(
+        self, exchange: aio_pika.Exchange, routing_key: str, data: JSON,
+    ) -> None:
+        """Publish message, offloaded body is deleted from blob store if publishing failed."""
+        body = self.encode(data)
+        ref: tp.Optional[str] = None
+        if self.blob_store is not None and len(body) > self.claim_check_threshold:
+            ref = await self.blob_store.put(body)
+            body = self.encode({CLAIM_CHECK_KEY: ref})
+        try:
             await exchange.publish(
-                aio_pika.Message(json.dumps(data).encode()), routing_key, timeout=self.timeout,
+                aio_pika.Message(body, headers={CLAIM_CHECK_HEADER: ref} if ref else None),
+                self.get_routing_key(routing_key, data),
+                timeout=self.timeout,
             )
+        except asyncio.TimeoutError:
+            # message may be routed already, its body is kept for consumer
+            if ref is not None:
+                logger.warning("Publishing timed out, offloaded body is kept", ref=ref)
+            raise
+        except Exception:
+            if ref is not None:
+                await self._delete_blob(ref)
+            raise
+
+    async def _delete_blob(self, ref: str) -> None:
+        try:
+            await tp.cast(BlobStore, self.blob_store).delete(ref)
+        except Exception as exc:
+            logger.error("Couldn't delete offloaded message body", ref=ref, exc=str(exc))
+
+    async def _publish_item(
+        self,
+        exchange: aio_pika.Exchange,
+        routing_key: str,
+        data: JSON,
+        semaphore: asyncio.Semaphore,
+    ) -> PublishResult:
+        try:
+            await self._publish_message(exchange, routing_key, data)
+        except Exception as exc:
+            logger.error("Couldn't publish message", routing_key=routing_key, exc=str(exc))
+            return PublishResult(routing_key, exc)
+        finally:
+            semaphore.release()
+        return PublishResult(routing_key)
+
+    async def _declare_exchange(self, channel: aio_pika.Channel) -> aio_pika.Exchange:
+        if self.skip_exchange_declaration:
+            return await channel.get_exchange(self.exchange_name, ensure=False)
+        return await channel.declare_exchange(
+            self.exchange_name, type=aio_pika.ExchangeType.TOPIC, durable=True,
+        )
 
 
 class BaseProducerMock:
@@ -84,3 +257,21 @@ class BaseProducerMock:
     async def publish(self, *args, **kwargs) -> None:
         """Publish data to rabbit."""
         logger.info("Publish called", args=args, kwargs=kwargs)
+
+    async def publish_many(self, items: PUBLISH_ITEMS, **kwargs) -> tp.List[PublishResult]:
+        """Publish many messages to rabbit."""
+        results = []
+        async for routing_key, data in iterate_items(items):
+            logger.info("Publish called", args=(routing_key, data), kwargs=kwargs)
+            results.append(PublishResult(routing_key))
+        return results
+
+
+async def iterate_items(items: PUBLISH_ITEMS) -> tp.AsyncIterator[PUBLISH_ITEM]:
+    """Iterate over sync or async iterable."""
+    if isinstance(items, tp.AsyncIterable):
+        async for async_item in items:
+            yield async_item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,297 @@
+import asyncio
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import structlog
+
+from toolset.event_bus.aio.producers import (
+    PUBLISH_ITEM,
+    PUBLISH_ITEMS,
+    BaseProducer,
+    PublishResult,
+    iterate_items,
+)
+from toolset.typing_helpers import JSON
+
+logger = structlog.get_logger("toolset.event_bus.spool")
+
+SEGMENT_SUFFIX = ".spool"
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+DEFAULT_SPOOL_MAX_SIZE = 256 * 1024 * 1024
+DEFAULT_REPLAY_BATCH_SIZE = 100
+DEFAULT_REPLAY_INTERVAL = 5
+
+SPOOL_ENTRY = tp.Tuple[str, bytes]
+T = tp.TypeVar("T")
+
+
+class DiskSpool:
+    """
+    Append-only local storage of messages split into segment files.
+
+    Every line of segment is `<routing_key>\\t<message body>`.
+    When spool exceeds max_size, the oldest segments are deleted.
+    Segments are named by their number, other `*.spool` files in directory are ignored.
+    Methods do blocking file I/O, SpoolingProducer calls them in its own thread.
+
+    """
+
+    def __init__(
+        self,
+        directory: tp.Union[str, Path],
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_size: int = DEFAULT_SPOOL_MAX_SIZE,
+    ) -> None:
+        """
+        Open spool, segments left from previous run are picked up.
+
+        Parameters:
+            directory: directory to store segment files in
+            segment_size: size in bytes after which new segment is started
+            max_size: max size of all segments in bytes
+
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.max_size = max_size
+        self.dropped_segments = 0
+
+        # segment path -> size, the oldest first
+        paths = [
+            path for path in self.directory.glob(f"*{SEGMENT_SUFFIX}") if path.stem.isdigit()
+        ]
+        self._segments: tp.Dict[Path, int] = {
+            path: path.stat().st_size for path in sorted(paths, key=lambda path: int(path.stem))
+        }
+        self._next_number = int(next(reversed(self._segments)).stem) + 1 if self._segments else 0
+        self._active_path: tp.Optional[Path] = None
+        self._active: tp.Optional[tp.BinaryIO] = None
+
+    @property
+    def pending(self) -> bool:
+        """Spool has messages."""
+        return bool(self._segments)
+
+    @property
+    def size(self) -> int:
+        """Size of all segments in bytes."""
+        return sum(self._segments.values())
+
+    def append(self, routing_key: str, body: bytes) -> None:
+        """Append message to the newest segment."""
+        if self._active is None:
+            self._open_segment()
+        active = tp.cast(tp.BinaryIO, self._active)
+        path = tp.cast(Path, self._active_path)
+
+        line = b"%s\t%s\n" % (routing_key.encode(), body)
+        active.write(line)
+        active.flush()
+        self._segments[path] += len(line)
+
+        if self._segments[path] >= self.segment_size:
+            self._seal()
+        self._enforce_max_size()
+
+    def oldest(self) -> tp.Optional[Path]:
+        """Get the oldest segment, it's sealed if messages are still appended to it."""
+        if not self._segments:
+            return None
+        path = next(iter(self._segments))
+        if path == self._active_path:
+            self._seal()
+        return path
+
+    def read(self, path: Path) -> tp.List[SPOOL_ENTRY]:
+        """Read all messages of segment."""
+        entries: tp.List[SPOOL_ENTRY] = []
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return entries
+        for line in content.splitlines():
+            routing_key, separator, body = line.partition(b"\t")
+            if separator:
+                entries.append((routing_key.decode(), body))
+        return entries
+
+    def remove(self, path: Path) -> None:
+        """Remove segment."""
+        if path == self._active_path:
+            self._seal()
+        self._segments.pop(path, None)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            logger.debug("Segment already removed", path=str(path))
+
+    def close(self) -> None:
+        """Close the newest segment."""
+        self._seal()
+
+    def _open_segment(self) -> None:
+        self._active_path = self.directory / f"{self._next_number:020d}{SEGMENT_SUFFIX}"
+        self._next_number += 1
+        self._active = self._active_path.open("ab")
+        self._segments[self._active_path] = 0
+
+    def _seal(self) -> None:
+        if self._active is not None:
+            self._active.close()
+        self._active = None
+        self._active_path = None
+
+    def _enforce_max_size(self) -> None:
+        while self.size > self.max_size and len(self._segments) > 1:
+            path = next(iter(self._segments))
+            self.remove(path)
+            self.dropped_segments += 1
+            logger.warning("Spool is full, the oldest segment dropped", path=str(path))
+
+
+class SpoolingProducer:
+    """
+    Producer which stores messages on disk while broker is unavailable.
+
+    Wraps BaseProducer: if message couldn't be published it's appended to DiskSpool
+    and .publish() doesn't raise. Background task republishes spooled messages in order.
+    While spool has messages, new messages are appended to it too, to keep the order.
+    Call .setup() on startup of app to republish messages spooled by previous run,
+    otherwise replay is started by the first publish.
+    Spool files are written and read in a dedicated thread, not to block event loop.
+
+    """
+
+    def __init__(
+        self,
+        producer: BaseProducer,
+        spool: DiskSpool,
+        batch_size: int = DEFAULT_REPLAY_BATCH_SIZE,
+        replay_interval: float = DEFAULT_REPLAY_INTERVAL,
+    ) -> None:
+        """
+        Define spool params.
+
+        Parameters:
+            producer: producer used to publish messages
+            spool: storage for messages which couldn't be published
+            batch_size: max number of spooled messages republished at once
+            replay_interval: seconds between attempts to republish spooled messages
+
+        """
+        self.producer = producer
+        self.spool = spool
+        self.batch_size = batch_size
+        self.replay_interval = replay_interval
+
+        self._replay_task: tp.Optional["asyncio.Task[None]"] = None
+        self._replay_path: tp.Optional[Path] = None
+        self._replay_offset = 0
+        # single thread keeps order of spool operations
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+
+    async def setup(self) -> None:
+        """Start replay of messages spooled by previous run, call it on startup of app."""
+        self.start()
+
+    def start(self) -> None:
+        """Start background replay (called on first publish if not started)."""
+        if self._replay_task is None:
+            self._replay_task = asyncio.create_task(self._replay_periodically())
+
+    async def publish(self, routing_key: str, data: JSON) -> None:
+        """Publish data to rabbit or store it in spool."""
+        self.start()
+        if self.spool.pending:
+            await self._spool(routing_key, data)
+            return
+        try:
+            await self.producer.publish(routing_key, data)
+        except Exception as exc:
+            logger.warning(
+                "Couldn't publish message, spooled", routing_key=routing_key, exc=str(exc),
+            )
+            await self._spool(routing_key, data)
+
+    async def publish_many(self, items: PUBLISH_ITEMS, **kwargs) -> tp.List[PublishResult]:
+        """
+        Publish many messages to rabbit, store failed ones in spool.
+
+        Spooled messages are reported as published.
+        """
+        self.start()
+        messages = [message async for message in iterate_items(items)]
+        if self.spool.pending:
+            return [await self._spool(routing_key, data) for routing_key, data in messages]
+        try:
+            results = await self.producer.publish_many(messages, **kwargs)
+        except Exception as exc:
+            logger.warning("Couldn't publish messages, spooled", size=len(messages), exc=str(exc))
+            return [await self._spool(routing_key, data) for routing_key, data in messages]
+        return [
+            result if result.ok else await self._spool(routing_key, data)
+            for (routing_key, data), result in zip(messages, results)
+        ]
+
+    async def replay(self) -> None:
+        """Republish spooled messages in order until spool is empty or publishing fails."""
+        path = await self._run(self.spool.oldest)
+        while path is not None:
+            if path != self._replay_path:
+                self._replay_path, self._replay_offset = path, 0
+            messages = self._decode(await self._run(self.spool.read, path))
+            while self._replay_offset < len(messages):
+                batch = messages[self._replay_offset : self._replay_offset + self.batch_size]
+                published = await self._publish_batch(batch)
+                self._replay_offset += published
+                if published < len(batch):
+                    return
+            await self._run(self.spool.remove, path)
+            logger.info("Spooled messages republished", count=len(messages))
+            path = await self._run(self.spool.oldest)
+
+    async def teardown(self) -> None:
+        """Stop background replay, close spool and producer pools."""
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+            self._replay_task = None
+        await self._run(self.spool.close)
+        self._executor.shutdown()
+        await self.producer.teardown()
+
+    async def _replay_periodically(self) -> None:
+        while True:  # noqa: WPS457 infinite loop
+            await self.replay()
+            await asyncio.sleep(self.replay_interval)
+
+    async def _publish_batch(self, batch: tp.List[PUBLISH_ITEM]) -> int:
+        """Publish batch, return number of messages published before the first failed one."""
+        try:
+            results = await self.producer.publish_many(batch)
+        except Exception as exc:
+            logger.debug("Couldn't republish spooled messages", exc=str(exc))
+            return 0
+        for index, result in enumerate(results):
+            if not result.ok:
+                return index
+        return len(results)
+
+    async def _spool(self, routing_key: str, data: JSON) -> PublishResult:
+        await self._run(self.spool.append, routing_key, self.producer.encode(data))
+        return PublishResult(routing_key)
+
+    async def _run(self, func: tp.Callable[..., T], *args: tp.Any) -> T:  # type: ignore
+        """Call spool method in spool thread."""
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    def _decode(self, entries: tp.List[SPOOL_ENTRY]) -> tp.List[PUBLISH_ITEM]:
+        messages: tp.List[PUBLISH_ITEM] = []
+        for routing_key, body in entries:
+            try:
+                messages.append((routing_key, self.producer.decode(body)))
+            except ValueError:
+                logger.error("Spooled message decoding failed, skipped", routing_key=routing_key)
+        return messages
@@ -1,4 +1,7 @@
 from .base import BaseMessageBus
 from .consumers.base import BaseConsumer
 from .consumers.garbage_consumer import GarbageConsumer
+from .consumers.sharded_consumer import ShardedConsumer
+from .encoders import FastJSONEncoder
 from .producers import BaseProducer, ConnectionMock
+from .select_transport import OverflowPolicy, PendingQueueFullError, SelectConsumer, SelectProducer
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class EventBusConfig(AppConfig):
+    """Add `toolset.event_bus.django` to INSTALLED_APPS to use event bus management commands."""
+
+    name = "toolset.event_bus.django"
+    label = "toolset_event_bus"
+    verbose_name = "Event bus"
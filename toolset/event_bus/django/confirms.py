@@ -0,0 +1,101 @@
+import time
+import typing as tp
+
+import pika
+import structlog
+from pika.frame import Method
+from pika.spec import Basic
+
+logger = structlog.get_logger("toolset.event_bus.confirms")
+
+DEFAULT_CONFIRM_TIMEOUT = 30
+
+# exchange, routing key, encoded body
+Message = tp.Tuple[str, str, bytes]
+
+
+class ConfirmTracker:
+    """Delivery tags of messages waiting for publisher confirms."""
+
+    def __init__(self) -> None:
+        """Init."""
+        # delivery tag -> index of message
+        self.pending: tp.Dict[int, int] = {}
+        self.nacked: tp.List[int] = []
+        self.selected = False
+        self._delivery_tag = 0
+
+    def add(self, index: int) -> None:
+        """Register published message, delivery tags are numbered by channel from 1."""
+        self._delivery_tag += 1
+        self.pending[self._delivery_tag] = index
+
+    def on_select_ok(self, _: tp.Any) -> None:  # type: ignore
+        """Confirm mode is on."""
+        self.selected = True
+
+    def on_confirm(self, frame: Method) -> None:
+        """Handle Basic.Ack or Basic.Nack of one or several messages."""
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self.pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        for tag in tags:
+            index = self.pending.pop(tag, None)
+            if index is not None and isinstance(method, Basic.Nack):
+                self.nacked.append(index)
+
+
+def publish_confirmed(
+    connection: pika.BlockingConnection,
+    messages: tp.Sequence[Message],
+    properties: pika.BasicProperties,
+    timeout: float = DEFAULT_CONFIRM_TIMEOUT,
+) -> tp.List[int]:
+    """
+    Publish messages through a new channel in confirm mode, wait once for all confirms.
+
+    Messages are sent without waiting for each confirm (BlockingChannel in confirm mode
+    waits for every message), so broker confirms them in batches.
+
+    @param connection: open connection
+    @param messages: messages to publish
+    @param properties: properties of messages
+    @param timeout: max seconds to wait for confirms
+    @return: sorted indexes of messages nacked by broker or not confirmed in time
+    """
+    channel = connection.channel()
+    # underlying asynchronous channel, its callbacks are run by connection.process_data_events
+    impl = channel._impl  # noqa: WPS437 blocking channel has no pipelined confirms
+    tracker = ConfirmTracker()
+    deadline = time.monotonic() + timeout
+    try:
+        impl.confirm_delivery(ack_nack_callback=tracker.on_confirm, callback=tracker.on_select_ok)
+        _wait(connection, lambda: tracker.selected, deadline)
+        if not tracker.selected:
+            logger.error("Confirm mode is not turned on in time")
+            return list(range(len(messages)))
+        for index, (exchange, routing_key, body) in enumerate(messages):
+            tracker.add(index)
+            impl.basic_publish(exchange, routing_key, body, properties)
+        _wait(connection, lambda: not tracker.pending, deadline)
+    finally:
+        if channel.is_open:
+            channel.close()
+
+    if tracker.nacked:
+        logger.error("Messages are nacked by broker", count=len(tracker.nacked))
+    if tracker.pending:
+        logger.error("Messages are not confirmed in time", count=len(tracker.pending))
+    return sorted([*tracker.nacked, *tracker.pending.values()])
+
+
+def _wait(
+    connection: pika.BlockingConnection, is_ready: tp.Callable[[], bool], deadline: float,
+) -> None:
+    while not is_ready():
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            return
+        connection.process_data_events(time_limit=time_left)
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import typing as tp
+
+import pika
+import structlog
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
+
+logger = structlog.get_logger("toolset.event_bus.connection_pool")
+
+# broker closes connection which missed heartbeats and it's detected on reuse,
+# the limit only drops connections silently cut by network (e.g. by NAT or load balancer)
+DEFAULT_MAX_IDLE = 15 * 60
+
+
+class ThreadLocalChannelPool:
+    """
+    Process-wide pool of pika connections: one connection and channel per thread.
+
+    BlockingConnection is not thread-safe, so every thread gets its own one.
+    Connections inherited from parent process (after fork) are never used.
+    Before reuse connection processes pending events (heartbeats) and
+    it's recreated if it went stale or was idle longer than `max_idle` seconds.
+    """
+
+    def __init__(self, url_params: pika.URLParameters, max_idle: float = DEFAULT_MAX_IDLE) -> None:
+        """
+        Init pool.
+
+        Parameters:
+            url_params: connection params
+            max_idle: max seconds connection can be idle, it's independent of heartbeat
+
+        """
+        self.url_params = url_params
+        self.max_idle = max_idle
+        self._local = threading.local()
+
+    def get_channel(self) -> BlockingChannel:
+        """Get open channel of the current thread."""
+        channel: tp.Optional[BlockingChannel] = getattr(self._local, "channel", None)
+        if channel is None or getattr(self._local, "pid", None) != os.getpid():
+            return self._connect()
+        if not self._is_alive():
+            self.invalidate()
+            return self._connect()
+        self._local.used_at = time.monotonic()
+        return channel
+
+    def invalidate(self) -> None:
+        """Close connection of the current thread, the next .get_channel() reconnects."""
+        connection: tp.Optional[pika.BlockingConnection] = getattr(self._local, "connection", None)
+        inherited = getattr(self._local, "pid", None) != os.getpid()
+        self._local.__dict__.clear()
+        # connection inherited from parent process must not be closed, parent still uses it
+        if connection is None or inherited:
+            return
+        try:
+            if connection.is_open:
+                connection.close()
+        except AMQPError as exc:
+            logger.debug("Couldn't close stale connection", exc=str(exc))
+
+    def _connect(self) -> BlockingChannel:
+        connection = pika.BlockingConnection(self.url_params)
+        channel = connection.channel()
+        self._local.pid = os.getpid()
+        self._local.connection = connection
+        self._local.channel = channel
+        self._local.used_at = time.monotonic()
+        logger.debug("Created a new persistent connection")
+        return channel
+
+    def _is_alive(self) -> bool:
+        connection: pika.BlockingConnection = self._local.connection
+        if time.monotonic() - self._local.used_at > self.max_idle:
+            logger.info("Persistent connection idle for too long, reconnecting")
+            return False
+        if not connection.is_open or not self._local.channel.is_open:
+            logger.info("Persistent connection is closed, reconnecting")
+            return False
+        try:
+            # send and receive heartbeats while connection was idle
+            connection.process_data_events(time_limit=0)
+        except AMQPError as exc:
+            logger.info("Persistent connection is stale, reconnecting", exc=str(exc))
+            return False
+        return True
+
+
+_pools: tp.Dict[tp.Tuple[str, int, str, str], ThreadLocalChannelPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_channel_pool(url_params: pika.URLParameters) -> ThreadLocalChannelPool:
+    """Get process-wide channel pool for connection params."""
+    key = (
+        url_params.host,
+        url_params.port,
+        url_params.virtual_host,
+        url_params.credentials.username,
+    )
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ThreadLocalChannelPool(url_params)
+        return _pools[key]
@@ -1,5 +1,7 @@
 import json
 import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import structlog
 from pika import BasicProperties, URLParameters
@@ -9,13 +11,25 @@ from pika.spec import Basic
 from toolset.event_bus.django.base import DEFAULT_PROPERTIES, BaseMessageBus, pika_parameters
 from toolset.event_bus.django.consumers.constants import (
     CONSUMER_CONNECTION_PREFETCH_COUNT,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_TIMEOUT,
     ConsumerBaseException,
+    ProcessBatchFunctionType,
     ProcessMessageFunctionType,
 )
 from toolset.typing_helpers import JSON
 
+try:
+    from django.conf import settings
+    from django.db import close_old_connections
+except ImportError:
+    settings = None
+
 logger = structlog.get_logger("toolset.event_bus.consumers.base")
 
+# delivered message: method, properties, body
+MESSAGE = tp.Tuple[Basic.Deliver, BasicProperties, bytes]
+
 
 class BaseConsumer(BaseMessageBus):
     """Base logic for consumer."""
@@ -25,12 +39,16 @@ class BaseConsumer(BaseMessageBus):
     def __init__(
         self,
         queue_name: str,
-        callback: ProcessMessageFunctionType,
+        callback: tp.Optional[ProcessMessageFunctionType],
         url_params: URLParameters = pika_parameters,
         pika_props: BasicProperties = DEFAULT_PROPERTIES,
         prefetch_count: int = CONSUMER_CONNECTION_PREFETCH_COUNT,
         requeue_msg: bool = True,
         durable: bool = True,
+        workers: int = 0,
+        batch_callback: tp.Optional[ProcessBatchFunctionType] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_timeout: float = DEFAULT_BATCH_TIMEOUT,
     ):
         """Define base consumer.
 
@@ -41,7 +59,15 @@ class BaseConsumer(BaseMessageBus):
         @param prefetch_count: number of unacknowledged messages per channel
         @param requeue_msg: send message back to queue if consumer close unexpectedly
         @param durable: Survive reboots of the broker
+        @param workers: run callbacks in pool of threads of this size,
+        connection thread only sends acks and heartbeats (keep prefetch_count >= workers)
+        @param batch_callback: function with list of (routing_key, message body) args,
+        called instead of callback for batches of messages (keep prefetch_count >= batch_size)
+        @param batch_size: max number of messages in batch
+        @param batch_timeout: max seconds to wait for batch to be filled
         """
+        if callback is None and batch_callback is None:
+            raise ConsumerBaseException("Either callback or batch_callback should be provided")
         super().__init__(url_params, pika_props)
         self._queue_name = queue_name
 
@@ -50,6 +76,15 @@ class BaseConsumer(BaseMessageBus):
         self._prefetch_count = prefetch_count
         self._requeue_msg = requeue_msg
         self._durable = durable
+        self._workers = workers
+        self._executor: tp.Optional[ThreadPoolExecutor] = None
+        self._consuming_channel: tp.Optional[BlockingChannel] = None
+
+        self.batch_callback = batch_callback
+        self._batch_size = batch_size
+        self._batch_timeout = batch_timeout
+        self._batch: tp.List[MESSAGE] = []
+        self._batch_timer: tp.Optional[object] = None
 
     def start_consuming(
         self,
@@ -67,8 +102,7 @@ class BaseConsumer(BaseMessageBus):
         if exchange_name and routing_keys:
             self.bind(exchange_name, routing_keys)
 
-        self._declare_main_queue(channel)
-        self._declare_and_bind_queue(channel)
+        self._declare_queues(channel)
         logger.debug(
             "Declared a new queue to consuming",
             exchange_name=exchange_name,
@@ -89,19 +123,31 @@ class BaseConsumer(BaseMessageBus):
         """
         self.bindings[exchange_name] = routing_keys
 
+    def stop_consuming(self) -> None:
+        """Stop consuming gracefully, can be called from other thread or signal handler."""
+        channel = self._consuming_channel
+        if channel is None:
+            raise ConsumerBaseException("Consumer is not started")
+        self._call_threadsafe(channel, channel.stop_consuming)
+
     def _consume(self, channel: BlockingChannel, connection: BlockingConnection):
-        channel.basic_consume(
-            queue=self._queue_name, on_message_callback=self._pika_callback,
-        )
+        self._basic_consume(channel)
+        if self._workers:
+            self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="consumer")
 
         logger.debug("Start consuming")
+        self._consuming_channel = channel
         try:
             channel.start_consuming()
+            # process the last incomplete batch after consuming is stopped
+            self._flush_batch(channel)
         except Exception as exc:
             logger.exception(exc)
             raise
 
         finally:
+            self._consuming_channel = None
+            self._stop_workers(connection)
             if not self._in_ctx:
                 if channel.is_open:
                     channel.close()
@@ -110,6 +156,22 @@ class BaseConsumer(BaseMessageBus):
 
                 logger.debug("Channel & connection closed (without ctx)")
 
+    def _stop_workers(self, connection: BlockingConnection) -> None:
+        """Wait for callbacks running in workers and send their acks."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        if connection.is_open:
+            connection.process_data_events(time_limit=0)
+        logger.debug("Workers stopped")
+
+    def _basic_consume(self, channel: BlockingChannel) -> None:
+        """Register consumer of the main queue."""
+        channel.basic_consume(
+            queue=self._queue_name, on_message_callback=self._pika_callback,
+        )
+
     def _get_channel(self, connection: tp.Optional[BlockingConnection] = None) -> BlockingChannel:
         """Init a new instance of BlockingChannel."""
         channel = super()._get_channel(connection)
@@ -132,6 +194,11 @@ class BaseConsumer(BaseMessageBus):
         for routing_key in routing_keys:
             ch.queue_bind(queue_name, exchange_name, routing_key=routing_key)
 
+    def _declare_queues(self, ch: BlockingChannel) -> None:
+        """Declare and bind all queues of consumer."""
+        self._declare_main_queue(ch)
+        self._declare_and_bind_queue(ch)
+
     def _declare_main_queue(self, ch: BlockingChannel):
         """Declare main queue."""
         ch.queue_declare(self._queue_name, durable=self._durable)
@@ -146,6 +213,15 @@ class BaseConsumer(BaseMessageBus):
 
     def _pika_callback(
         self, ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body,
+    ):
+        """Process incoming message inline or pass it to workers."""
+        if self.batch_callback is not None:
+            self._add_to_batch(ch, (method, properties, body))
+        else:
+            self._run(self._process_message, ch, method, properties, body)
+
+    def _process_message(
+        self, ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body,
     ):
         """Process incoming message.
 
@@ -162,25 +238,139 @@ class BaseConsumer(BaseMessageBus):
 
         except json.decoder.JSONDecodeError:
             logger.error("Message decoding failed. Skip message (Ack).")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._on_connection_thread(ch, ch.basic_ack, delivery_tag=method.delivery_tag)
 
             return
 
         logger.debug("Invoke callback", routing_key=method.routing_key, payload=payload)
         try:
-            self.callback(method.routing_key, payload)
+            tp.cast(ProcessMessageFunctionType, self.callback)(method.routing_key, payload)
         except Exception as exc:
             logger.error("Couldn't process message", exc=str(exc))
-            self._process_unexpected_exception(ch, method, properties, body, exc)
+            self._on_connection_thread(
+                ch, self._process_unexpected_exception, ch, method, properties, body, exc,
+            )
 
             return
 
         # Ack message if it was processed successfully
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+        self._on_connection_thread(ch, ch.basic_ack, delivery_tag=method.delivery_tag)
         logger.debug(
             "Message processed successfully, Ack", routing_key=method.routing_key, payload=payload,
         )
 
+    def _add_to_batch(self, ch: BlockingChannel, message: MESSAGE) -> None:
+        """Collect message, batch is processed when it's full or on timeout."""
+        self._batch.append(message)
+        if len(self._batch) >= self._batch_size:
+            self._flush_batch(ch)
+        elif self._batch_timer is None:
+            self._batch_timer = self._call_later(
+                ch, self._batch_timeout, partial(self._on_batch_timeout, ch),
+            )
+
+    def _on_batch_timeout(self, ch: BlockingChannel) -> None:
+        self._batch_timer = None
+        self._flush_batch(ch)
+
+    def _flush_batch(self, ch: BlockingChannel) -> None:
+        if self._batch_timer is not None:
+            self._remove_timeout(ch, self._batch_timer)
+            self._batch_timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            self._run(self._process_batch, ch, batch)
+
+    def _process_batch(self, ch: BlockingChannel, batch: tp.List[MESSAGE]) -> None:
+        """Decode messages of batch and invoke batch callback."""
+        logger.debug("Received a new batch", size=len(batch))
+        decoded: tp.List[tp.Tuple[MESSAGE, JSON]] = []
+        for message in batch:
+            method, _, body = message
+            try:
+                decoded.append((message, json.loads(body)))
+            except json.decoder.JSONDecodeError:
+                logger.error("Message decoding failed. Skip message (Ack).")
+                self._on_connection_thread(ch, ch.basic_ack, delivery_tag=method.delivery_tag)
+        if decoded:
+            self._invoke_batch_callback(ch, decoded)
+
+    def _invoke_batch_callback(
+        self, ch: BlockingChannel, batch: tp.List[tp.Tuple[MESSAGE, JSON]],
+    ) -> None:
+        """Invoke batch callback, failed batch is bisected to find failed messages."""
+        try:
+            tp.cast(ProcessBatchFunctionType, self.batch_callback)(
+                [(method.routing_key, payload) for (method, _, _), payload in batch],
+            )
+        except Exception as exc:
+            if len(batch) > 1:
+                logger.warning("Couldn't process batch, bisect", size=len(batch), exc=str(exc))
+                middle = len(batch) // 2
+                self._invoke_batch_callback(ch, batch[:middle])
+                self._invoke_batch_callback(ch, batch[middle:])
+                return
+            logger.error("Couldn't process message", exc=str(exc))
+            (method, properties, body), _ = batch[0]
+            self._on_connection_thread(
+                ch, self._process_unexpected_exception, ch, method, properties, body, exc,
+            )
+            return
+
+        self._ack_batch(ch, [method for (method, _, _), _ in batch])
+        logger.debug("Batch processed successfully, Ack", size=len(batch))
+
+    def _ack_batch(self, ch: BlockingChannel, methods: tp.List[Basic.Deliver]) -> None:
+        if self._executor is None:
+            # messages are processed in order, all previous messages are already processed
+            ch.basic_ack(delivery_tag=methods[-1].delivery_tag, multiple=True)
+            return
+        # batches are processed concurrently, previous ones can still be in progress
+        for method in methods:
+            self._on_connection_thread(ch, ch.basic_ack, delivery_tag=method.delivery_tag)
+
+    def _run(self, func: tp.Callable[..., None], *args) -> None:
+        """Call message processing function inline or in worker."""
+        if self._executor is None:
+            func(*args)
+        else:
+            self._executor.submit(self._run_in_worker, func, *args)
+
+    def _run_in_worker(self, func: tp.Callable[..., None], *args) -> None:
+        """Run processing in worker thread, which has its own django db connection."""
+        if settings is not None and settings.configured:
+            close_old_connections()
+        try:
+            func(*args)
+        except Exception as exc:
+            logger.exception(exc)
+        finally:
+            if settings is not None and settings.configured:
+                close_old_connections()
+
+    def _on_connection_thread(
+        self, ch: BlockingChannel, func: tp.Callable[..., None], *args, **kwargs,
+    ):
+        """Call channel method, from worker it's passed to connection thread."""
+        if self._executor is None:
+            func(*args, **kwargs)
+        else:
+            self._call_threadsafe(ch, partial(func, *args, **kwargs))
+
+    def _call_threadsafe(self, ch: BlockingChannel, func: tp.Callable[[], None]) -> None:
+        """Call function in connection thread."""
+        ch.connection.add_callback_threadsafe(func)
+
+    def _call_later(
+        self, ch: BlockingChannel, delay: float, func: tp.Callable[[], None],
+    ) -> tp.Any:  # type: ignore
+        """Call function in connection thread after delay, return timer."""
+        return ch.connection.call_later(delay, func)
+
+    def _remove_timeout(self, ch: BlockingChannel, timer: tp.Any) -> None:  # type: ignore
+        """Cancel timer."""
+        ch.connection.remove_timeout(timer)
+
     def _process_unexpected_exception(
         self,
         ch: BlockingChannel,
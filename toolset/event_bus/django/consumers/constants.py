@@ -1,8 +1,12 @@
+import typing as tp
+
 import typing_extensions as te
 
 from toolset.typing_helpers import JSON
 
 CONSUMER_CONNECTION_PREFETCH_COUNT = 10
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_TIMEOUT = 0.1
 
 
 class ProcessMessageFunctionType(te.Protocol):
@@ -12,5 +16,12 @@ class ProcessMessageFunctionType(te.Protocol):
         """Call."""
 
 
+class ProcessBatchFunctionType(te.Protocol):
+    """Protocol for process batch of rabbit messages."""
+
+    def __call__(self, messages: tp.List[tp.Tuple[str, JSON]]) -> None:
+        """Call."""
+
+
 class ConsumerBaseException(Exception):
     """Consumer base exception class."""
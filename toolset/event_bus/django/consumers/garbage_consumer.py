@@ -1,4 +1,5 @@
 import json
+import time
 import typing as tp
 
 import structlog
@@ -9,11 +10,29 @@ from pika.spec import Basic
 from toolset.event_bus.constants import GARBAGE_QUEUE_SUFFIX, POST_RETRY_EXCHANGE_SUFFIX
 from toolset.event_bus.django.base import DEFAULT_PROPERTIES, pika_parameters
 from toolset.event_bus.django.consumers.base import BaseConsumer
-from toolset.event_bus.django.consumers.constants import ProcessMessageFunctionType
+from toolset.event_bus.django.consumers.constants import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_TIMEOUT,
+    ProcessBatchFunctionType,
+    ProcessMessageFunctionType,
+)
 from toolset.typing_helpers import JSON
 
 logger = structlog.get_logger("toolset.event_bus.consumers.garbage_consumer")
 
+# header of garbage message with routing key of original message
+ROUTING_KEY_HEADER = "x-routing-key"
+
+
+def get_garbage_queue_name(queue_name: str) -> str:
+    """Get name of garbage queue of queue."""
+    return f"{queue_name}.{GARBAGE_QUEUE_SUFFIX}"
+
+
+def get_post_retry_exchange_name(main_exchange_name: str) -> str:
+    """Get name of exchange routing messages to queues and their garbage queues."""
+    return f"{main_exchange_name}.{POST_RETRY_EXCHANGE_SUFFIX}"
+
 
 class GarbageConsumer(BaseConsumer):
     """Subscriber logic for Rabbit with dlx exchange and garbage queue.
@@ -40,13 +59,17 @@ class GarbageConsumer(BaseConsumer):
     def __init__(
         self,
         queue_name: str,
-        callback: ProcessMessageFunctionType,
+        callback: tp.Optional[ProcessMessageFunctionType],
         url_params: URLParameters = pika_parameters,
         pika_props: BasicProperties = DEFAULT_PROPERTIES,
         prefetch_count: int = 10,
         store_failed: bool = False,
         requeue_msg: bool = True,
         durable: bool = True,
+        workers: int = 0,
+        batch_callback: tp.Optional[ProcessBatchFunctionType] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_timeout: float = DEFAULT_BATCH_TIMEOUT,
     ):
         """Define DLX consumer params.
 
@@ -58,6 +81,11 @@ class GarbageConsumer(BaseConsumer):
         @param store_failed: send to garbage queue unprocessed messages
         @param requeue_msg: send message back to queue if consumer close unexpectedly
         @param durable: Survive reboots of the broker
+        @param workers: run callbacks in pool of threads of this size
+        @param batch_callback: function called with batches of messages instead of callback,
+        failed batches are bisected, so only failed messages are moved to garbage queue
+        @param batch_size: max number of messages in batch
+        @param batch_timeout: max seconds to wait for batch to be filled
         """
         super().__init__(
             queue_name,
@@ -67,54 +95,25 @@ class GarbageConsumer(BaseConsumer):
             prefetch_count,
             requeue_msg=requeue_msg,
             durable=durable,
+            workers=workers,
+            batch_callback=batch_callback,
+            batch_size=batch_size,
+            batch_timeout=batch_timeout,
         )
 
         self._queue_name = queue_name
-        self._garbage_queue_name = f"{queue_name}.{GARBAGE_QUEUE_SUFFIX}"
+        self._garbage_queue_name = get_garbage_queue_name(queue_name)
         self._store_failed_msg = store_failed
 
-    def start_consuming(
-        self,
-        exchange_name: tp.Optional[str] = None,
-        routing_keys: tp.Optional[tp.Iterable[str]] = None,
-    ):
-        """Register and run consumer.
-
-        @param exchange_name: name of the exchange that will be bind with queue
-        @param routing_keys: routing keys to bind queue with exchange
-        """
-        connection = self._get_connection()
-        channel = self._get_channel(connection)
-
-        if exchange_name and routing_keys:
-            self.bind(exchange_name, routing_keys)
-
-        # Declare main queue
-        self._declare_main_queue(channel)
-        self._declare_and_bind_queue(channel)
-
+    def _declare_queues(self, ch: BlockingChannel) -> None:
+        """Declare and bind main queue, garbage queue and retry exchange."""
+        super()._declare_queues(ch)
         if self._store_failed_msg:
-            self._declare_garbage_queue_and_exchange(channel)
-
-        channel.basic_consume(
-            queue=self._queue_name, on_message_callback=self._pika_callback,
-        )
-
-        try:
-            channel.start_consuming()
-
-        except Exception as exc:
-            logger.exception(exc)
-            raise
-
-        finally:
-            if not self._in_ctx:
-                channel.close()
-                connection.close()
+            self._declare_garbage_queue_and_exchange(ch)
 
     @property
     def _post_retry_exchange_name(self) -> str:
-        return f"{self.main_exchange_name}.{POST_RETRY_EXCHANGE_SUFFIX}"
+        return get_post_retry_exchange_name(self.main_exchange_name)
 
     def _declare_garbage_queue_and_exchange(self, ch: BlockingChannel) -> None:
         """Declare a retry exchange and garbage queue."""
@@ -154,14 +153,23 @@ class GarbageConsumer(BaseConsumer):
 
         if self._store_failed_msg:
 
-            self._move_to_garbage_queue(ch, body, exception)
+            self._move_to_garbage_queue(ch, body, exception, method.routing_key)
             ch.basic_ack(delivery_tag=method.delivery_tag)
         else:
 
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=self._requeue_msg)
 
-    def _move_to_garbage_queue(self, ch: BlockingChannel, body: bytes, exc: Exception) -> None:
-        """Move message to the garbage queue."""
+    def _move_to_garbage_queue(
+        self,
+        ch: BlockingChannel,
+        body: bytes,
+        exc: Exception,
+        routing_key: tp.Optional[str] = None,
+    ) -> None:
+        """Move message to the garbage queue.
+
+        Routing key and time of failure are kept in properties for `replay_garbage` command.
+        """
         payload = json.loads(body)
         payload["error"] = repr(exc)
         body_bytes = json.dumps(payload).encode()
@@ -170,6 +178,9 @@ class GarbageConsumer(BaseConsumer):
             exchange=self._post_retry_exchange_name,
             routing_key=self._garbage_queue_name,
             body=body_bytes,
+            properties=BasicProperties(
+                headers={ROUTING_KEY_HEADER: routing_key}, timestamp=int(time.time()),
+            ),
         )
 
         logger.info("Message moved to garbage queue")
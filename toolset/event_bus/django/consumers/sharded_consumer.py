@@ -0,0 +1,74 @@
+import typing as tp
+
+from pika.adapters.blocking_connection import BlockingChannel
+
+from toolset.event_bus.django.consumers.base import BaseConsumer
+from toolset.event_bus.django.consumers.constants import (
+    ConsumerBaseException,
+    ProcessMessageFunctionType,
+)
+from toolset.event_bus.sharding import assign_shards, shard_queue_name, sharded_routing_key
+
+
+class ShardedConsumer(BaseConsumer):
+    """Consumer of sharded queues.
+
+    Declares queues `<queue_name>.<shard>` bound with `<routing_key>.<shard>` routing keys
+    for shards assigned to this consumer instance (see producer's `shards` attribute).
+    Shards are spread across instances: instance `i` of `n` consumes shards `i, i + n, ...`.
+    Messages of every shard are processed in order, so callbacks can't be run in workers.
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        callback: tp.Optional[ProcessMessageFunctionType],
+        shards: int,
+        instance: int = 0,
+        instances: int = 1,
+        **kwargs,
+    ):
+        """Define sharded consumer.
+
+        @param queue_name: base name of the shard queues
+        @param callback: function with args: routing_keys (str) and message body (as JSON dict)
+        @param shards: total number of shards
+        @param instance: index of this consumer instance (0..instances-1)
+        @param instances: total number of consumer instances
+
+        Other params are the same as BaseConsumer's except `workers`:
+        messages processed in pool of threads could be finished out of order.
+        """
+        if kwargs.get("workers"):
+            raise ValueError("Sharded consumer processes messages in order, workers aren't supported")
+        super().__init__(queue_name, callback, **kwargs)
+        self.shards = assign_shards(shards, instance, instances)
+
+    @property
+    def shard_queue_names(self) -> tp.Dict[int, str]:
+        """Queue names of assigned shards."""
+        return {shard: shard_queue_name(self._queue_name, shard) for shard in self.shards}
+
+    def _declare_main_queue(self, ch: BlockingChannel):
+        """Declare queues of assigned shards."""
+        for queue_name in self.shard_queue_names.values():
+            ch.queue_declare(queue_name, durable=self._durable)
+
+    def _declare_and_bind_queue(self, ch: BlockingChannel):
+        """Bind queues of assigned shards."""
+        if not self.bindings:
+            raise ConsumerBaseException("At least one binding should be registered")
+
+        for shard, queue_name in self.shard_queue_names.items():
+            for exchange_name, routing_keys in self.bindings.items():
+                self._bind_queue(
+                    ch,
+                    queue_name,
+                    exchange_name,
+                    [sharded_routing_key(routing_key, shard) for routing_key in routing_keys],
+                )
+
+    def _basic_consume(self, channel: BlockingChannel) -> None:
+        """Register consumer of every shard queue."""
+        for queue_name in self.shard_queue_names.values():
+            channel.basic_consume(queue=queue_name, on_message_callback=self._pika_callback)
@@ -0,0 +1,69 @@
+import json
+import typing as tp
+
+import structlog
+
+from toolset.typing_helpers import JSON
+
+try:
+    from rest_framework.utils.encoders import JSONEncoder
+except ImportError:
+    JSONEncoder = json.JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = structlog.get_logger("toolset.event_bus.encoders")
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None
+    else 0
+)
+_QUOTE = b'"'
+_ESCAPED_QUOTE = b'\\"'
+
+
+def _add_spaces(data: bytes) -> tp.Optional[bytes]:
+    """Add spaces after separators of compact JSON like json module's default separators.
+
+    Parts of output split by quotes are out of strings and in strings in turn, unless strings
+    contain escaped quotes, then None is returned.
+    """
+    if _ESCAPED_QUOTE in data:
+        return None
+    parts = data.split(_QUOTE)
+    parts[::2] = [part.replace(b",", b", ").replace(b":", b": ") for part in parts[::2]]
+    return _QUOTE.join(parts)
+
+
+class FastJSONEncoder(JSONEncoder):  # type: ignore
+    """
+    JSON encoder of DRF types encoding with orjson, if it's installed.
+
+    str, int, bool, None, lists, dicts, datetime, date, time and UUID are encoded by orjson,
+    other types (Decimal, lazy strings, querysets, ...) are passed to DRF encoder's default().
+    Output is byte-identical to `json.dumps(obj, ensure_ascii=False, cls=JSONEncoder)`
+    (default separators `, ` and `: `) with and without orjson, except for floats
+    in exponential notation (`1e-05` vs `1e-5`) and NaN/Infinity (null for orjson).
+    Objects orjson couldn't encode (e.g. ints over 64 bits) and objects with strings containing
+    quotes are encoded by json module.
+    """
+
+    @classmethod
+    def dumps(cls, obj: JSON) -> bytes:
+        """Encode object to utf-8 JSON."""
+        encoder = cls(ensure_ascii=False)
+        if orjson is not None:
+            try:
+                spaced = _add_spaces(
+                    orjson.dumps(obj, default=encoder.default, option=ORJSON_OPTIONS),
+                )
+            except orjson.JSONEncodeError as exc:
+                logger.debug("orjson couldn't encode object, fallback to json", exc=str(exc))
+            else:
+                if spaced is not None:
+                    return spaced
+        return encoder.encode(obj).encode("utf-8")
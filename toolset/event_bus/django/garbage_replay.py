@@ -0,0 +1,220 @@
+import json
+import time
+import typing as tp
+from collections import Counter
+from fnmatch import fnmatchcase
+
+import pika
+import structlog
+from pika.adapters.blocking_connection import BlockingChannel
+
+from toolset.event_bus.django.base import DEFAULT_PROPERTIES, pika_parameters
+from toolset.event_bus.django.confirms import DEFAULT_CONFIRM_TIMEOUT, publish_confirmed
+from toolset.event_bus.django.consumers.garbage_consumer import (
+    ROUTING_KEY_HEADER,
+    get_garbage_queue_name,
+    get_post_retry_exchange_name,
+)
+
+logger = structlog.get_logger("toolset.event_bus.garbage_replay")
+
+DEFAULT_REPLAY_BATCH_SIZE = 100
+INVALID_MESSAGE = "<invalid message>"
+UNKNOWN_ERROR = "<unknown>"
+
+
+class GarbageFilter(tp.NamedTuple):
+    """Filter of garbage messages, empty filter matches every message."""
+
+    # substring of error
+    error: tp.Optional[str] = None
+    # pattern (fnmatch) of routing key of original message
+    routing_key: tp.Optional[str] = None
+    # min and max seconds passed since message failed
+    min_age: tp.Optional[float] = None
+    max_age: tp.Optional[float] = None
+
+    def matches(self, payload: tp.Dict[str, tp.Any], properties: pika.BasicProperties) -> bool:
+        """Check garbage message matches filter.
+
+        Messages moved to garbage queue by older versions have no routing key and timestamp,
+        they don't match routing key and age filters.
+        """
+        if self.error is not None and self.error not in str(payload.get("error", "")):
+            return False
+        if self.routing_key is not None:
+            routing_key = (properties.headers or {}).get(ROUTING_KEY_HEADER)
+            if routing_key is None or not fnmatchcase(routing_key, self.routing_key):
+                return False
+        if self.min_age is None and self.max_age is None:
+            return True
+        if properties.timestamp is None:
+            return False
+        age = time.time() - properties.timestamp
+        if self.min_age is not None and age < self.min_age:
+            return False
+        return self.max_age is None or age <= self.max_age
+
+
+class ReplayStats:
+    """Stats of garbage replay."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.read = 0
+        self.matched = 0
+        self.republished = 0
+        self.failed = 0
+        # error class -> number of read messages
+        self.errors: tp.Counter[str] = Counter()
+
+
+def get_error_class(payload: tp.Dict[str, tp.Any]) -> str:
+    """Get error class from error repr injected by GarbageConsumer, e.g. `KeyError('id')`."""
+    error = payload.get("error")
+    if not isinstance(error, str) or not error:
+        return UNKNOWN_ERROR
+    return error.split("(", 1)[0]
+
+
+class GarbageReplay:
+    """
+    Republish messages from garbage queue of GarbageConsumer to its queue.
+
+    Messages are read with `basic_get` in batches, messages which don't match the filter
+    stay unacked until the end of replay and then return to garbage queue.
+    Matching messages are published without `error` field through `<exchange>.retry.post`
+    exchange with routing key of the queue (so only this queue gets them) and acked
+    after publisher confirms. Nacked messages stay in garbage queue.
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        main_exchange_name: str,
+        url_params: pika.URLParameters = pika_parameters,
+        pika_props: pika.BasicProperties = DEFAULT_PROPERTIES,
+        confirm_timeout: float = DEFAULT_CONFIRM_TIMEOUT,
+    ) -> None:
+        """Init.
+
+        @param queue_name: name of queue of GarbageConsumer
+        @param main_exchange_name: main_exchange_name of GarbageConsumer
+        @param confirm_timeout: max seconds to wait for confirms of a batch
+        """
+        self.queue_name = queue_name
+        self.garbage_queue_name = get_garbage_queue_name(queue_name)
+        self.post_retry_exchange_name = get_post_retry_exchange_name(main_exchange_name)
+        self.url_params = url_params
+        self.properties = pika_props
+        self.confirm_timeout = confirm_timeout
+
+    def replay(
+        self,
+        garbage_filter: GarbageFilter = GarbageFilter(),  # noqa: B008 immutable
+        limit: tp.Optional[int] = None,
+        batch_size: int = DEFAULT_REPLAY_BATCH_SIZE,
+        rate: tp.Optional[float] = None,
+        dry_run: bool = False,
+    ) -> ReplayStats:
+        """Republish matching messages.
+
+        @param garbage_filter: filter of messages to republish
+        @param limit: max number of messages to republish
+        @param batch_size: number of messages published and confirmed at once
+        @param rate: max number of republished messages per second
+        @param dry_run: only read messages and count them by error class
+        """
+        stats = ReplayStats()
+        started_at = time.monotonic()
+        connection = pika.BlockingConnection(self.url_params)
+        try:
+            channel = connection.channel()
+            while limit is None or stats.matched < limit:
+                if limit is not None:
+                    batch_size = min(batch_size, limit - stats.matched)
+                batch, exhausted = self._get_batch(channel, garbage_filter, batch_size, stats)
+                if batch and not dry_run:
+                    self._republish(connection, channel, batch, stats)
+                    self._throttle(connection, rate, stats.republished, started_at)
+                if exhausted:
+                    break
+        finally:
+            # not acked messages return to garbage queue
+            if connection.is_open:
+                connection.close()
+
+        logger.info(
+            "Garbage replayed",
+            queue=self.garbage_queue_name,
+            read=stats.read,
+            matched=stats.matched,
+            republished=stats.republished,
+            failed=stats.failed,
+        )
+        return stats
+
+    def _get_batch(
+        self,
+        channel: BlockingChannel,
+        garbage_filter: GarbageFilter,
+        batch_limit: int,
+        stats: ReplayStats,
+    ) -> tp.Tuple[tp.List[tp.Tuple[int, bytes]], bool]:
+        """Get matching messages (delivery tag, body without error), flag queue is drained."""
+        batch: tp.List[tp.Tuple[int, bytes]] = []
+        while len(batch) < batch_limit:
+            method, properties, body = channel.basic_get(self.garbage_queue_name)
+            if method is None:
+                return batch, True
+            stats.read += 1
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                stats.errors[INVALID_MESSAGE] += 1
+                continue
+            if not isinstance(payload, dict):
+                stats.errors[INVALID_MESSAGE] += 1
+                continue
+            stats.errors[get_error_class(payload)] += 1
+            if not garbage_filter.matches(payload, properties):
+                continue
+            stats.matched += 1
+            payload.pop("error", None)
+            batch.append((method.delivery_tag, json.dumps(payload).encode()))
+        return batch, False
+
+    def _republish(
+        self,
+        connection: pika.BlockingConnection,
+        channel: BlockingChannel,
+        batch: tp.List[tp.Tuple[int, bytes]],
+        stats: ReplayStats,
+    ) -> None:
+        failed = set(
+            publish_confirmed(
+                connection,
+                [(self.post_retry_exchange_name, self.queue_name, body) for _, body in batch],
+                self.properties,
+                self.confirm_timeout,
+            ),
+        )
+        for index, (delivery_tag, _) in enumerate(batch):
+            if index not in failed:
+                channel.basic_ack(delivery_tag=delivery_tag)
+        stats.republished += len(batch) - len(failed)
+        stats.failed += len(failed)
+
+    def _throttle(
+        self,
+        connection: pika.BlockingConnection,
+        rate: tp.Optional[float],
+        republished: int,
+        started_at: float,
+    ) -> None:
+        if not rate:
+            return
+        delay = republished / rate - (time.monotonic() - started_at)
+        if delay > 0:
+            # keeps heartbeats of connection unlike time.sleep
+            connection.sleep(delay)
@@ -0,0 +1,65 @@
+import signal
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from toolset.event_bus.django.outbox import (
+    DEFAULT_RELAY_BATCH_SIZE,
+    DEFAULT_RELAY_INTERVAL,
+    OutboxRelay,
+)
+
+
+class Command(BaseCommand):
+    """Relay events from outbox table to rabbit."""
+
+    help = "Publish events from outbox table to rabbit in batches."  # noqa: A003 django api
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument("model", help="Outbox model: <app_label>.<ModelName>")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_RELAY_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=DEFAULT_RELAY_INTERVAL,
+            help="Seconds to wait when outbox is drained",
+        )
+        parser.add_argument(
+            "--mark-sent",
+            action="store_true",
+            help="Set sent_at of published rows instead of deleting them",
+        )
+        parser.add_argument(
+            "--no-confirm",
+            action="store_false",
+            dest="confirm",
+            help=(
+                "Don't wait for publisher confirms, events lost by broker after publishing "
+                "are deleted from outbox anyway"
+            ),
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Relay all pending events and exit",
+        )
+
+    def handle(self, *args, **options):
+        """Relay events until SIGTERM/SIGINT."""
+        relay = OutboxRelay(
+            apps.get_model(options["model"]),
+            batch_size=options["batch_size"],
+            delete_sent=not options["mark_sent"],
+            confirm_delivery=options["confirm"],
+        )
+        if options["once"]:
+            total = 0
+            published = relay.relay_batch()
+            while published:
+                total += published
+                published = relay.relay_batch()
+            self.stdout.write(f"Relayed {total} events")
+            return
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: relay.stop())
+        relay.run(options["interval"])
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from toolset.event_bus.django.garbage_replay import (
+    DEFAULT_REPLAY_BATCH_SIZE,
+    GarbageFilter,
+    GarbageReplay,
+)
+
+
+class Command(BaseCommand):
+    """Republish messages from garbage queue of GarbageConsumer."""
+
+    help = (  # noqa: A003 django api
+        "Republish messages from <queue>.garbage to <queue> through <exchange>.retry.post."
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument("queue", help="Queue name of GarbageConsumer")
+        parser.add_argument("exchange", help="main_exchange_name of GarbageConsumer")
+        parser.add_argument("--error", help="Replay messages with error containing this text")
+        parser.add_argument(
+            "--routing-key", help="Replay messages with routing key matching pattern (fnmatch)",
+        )
+        parser.add_argument(
+            "--min-age", type=float, help="Replay messages failed at least this seconds ago",
+        )
+        parser.add_argument(
+            "--max-age", type=float, help="Replay messages failed at most this seconds ago",
+        )
+        parser.add_argument("--limit", type=int, help="Max number of messages to replay")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_REPLAY_BATCH_SIZE)
+        parser.add_argument("--rate", type=float, help="Max number of messages per second")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Don't republish, summarize garbage messages by error class",
+        )
+
+    def handle(self, *args, **options):
+        """Replay garbage messages and print summary."""
+        stats = GarbageReplay(options["queue"], options["exchange"]).replay(
+            GarbageFilter(
+                error=options["error"],
+                routing_key=options["routing_key"],
+                min_age=options["min_age"],
+                max_age=options["max_age"],
+            ),
+            limit=options["limit"],
+            batch_size=options["batch_size"],
+            rate=options["rate"],
+            dry_run=options["dry_run"],
+        )
+
+        for error_class, count in stats.errors.most_common():
+            self.stdout.write(f"{error_class}: {count}")
+        self.stdout.write(f"Read {stats.read} messages, {stats.matched} match filter")
+        if not options["dry_run"]:
+            self.stdout.write(f"Republished {stats.republished}, failed {stats.failed}")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from toolset.event_bus.django.prefork import DEFAULT_RESTART_DELAY, PreforkRunner
+
+
+class Command(BaseCommand):
+    """Run consumers in forked worker processes."""
+
+    help = "Run consumer in several forked processes."  # noqa: A003 django api
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "consumer_factory",
+            help="Dotted path to function returning bound consumer: my_app.consumers.make_consumer",
+        )
+        parser.add_argument("--processes", type=int, default=2, help="Number of workers")
+        parser.add_argument(
+            "--restart-delay",
+            type=float,
+            default=DEFAULT_RESTART_DELAY,
+            help="Seconds to wait before restart of dead worker",
+        )
+
+    def handle(self, *args, **options):
+        """Run workers until SIGTERM/SIGINT."""
+        PreforkRunner(
+            import_string(options["consumer_factory"]),
+            processes=options["processes"],
+            restart_delay=options["restart_delay"],
+        ).run()
@@ -0,0 +1,155 @@
+import threading
+import typing as tp
+
+import pika
+import structlog
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from pika.exceptions import AMQPError
+
+from toolset.event_bus.django.base import DEFAULT_PROPERTIES, pika_parameters
+from toolset.event_bus.django.confirms import publish_confirmed
+from toolset.event_bus.django.connection_pool import get_channel_pool
+
+logger = structlog.get_logger("toolset.event_bus.outbox")
+
+DEFAULT_RELAY_BATCH_SIZE = 500
+DEFAULT_RELAY_INTERVAL = 1
+
+
+class OutboxManager(models.Manager):
+    """Manager writing events to outbox table."""
+
+    def publish(self, exchange: str, routing_key: str, body: bytes) -> "OutboxEventABC":
+        """
+        Write encoded event to outbox.
+
+        Call it inside transaction.atomic() with business data changes:
+        the event is relayed to rabbit only if transaction is committed.
+        """
+        return self.create(exchange=exchange, routing_key=routing_key, body=body.decode("utf-8"))
+
+
+class OutboxEventABC(models.Model):
+    """
+    Abstract model of transactional outbox.
+
+    Inherit it in your app and run `relay_outbox <app_label>.<ModelName>` command,
+    which publishes written events to rabbit in batches.
+    """
+
+    exchange = models.CharField(_("Exchange"), max_length=255)
+    routing_key = models.CharField(_("Routing key"), max_length=255)
+    body = models.TextField(_("Body"))
+    created_at = models.DateTimeField(_("Create date"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Send date"), blank=True, null=True, db_index=True)
+
+    objects = OutboxManager()
+
+    class Meta:
+        abstract = True
+
+
+class OutboxRelay:
+    """
+    Publish events from outbox table to rabbit.
+
+    Batch of rows is locked with `SELECT ... FOR UPDATE SKIP LOCKED`, so several relays
+    can run concurrently. Rows are deleted (or marked as sent) in the same transaction
+    after the whole batch is published with publisher confirms, so every event is published
+    at least once: only confirmed events are removed, nacked (or not confirmed) events stay
+    in outbox and are published again.
+    With `confirm_delivery=False` rows are removed right after `basic_publish`, events lost
+    by broker or connection after that (e.g. broker restart before routing) are lost for good.
+    """
+
+    def __init__(
+        self,
+        model: tp.Type[OutboxEventABC],
+        batch_size: int = DEFAULT_RELAY_BATCH_SIZE,
+        delete_sent: bool = True,
+        url_params: pika.URLParameters = pika_parameters,
+        pika_props: pika.BasicProperties = DEFAULT_PROPERTIES,
+        confirm_delivery: bool = True,
+    ) -> None:
+        """Init.
+
+        @param model: concrete outbox model
+        @param batch_size: max number of events published in one transaction
+        @param delete_sent: delete published rows, otherwise set their `sent_at`
+        @param confirm_delivery: wait for publisher confirms of every batch,
+            without confirms published events can be lost
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self.delete_sent = delete_sent
+        self.url_params = url_params
+        self.properties = pika_props
+        self.confirm_delivery = confirm_delivery
+
+        self._stopped = threading.Event()
+
+    def relay_batch(self) -> int:
+        """Publish one batch of events, return number of published (confirmed) events."""
+        with transaction.atomic():
+            events = list(
+                self.model.objects.select_for_update(skip_locked=True)
+                .filter(sent_at__isnull=True)
+                .order_by("pk")[: self.batch_size],
+            )
+            if not events:
+                return 0
+
+            failed = set(self._publish(events))
+            sent = [event.pk for index, event in enumerate(events) if index not in failed]
+
+            published = self.model.objects.filter(pk__in=sent)
+            if self.delete_sent:
+                published.delete()
+            else:
+                published.update(sent_at=timezone.now())
+
+        logger.debug("Outbox events relayed", count=len(sent), failed=len(failed))
+        return len(sent)
+
+    def run(self, interval: float = DEFAULT_RELAY_INTERVAL) -> None:
+        """Relay events until stopped, wait `interval` seconds when outbox is drained.
+
+        Errors of batch (e.g. broker or database is unavailable) are logged, the batch
+        is retried after `interval` seconds. Broken and old database connections are closed
+        before every batch, so the next query reconnects.
+        """
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            close_old_connections()
+            try:
+                relayed = self.relay_batch()
+            except Exception as exc:
+                logger.error("Couldn't relay outbox events, retry later", exc=repr(exc))
+                self._stopped.wait(interval)
+                continue
+            if relayed < self.batch_size:
+                self._stopped.wait(interval)
+
+    def stop(self) -> None:
+        """Stop .run() after current batch."""
+        self._stopped.set()
+
+    def _publish(self, events: tp.List[OutboxEventABC]) -> tp.List[int]:
+        """Publish events, return indexes of events which are not confirmed."""
+        messages = [
+            (event.exchange, event.routing_key, event.body.encode("utf-8")) for event in events
+        ]
+        pool = get_channel_pool(self.url_params)
+        channel = pool.get_channel()
+        try:
+            if self.confirm_delivery:
+                return publish_confirmed(channel.connection, messages, self.properties)
+            for exchange, routing_key, body in messages:
+                channel.basic_publish(exchange, routing_key, body, self.properties)
+        except AMQPError:
+            # transaction is rolled back, events are published again on the next attempt
+            pool.invalidate()
+            raise
+        return []
@@ -0,0 +1,133 @@
+import gc
+import os
+import signal
+import time
+import typing as tp
+
+import structlog
+from django.db import connections
+
+from toolset.event_bus.django.consumers.base import BaseConsumer
+from toolset.event_bus.django.consumers.constants import ConsumerBaseException
+
+logger = structlog.get_logger("toolset.event_bus.prefork")
+
+DEFAULT_RESTART_DELAY = 1
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+ConsumerFactory = tp.Callable[[], BaseConsumer]
+
+
+class PreforkRunner:
+    """
+    Run consumers in forked worker processes.
+
+    Application is loaded once in master process and shared by workers copy-on-write.
+    Every worker creates its own consumer (and rabbit connection) with `consumer_factory`,
+    which should bind the consumer, e.g. `consumer.bind("hrm", ["user.updated"])`.
+    Dead workers are restarted. On SIGTERM/SIGINT workers stop consuming,
+    finish messages in progress and exit, then master exits.
+    """
+
+    def __init__(
+        self,
+        consumer_factory: ConsumerFactory,
+        processes: int,
+        restart_delay: float = DEFAULT_RESTART_DELAY,
+    ) -> None:
+        """Init.
+
+        @param consumer_factory: function creating bound consumer in worker
+        @param processes: number of worker processes
+        @param restart_delay: seconds to wait before restart of dead worker
+        """
+        self.consumer_factory = consumer_factory
+        self.processes = processes
+        self.restart_delay = restart_delay
+
+        # pid -> worker number
+        self._workers: tp.Dict[int, int] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        """Start workers and supervise them until stopped."""
+        self._stopping = False
+        previous_handlers = {signum: signal.signal(signum, self._stop) for signum in STOP_SIGNALS}
+        # objects of loaded application are not touched by gc in workers, so pages stay shared
+        gc.freeze()
+        try:
+            for number in range(self.processes):
+                self._spawn(number)
+            self._supervise()
+        finally:
+            gc.unfreeze()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        logger.info("All workers stopped")
+
+    def _supervise(self) -> None:
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                return
+            number = self._workers.pop(pid, None)
+            if number is None or self._stopping:
+                continue
+            logger.warning("Worker died", pid=pid, status=status, worker=number)
+            time.sleep(self.restart_delay)
+            if not self._stopping:
+                self._spawn(number)
+
+    def _spawn(self, number: int) -> None:
+        # inherited db connections must not be used by several processes
+        connections.close_all()
+        # stop signal must not be handled until worker is registered (in master)
+        # and worker's own handlers are installed (in worker)
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = number
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+            logger.info("Worker started", pid=pid, worker=number)
+            return
+
+        exit_code = 0
+        try:
+            self._run_worker()
+        except BaseException as exc:  # noqa: B902 worker must never return to master code
+            if not isinstance(exc, SystemExit) or exc.code:
+                logger.exception(exc)
+                exit_code = 1
+        finally:
+            os._exit(exit_code)  # noqa: WPS437 skip cleanup of master process state
+
+    def _run_worker(self) -> None:
+        consumer: tp.Optional[BaseConsumer] = None
+
+        def _stop_consuming(*_) -> None:  # noqa: WPS430 nested function
+            if consumer is None:
+                raise SystemExit(0)
+            try:
+                consumer.stop_consuming()
+            except ConsumerBaseException:
+                # consumer isn't started yet, nothing to drain
+                raise SystemExit(0)
+
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, _stop_consuming)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+
+        consumer = self.consumer_factory()
+        consumer.start_consuming()
+
+    def _stop(self, *_) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("Stopping workers", workers=len(self._workers))
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                logger.debug("Worker already exited", pid=pid)
@@ -10,11 +10,18 @@ from pika.exceptions import (
     AMQPConnectionError,
     AMQPError,
     ChannelError,
+    NackError,
     ProbableAuthenticationError,
 )
+from pika.frame import Method
+from pika.spec import Basic
 
-from toolset.decorators import retry
+from toolset.decorators import RetryBudget, retry
 from toolset.event_bus.django.base import DEFAULT_PROPERTIES, BaseMessageBus, pika_parameters
+from toolset.event_bus.django.confirms import DEFAULT_CONFIRM_TIMEOUT, publish_confirmed
+from toolset.event_bus.django.connection_pool import get_channel_pool
+from toolset.event_bus.django.encoders import FastJSONEncoder
+from toolset.event_bus.sharding import route_to_shard
 from toolset.typing_helpers import JSON
 
 try:
@@ -22,9 +29,17 @@ try:
 except ImportError:
     JSONEncoder = None
 
+if tp.TYPE_CHECKING:
+    from toolset.event_bus.django.outbox import OutboxEventABC  # noqa: F401
 
 logger = structlog.get_logger("toolset.event_bus.producers")
 
+# publishing is retried for PUBLISH_DEADLINE seconds at most (it blocks django request),
+# retries of all producers of process are limited by shared budget during broker outage
+PUBLISH_MAX_WAIT = 10
+PUBLISH_DEADLINE = 30
+publish_retry_budget = RetryBudget(capacity=20, refill_rate=1)
+
 
 class ChannelMock:
     """Channel mock."""
@@ -33,10 +48,26 @@ class ChannelMock:
         """Init mock."""
         self._closed = False
         self.is_open = True
+        self._ack_nack_callback: tp.Optional[tp.Callable[[tp.Any], None]] = None
+        self._delivery_tag = 0
+
+    @property
+    def _impl(self) -> "ChannelMock":
+        """Mock of underlying channel."""
+        return self
+
+    def confirm_delivery(self, ack_nack_callback=None, callback=None) -> None:
+        """Mock of confirm mode, every message is acked."""
+        self._ack_nack_callback = ack_nack_callback
+        if callback:
+            callback(None)
 
     def basic_publish(self, *args, **kwargs) -> None:
         """Mock of basic publish."""
         logger.info("Publish called", args=args, kwargs=kwargs)
+        if self._ack_nack_callback:
+            self._delivery_tag += 1
+            self._ack_nack_callback(Method(1, Basic.Ack(delivery_tag=self._delivery_tag)))
 
     def close(self) -> None:
         """Close mock."""
@@ -58,6 +89,9 @@ class ConnectionMock:
         """Channel mock."""
         return ChannelMock()
 
+    def process_data_events(self, *args, **kwargs) -> None:
+        """Mock of events processing."""
+
     def close(self) -> None:
         """Close mock."""
         if self._closed:
@@ -71,16 +105,31 @@ class BaseProducer(BaseMessageBus):
 
     exchange: str
     json_encoder = JSONEncoder
+    # if set, messages are routed to `<routing_key>.<shard>` by hash of body[shard_key]
+    shards: int = 0
+    shard_key: str = "id"
+    # if set, events are written to outbox table and published by `relay_outbox` command
+    outbox_model: tp.Optional[tp.Type["OutboxEventABC"]] = None
 
     def __init__(
         self,
         url_params: pika.URLParameters = pika_parameters,
         pika_props: pika.BasicProperties = DEFAULT_PROPERTIES,
+        persistent: bool = False,
+        confirm_delivery: bool = False,
     ) -> None:
-        """Init."""
+        """Init.
+
+        @param persistent: outside of context manager publish through connection of
+        process-wide pool (one per thread) instead of opening a new connection for every event
+        @param confirm_delivery: publish() waits for publisher confirm of event and raises
+        errors (NackError if event is nacked) instead of logging them
+        """
         super().__init__(url_params, pika_props)
 
         self._exchange_declared = False
+        self.persistent = persistent
+        self.confirm_delivery = confirm_delivery
 
     @retry(
         AMQPConnectorException,
@@ -92,9 +141,28 @@ class BaseProducer(BaseMessageBus):
         attempts=5,
         wait_time_seconds=2,
         backoff=3,
+        jitter=True,
+        max_wait=PUBLISH_MAX_WAIT,
+        deadline=PUBLISH_DEADLINE,
+        budget=publish_retry_budget,
     )
     def publish(self, routing_key: str, body: JSON) -> None:
         """Publish event."""
+        if self.outbox_model is not None:
+            self.outbox_model.objects.publish(
+                self.exchange, self.get_routing_key(routing_key, body), self._encode(body),
+            )
+            return
+
+        if self.confirm_delivery:
+            if self.publish_many([(routing_key, body)]):
+                raise NackError([(routing_key, body)])
+            return
+
+        if self.persistent and not self._in_ctx:
+            self._publish_persistent(routing_key, body)
+            return
+
         if self._in_ctx:
             connection = tp.cast(pika.BlockingConnection, self._connection)
         else:
@@ -104,8 +172,8 @@ class BaseProducer(BaseMessageBus):
         try:
             channel.basic_publish(
                 self.exchange,
-                routing_key,
-                json.dumps(body, ensure_ascii=False, cls=self.json_encoder).encode("utf-8"),
+                self.get_routing_key(routing_key, body),
+                self._encode(body),
                 self.properties,
             )
         except Exception as exc:
@@ -116,3 +184,80 @@ class BaseProducer(BaseMessageBus):
                     channel.close()
                 if connection.is_open:
                     connection.close()
+
+    def publish_many(
+        self,
+        events: tp.Iterable[tp.Tuple[str, JSON]],
+        timeout: float = DEFAULT_CONFIRM_TIMEOUT,
+    ) -> tp.List[tp.Tuple[str, JSON]]:
+        """Publish events with publisher confirms, wait once for confirms of all of them.
+
+        Connection errors are raised: events are not published or their state is unknown.
+
+        @param events: pairs of routing key and body
+        @param timeout: max seconds to wait for confirms
+        @return: events nacked by broker or not confirmed within timeout
+        """
+        events = list(events)
+        if not events:
+            return []
+        if self.outbox_model is not None:
+            for routing_key, body in events:
+                self.outbox_model.objects.publish(
+                    self.exchange, self.get_routing_key(routing_key, body), self._encode(body),
+                )
+            return []
+
+        messages = [
+            (self.exchange, self.get_routing_key(routing_key, body), self._encode(body))
+            for routing_key, body in events
+        ]
+        if self.persistent and not self._in_ctx:
+            pool = get_channel_pool(self.url_params)
+            try:
+                failed = publish_confirmed(
+                    pool.get_channel().connection, messages, self.properties, timeout,
+                )
+            except AMQPError:
+                pool.invalidate()
+                raise
+        else:
+            # subclasses with other transports don't open blocking connection in ctx
+            own_connection = not self._in_ctx or self._connection is None
+            connection = (
+                self._get_rabbit_connection()
+                if own_connection
+                else tp.cast(pika.BlockingConnection, self._connection)
+            )
+            try:
+                failed = publish_confirmed(connection, messages, self.properties, timeout)
+            finally:
+                if own_connection and connection.is_open:
+                    connection.close()
+        return [events[index] for index in failed]
+
+    def get_routing_key(self, routing_key: str, body: JSON) -> str:
+        """Get routing key of message (routing key of shard if sharding is enabled)."""
+        if self.shards:
+            return route_to_shard(routing_key, body, self.shard_key, self.shards)
+        return routing_key
+
+    def _encode(self, body: JSON) -> bytes:
+        if isinstance(self.json_encoder, type) and issubclass(self.json_encoder, FastJSONEncoder):
+            return self.json_encoder.dumps(body)
+        return json.dumps(body, ensure_ascii=False, cls=self.json_encoder).encode("utf-8")
+
+    def _publish_persistent(self, routing_key: str, body: JSON) -> None:
+        pool = get_channel_pool(self.url_params)
+        channel = pool.get_channel()
+        try:
+            channel.basic_publish(
+                self.exchange,
+                self.get_routing_key(routing_key, body),
+                self._encode(body),
+                self.properties,
+            )
+        except AMQPError:
+            # connection is broken, the next attempt (see @retry) reconnects
+            pool.invalidate()
+            raise
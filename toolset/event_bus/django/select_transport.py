@@ -0,0 +1,438 @@
+import threading
+import typing as tp
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+
+import pika
+import structlog
+from pika.adapters.select_connection import IOLoop
+from pika.channel import Channel
+from pika.exceptions import ChannelWrongStateError
+from pika.frame import Method
+from pika.spec import Basic
+
+from toolset.event_bus.django.base import DEFAULT_PROPERTIES, pika_parameters
+from toolset.event_bus.django.consumers.base import BaseConsumer
+from toolset.event_bus.django.consumers.constants import ConsumerBaseException
+from toolset.event_bus.django.producers import BaseProducer
+from toolset.typing_helpers import JSON
+
+logger = structlog.get_logger("toolset.event_bus.select_transport")
+
+DEFAULT_RECONNECT_DELAY = 5
+DEFAULT_CLOSE_TIMEOUT = 30
+DEFAULT_MAX_PENDING = 10000
+
+
+class OverflowPolicy(str, Enum):  # noqa: WPS600 subclassing builtin
+    """What to do with a new message when queue of SelectProducer is full."""
+
+    block = "block"
+    raise_error = "raise"
+
+
+class PendingQueueFullError(Exception):
+    """Queue of messages waiting for publishing (or confirms) is full."""
+
+
+class SelectConsumer(BaseConsumer):
+    """
+    Consumer on pika SelectConnection.
+
+    API is the same as BaseConsumer's one, but frames are read and written by asynchronous
+    ioloop, so deliveries, acks and heartbeats don't wait for each other.
+    Combine it with other consumers to change their transport:
+    `class MyConsumer(SelectConsumer, GarbageConsumer)`.
+    """
+
+    _select_connection: tp.Optional[pika.SelectConnection] = None
+    _error: tp.Optional[BaseException] = None
+    _stopping = False
+
+    def __enter__(self) -> "SelectConsumer":
+        """Connection is opened in .start_consuming()."""
+        self._in_ctx = True
+        return self
+
+    def close(self) -> None:
+        """Stop consuming."""
+        if self._select_connection is not None and self._select_connection.is_open:
+            self.stop_consuming()
+
+    def start_consuming(
+        self,
+        exchange_name: tp.Optional[str] = None,
+        routing_keys: tp.Optional[tp.Iterable[str]] = None,
+    ):
+        """Register and run consumer until .stop_consuming().
+
+        @param exchange_name: name of the exchange that will be bind with queue
+        @param routing_keys: routing keys to bind queue with exchange
+        """
+        if exchange_name and routing_keys:
+            self.bind(exchange_name, routing_keys)
+        if not self.bindings:
+            raise ConsumerBaseException("At least one binding should be registered")
+
+        self._error = None
+        self._stopping = False
+        self._select_connection = pika.SelectConnection(
+            self.url_params,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+        )
+        if self._workers:
+            self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="consumer")
+
+        try:
+            self._select_connection.ioloop.start()
+        finally:
+            self._consuming_channel = None
+            self._select_connection = None
+            self._shutdown_workers()
+            logger.debug("Connection closed")
+
+        if self._error is not None:
+            raise self._error
+
+    def stop_consuming(self) -> None:
+        """Stop consuming gracefully, can be called from other thread or signal handler."""
+        if self._select_connection is None:
+            raise ConsumerBaseException("Consumer is not started")
+        self._select_connection.ioloop.add_callback_threadsafe(self._stop)
+
+    def _on_connection_open(self, connection: pika.SelectConnection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection: pika.SelectConnection, exc: Exception) -> None:
+        self._error = exc
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection: pika.SelectConnection, reason: Exception) -> None:
+        if not self._stopping:
+            logger.error("Connection closed unexpectedly", reason=str(reason))
+            self._error = self._error or reason
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel: Channel) -> None:
+        # RPC calls are queued by channel, so the next one is sent after reply to previous one
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.basic_qos(prefetch_count=self._prefetch_count)
+        self._declare_queues(channel)  # type: ignore
+        self._basic_consume(channel)  # type: ignore
+        self._consuming_channel = channel  # type: ignore
+        logger.debug("Start consuming", queue_name=self._queue_name)
+
+    def _on_channel_closed(self, channel: Channel, reason: Exception) -> None:
+        self._consuming_channel = None
+        if not self._stopping:
+            logger.error("Channel closed unexpectedly", reason=str(reason))
+            self._fail(reason)
+
+    def _stop(self) -> None:
+        """Cancel consumers, wait for messages in progress, then close connection."""
+        if self._stopping:
+            return
+        self._stopping = True
+        channel = tp.cast(tp.Optional[Channel], self._consuming_channel)
+        if channel is None or not channel.is_open or not channel.consumer_tags:
+            self._close_connection()
+            return
+        tags = list(channel.consumer_tags)
+        for tag in tags[:-1]:
+            channel.basic_cancel(tag)
+        channel.basic_cancel(tags[-1], callback=self._on_cancelled)
+
+    def _on_cancelled(self, _: tp.Any) -> None:  # type: ignore
+        channel = self._consuming_channel
+        if channel is not None:
+            self._run_safely(partial(self._flush_batch, channel))
+        self._shutdown_workers()
+        # acks sent by workers are already scheduled, close connection after them
+        tp.cast(pika.SelectConnection, self._select_connection).ioloop.add_callback_threadsafe(
+            self._close_connection,
+        )
+
+    def _close_connection(self) -> None:
+        connection = self._select_connection
+        if connection is None:
+            return
+        if connection.is_open:
+            connection.close()
+        elif connection.is_closed:
+            connection.ioloop.stop()
+
+    def _fail(self, exc: BaseException) -> None:
+        """Stop consuming because of error, it's raised from .start_consuming()."""
+        self._error = self._error or exc
+        self._stopping = True
+        self._close_connection()
+
+    def _shutdown_workers(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run_safely(self, func: tp.Callable[[], None]) -> None:
+        try:
+            func()
+        except Exception as exc:
+            self._fail(exc)
+
+    def _pika_callback(
+        self, ch: Channel, method: Basic.Deliver, properties: pika.BasicProperties, body,
+    ):
+        """Process incoming message, error stops consuming."""
+        self._run_safely(partial(super()._pika_callback, ch, method, properties, body))
+
+    def _call_threadsafe(self, ch: Channel, func: tp.Callable[[], None]) -> None:
+        """Call function in ioloop thread."""
+        tp.cast(pika.SelectConnection, self._select_connection).ioloop.add_callback_threadsafe(
+            partial(self._run_safely, func),
+        )
+
+    def _call_later(
+        self, ch: Channel, delay: float, func: tp.Callable[[], None],
+    ) -> tp.Any:  # type: ignore
+        """Call function in ioloop thread after delay, return timer."""
+        return tp.cast(pika.SelectConnection, self._select_connection).ioloop.call_later(
+            delay, partial(self._run_safely, func),
+        )
+
+    def _remove_timeout(self, ch: Channel, timer: tp.Any) -> None:  # type: ignore
+        """Cancel timer."""
+        tp.cast(pika.SelectConnection, self._select_connection).ioloop.remove_timeout(timer)
+
+
+class SelectProducer(BaseProducer):  # noqa: WPS214 too many methods
+    """
+    Producer on pika SelectConnection running in background thread.
+
+    .publish() doesn't wait for network: message is queued and published by ioloop thread,
+    so publishing overlaps with processing in the caller. Messages published while
+    connection is being opened (or reopened after failure) wait in the queue.
+    .close() (or exit of context manager) publishes queued messages and closes connection.
+
+    With `confirm_delivery` messages are kept until broker confirms them: messages
+    unconfirmed when connection or channel is lost are queued again and published
+    after reconnect (so they can be duplicated), nacked messages are logged and counted
+    in `nacked`. .close() waits for confirms too.
+    Queued and unconfirmed messages are limited by `max_pending`, when the limit is reached
+    .publish() waits for free space or raises PendingQueueFullError (see `overflow_policy`).
+    """
+
+    def __init__(  # noqa: WPS211 too many arguments
+        self,
+        url_params: pika.URLParameters = pika_parameters,
+        pika_props: pika.BasicProperties = DEFAULT_PROPERTIES,
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+        close_timeout: float = DEFAULT_CLOSE_TIMEOUT,
+        persistent: bool = False,
+        confirm_delivery: bool = False,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        overflow_policy: OverflowPolicy = OverflowPolicy.block,
+    ) -> None:
+        """Init.
+
+        @param reconnect_delay: seconds to wait before reconnect after connection failure
+        @param close_timeout: max seconds to wait for queued messages to be published on close
+        @param persistent: publish_many() outside of context manager uses connection of
+        process-wide pool (publish() always uses connection of background thread)
+        @param confirm_delivery: keep messages until publisher confirms, republish unconfirmed
+        messages after reconnect
+        @param max_pending: max number of queued and unconfirmed messages
+        @param overflow_policy: wait for free space or raise PendingQueueFullError
+        when `max_pending` is reached
+        """
+        super().__init__(url_params, pika_props, persistent, confirm_delivery)
+        self.reconnect_delay = reconnect_delay
+        self.close_timeout = close_timeout
+        self.max_pending = max_pending
+        self.overflow_policy = overflow_policy
+        self.nacked = 0
+
+        # routing key, encoded body
+        self._pending: tp.Deque[tp.Tuple[str, bytes]] = deque()
+        # delivery tag -> routing key, encoded body of messages waiting for confirm
+        self._unconfirmed: "OrderedDict[int, tp.Tuple[str, bytes]]" = OrderedDict()
+        self._delivery_tag = 0
+        # guards _pending and _unconfirmed shared by caller and ioloop threads
+        self._not_full = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread: tp.Optional[threading.Thread] = None
+        self._ioloop: tp.Optional[IOLoop] = None
+        self._select_connection: tp.Optional[pika.SelectConnection] = None
+        self._select_channel: tp.Optional[Channel] = None
+        self._drain_scheduled = False
+        self._closing = False
+
+    def __enter__(self) -> "SelectProducer":
+        """Open connection in background."""
+        self._in_ctx = True
+        self._start()
+        return self
+
+    def publish(self, routing_key: str, body: JSON) -> None:
+        """Queue event for publishing, wait for space or raise PendingQueueFullError if full."""
+        if self.outbox_model is not None:
+            super().publish(routing_key, body)
+            return
+        message = (self.get_routing_key(routing_key, body), self._encode(body))
+        self._start()
+        with self._not_full:
+            if self._queued >= self.max_pending:
+                if self.overflow_policy == OverflowPolicy.raise_error:
+                    raise PendingQueueFullError(f"{self._queued} messages are not published")
+                self._not_full.wait_for(lambda: self._queued < self.max_pending)
+            self._pending.append(message)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            tp.cast(IOLoop, self._ioloop).add_callback_threadsafe(self._drain)
+
+    def close(self) -> None:
+        """Publish queued messages and close connection."""
+        with self._lock:
+            thread, ioloop = self._thread, self._ioloop
+            if thread is None or ioloop is None:
+                return
+            self._closing = True
+            ioloop.add_callback_threadsafe(self._close_connection)
+            thread.join(self.close_timeout)
+            if thread.is_alive():
+                logger.error("Couldn't publish queued messages", count=self._queued)
+                ioloop.add_callback_threadsafe(ioloop.stop)
+                thread.join()
+            ioloop.close()
+            self._thread = None
+            self._ioloop = None
+            self._closing = False
+        logger.debug("Connection closed")
+
+    @property
+    def _queued(self) -> int:
+        return len(self._pending) + len(self._unconfirmed)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._ioloop = IOLoop()
+            self._connect()
+            self._thread = threading.Thread(
+                target=self._ioloop.start, name="select-producer", daemon=True,
+            )
+            self._thread.start()
+
+    def _connect(self) -> None:
+        self._select_connection = pika.SelectConnection(
+            self.url_params,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=self._ioloop,
+        )
+
+    def _on_connection_open(self, connection: pika.SelectConnection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_channel_open(self, channel: Channel) -> None:
+        self._select_channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        if self.confirm_delivery:
+            # Confirm.Select is sent before messages, delivery tags start from 1 on every channel
+            channel.confirm_delivery(ack_nack_callback=self._on_confirm)
+            self._delivery_tag = 0
+        self._drain()
+        if self._closing:
+            self._close_connection()
+
+    def _on_channel_closed(self, channel: Channel, reason: Exception) -> None:
+        self._select_channel = None
+        self._requeue_unconfirmed()
+        connection = tp.cast(pika.SelectConnection, self._select_connection)
+        if not self._closing:
+            logger.error("Channel closed unexpectedly", reason=str(reason))
+            if connection.is_open:
+                connection.close()
+
+    def _on_connection_error(self, connection: pika.SelectConnection, exc: Exception) -> None:
+        logger.error("Couldn't connect", exc=str(exc))
+        self._reconnect()
+
+    def _on_connection_closed(self, connection: pika.SelectConnection, reason: Exception) -> None:
+        self._select_channel = None
+        self._requeue_unconfirmed()
+        if not self._closing:
+            logger.error("Connection closed unexpectedly", reason=str(reason))
+        self._reconnect()
+
+    def _on_confirm(self, frame: Method) -> None:
+        """Handle Basic.Ack or Basic.Nack of one or several messages."""
+        method = frame.method
+        with self._not_full:
+            if method.multiple:
+                tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+            else:
+                tags = [method.delivery_tag]
+            confirmed = [self._unconfirmed.pop(tag, None) for tag in tags]
+            self._not_full.notify_all()
+        if isinstance(method, Basic.Nack):
+            routing_keys = [message[0] for message in confirmed if message is not None]
+            self.nacked += len(routing_keys)
+            logger.error("Messages are nacked by broker", routing_keys=routing_keys)
+        if self._closing and not self._queued:
+            self._close_connection()
+
+    def _requeue_unconfirmed(self) -> None:
+        """Queue unconfirmed messages again, they are published first after reconnect."""
+        with self._not_full:
+            if not self._unconfirmed:
+                return
+            logger.warning(
+                "Messages are not confirmed, publish them again", count=len(self._unconfirmed),
+            )
+            self._pending.extendleft(reversed(self._unconfirmed.values()))
+            self._unconfirmed.clear()
+
+    def _reconnect(self) -> None:
+        ioloop = tp.cast(IOLoop, self._ioloop)
+        if self._closing and not self._queued:
+            ioloop.stop()
+            return
+        ioloop.call_later(self.reconnect_delay, self._connect)
+
+    def _drain(self) -> None:
+        self._drain_scheduled = False
+        channel = self._select_channel
+        with self._not_full:
+            while channel is not None and channel.is_open and self._pending:
+                routing_key, body = self._pending[0]
+                try:
+                    channel.basic_publish(self.exchange, routing_key, body, self.properties)
+                except ChannelWrongStateError:
+                    return
+                self._pending.popleft()
+                if self.confirm_delivery:
+                    self._delivery_tag += 1
+                    self._unconfirmed[self._delivery_tag] = (routing_key, body)
+            self._not_full.notify_all()
+
+    def _close_connection(self) -> None:
+        connection = tp.cast(pika.SelectConnection, self._select_connection)
+        if self._select_channel is not None and connection.is_open:
+            self._drain()
+            if self._unconfirmed:
+                # wait for confirms (see close_timeout), connection is closed by _on_confirm
+                return
+            connection.close()
+        elif self._queued:
+            # wait for channel (see close_timeout), queued and unconfirmed messages
+            # are published when it's open
+            return
+        elif connection.is_open:
+            connection.close()
+        elif connection.is_closed:
+            tp.cast(IOLoop, self._ioloop).stop()
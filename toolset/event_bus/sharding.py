@@ -0,0 +1,47 @@
+import typing as tp
+import zlib
+
+from toolset.typing_helpers import JSON
+
+
+def get_shard(key: JSON, shards: int) -> int:
+    """Get shard number of key, it's the same in every process."""
+    return zlib.crc32(str(key).encode()) % shards
+
+
+def get_shard_key(data: JSON, shard_key: str) -> JSON:
+    """Get value of shard key from data, nested keys are separated by dot: `data.id`."""
+    key_value = data
+    for key in shard_key.split("."):
+        key_value = key_value[key]  # type: ignore
+    return key_value
+
+
+def sharded_routing_key(routing_key: str, shard: int) -> str:
+    """Get routing key of shard."""
+    return f"{routing_key}.{shard}"
+
+
+def shard_queue_name(queue_name: str, shard: int) -> str:
+    """Get queue name of shard."""
+    return f"{queue_name}.{shard}"
+
+
+def route_to_shard(routing_key: str, data: JSON, shard_key: str, shards: int) -> str:
+    """Get routing key of shard the data belongs to."""
+    return sharded_routing_key(routing_key, get_shard(get_shard_key(data, shard_key), shards))
+
+
+def assign_shards(shards: int, instance: int = 0, instances: int = 1) -> tp.List[int]:
+    """
+    Get shards consumed by consumer instance.
+
+    Parameters:
+        shards: total number of shards
+        instance: index of consumer instance (0..instances-1)
+        instances: total number of consumer instances
+
+    """
+    if not 0 <= instance < instances:
+        raise ValueError(f"Instance index should be in range 0..{instances - 1}")
+    return list(range(instance, shards, instances))
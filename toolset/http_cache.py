@@ -0,0 +1,315 @@
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatch
+from urllib.parse import parse_qsl
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_VARY_HEADERS = ("Accept", "Accept-Language", "Authorization")
+
+CACHEABLE_STATUS = 200
+NOT_MODIFIED_STATUS = 304
+
+Headers = tp.Mapping[str, str]
+Params = tp.Union[  # type: ignore
+    None, str, bytes, tp.Mapping[str, tp.Any], tp.Iterable[tp.Tuple[str, tp.Any]],
+]
+
+
+class HttpCacheStats(tp.NamedTuple):
+    """Http cache stats snapshot."""
+
+    hits: int
+    revalidated: int
+    misses: int
+    stored: int
+    evictions: int
+    entries: int
+    size_bytes: int
+
+
+class HttpCacheEntry:
+    """Cached response, its body is already read, so it can be read by several callers."""
+
+    def __init__(  # noqa: WPS211 too many arguments
+        self,
+        response: tp.Any,  # type: ignore
+        expires_at: float,
+        etag: tp.Optional[str],
+        last_modified: tp.Optional[str],
+        vary: tp.Dict[str, tp.Optional[str]],
+        size: int,
+    ) -> None:
+        """Init.
+
+        @param response: response of client (aiohttp ClientResponse or requests Response)
+        @param expires_at: time.monotonic() when entry should be revalidated
+        @param etag: ETag of response
+        @param last_modified: Last-Modified of response
+        @param vary: values of request headers listed in Vary of response
+        @param size: size of body and headers in bytes
+        """
+        self.response = response
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.vary = vary
+        self.size = size
+
+    @property
+    def is_fresh(self) -> bool:
+        """Entry can be returned without revalidation."""
+        return time.monotonic() < self.expires_at
+
+    @property
+    def can_revalidate(self) -> bool:
+        """Entry has validators for conditional request."""
+        return self.etag is not None or self.last_modified is not None
+
+    @property
+    def conditional_headers(self) -> tp.Dict[str, str]:
+        """Headers of conditional request revalidating entry."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def parse_cache_control(header: tp.Optional[str]) -> tp.Dict[str, tp.Optional[str]]:
+    """Parse Cache-Control header to dict of lowercase directives and their values."""
+    directives: tp.Dict[str, tp.Optional[str]] = {}
+    for directive in (header or "").split(","):
+        name, _, directive_value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = directive_value.strip('"') if directive_value else None
+    return directives
+
+
+def _get_header(headers: Headers, name: str) -> tp.Optional[str]:
+    """Get header case-insensitively, headers of clients are case-insensitive, dicts aren't."""
+    header_value = headers.get(name)
+    if header_value is not None:
+        return header_value
+    lower_name = name.lower()
+    for header_name, value in headers.items():  # noqa: WPS440 block variables overlap
+        if header_name.lower() == lower_name:
+            return value
+    return None
+
+
+def _get_seconds(header_value: tp.Optional[str]) -> tp.Optional[float]:
+    try:
+        return float(header_value) if header_value is not None else None
+    except ValueError:
+        return None
+
+
+def _get_expires_ttl(headers: Headers) -> tp.Optional[float]:
+    expires = _get_header(headers, "Expires")
+    if expires is None:
+        return None
+    try:
+        expires_at = parsedate_to_datetime(expires)
+        date = _get_header(headers, "Date")
+        now = parsedate_to_datetime(date) if date else None
+    except (TypeError, ValueError):
+        # invalid Expires means response is already expired
+        return 0
+    if now is None or expires_at.tzinfo is None or now.tzinfo is None:
+        return 0
+    return (expires_at - now).total_seconds()
+
+
+def get_ttl(headers: Headers) -> tp.Optional[float]:
+    """Get seconds response is fresh by Cache-Control, Age and Expires, None - no-store."""
+    cache_control = parse_cache_control(_get_header(headers, "Cache-Control"))
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    ttl = _get_seconds(cache_control.get("max-age"))
+    if ttl is None:
+        ttl = _get_expires_ttl(headers)
+    if ttl is None:
+        return 0
+    return max(ttl - (_get_seconds(_get_header(headers, "Age")) or 0), 0)
+
+
+def _iter_params(params: Params) -> tp.Iterator[tp.Tuple[str, str]]:
+    """Iterate (name, value) pairs of params given as query string, mapping or pairs.
+
+    Sequence value of mapping is expanded to pairs of the same name like clients do.
+    """
+    if isinstance(params, bytes):
+        params = params.decode()
+    if isinstance(params, str):
+        yield from parse_qsl(params, keep_blank_values=True)
+        return
+    if isinstance(params, tp.Mapping):
+        params = params.items()
+    for name, param in params or ():
+        if isinstance(param, (list, tuple)):
+            yield from ((name, str(value)) for value in param)
+        else:
+            yield name, str(param)
+
+
+def make_request_key(
+    url: str, params: Params, headers: Headers, vary_headers: tp.Iterable[str],
+) -> tp.Hashable:
+    """Make key of request by url, normalized query params and values of `vary_headers`.
+
+    Params are sorted by name, order of values of the same param is kept.
+    """
+    params_key = tuple(sorted(_iter_params(params), key=lambda param: param[0]))
+    headers_key = tuple(_get_header(headers, name) for name in vary_headers)
+    return url, params_key, headers_key
+
+
+class HttpCache:
+    """
+    Http cache of GET responses of api clients.
+
+    Responses are stored in LRU bounded by size of bodies and headers. Freshness is got
+    from Cache-Control (max-age, no-cache, no-store), Age and Expires or from TTL of route.
+    Expired entries with ETag or Last-Modified are revalidated with conditional request
+    (If-None-Match, If-Modified-Since), 304 response makes them fresh again.
+    Key is url, query params and values of `vary_headers` of request, Vary of response
+    is respected too.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        route_ttls: tp.Optional[tp.Mapping[str, float]] = None,
+        vary_headers: tp.Iterable[str] = DEFAULT_VARY_HEADERS,
+    ) -> None:
+        """Init.
+
+        @param max_bytes: max size of cached bodies and headers
+        @param route_ttls: TTL of responses by url pattern (fnmatch), it overrides
+            headers of response except no-store, e.g. {"*/departments/*": 300}
+        @param vary_headers: request headers making different cache keys
+        """
+        self.max_bytes = max_bytes
+        self.route_ttls = route_ttls or {}
+        self.vary_headers = tuple(vary_headers)
+
+        self._entries: "OrderedDict[tp.Hashable, HttpCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._revalidated = 0
+        self._misses = 0
+        self._stored = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> HttpCacheStats:
+        """Get stats."""
+        with self._lock:
+            return HttpCacheStats(
+                hits=self._hits,
+                revalidated=self._revalidated,
+                misses=self._misses,
+                stored=self._stored,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size_bytes=self._size,
+            )
+
+    def make_key(self, url: str, params: Params, headers: Headers) -> tp.Hashable:
+        """Make key of url, query params (dict or list like make_params result) and headers."""
+        return make_request_key(url, params, headers, self.vary_headers)
+
+    def get(self, key: tp.Hashable, headers: Headers) -> tp.Optional[HttpCacheEntry]:
+        """Get entry which is fresh or can be revalidated, count a hit for fresh entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.is_fresh and not entry.can_revalidate:
+                self._delete(key)
+                entry = None
+            if entry is not None and any(
+                _get_header(headers, name) != value for name, value in entry.vary.items()
+            ):
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.is_fresh:
+                self._hits += 1
+            return entry
+
+    def set(  # noqa: A003, WPS211 too many arguments
+        self,
+        key: tp.Hashable,
+        url: str,
+        response: tp.Any,  # type: ignore
+        response_headers: Headers,
+        request_headers: Headers,
+        body_size: int,
+    ) -> tp.Optional[HttpCacheEntry]:
+        """Store response with read body if it's cacheable, get stored entry."""
+        vary = [
+            name.strip()
+            for name in (_get_header(response_headers, "Vary") or "").split(",")
+            if name.strip()
+        ]
+        ttl = self._get_ttl(url, response_headers)
+        size = body_size + sum(len(name) + len(value) for name, value in response_headers.items())
+        if ttl is None or "*" in vary or size > self.max_bytes:
+            return None
+        entry = HttpCacheEntry(
+            response=response,
+            expires_at=time.monotonic() + ttl,
+            etag=_get_header(response_headers, "ETag"),
+            last_modified=_get_header(response_headers, "Last-Modified"),
+            vary={name: _get_header(request_headers, name) for name in vary},
+            size=size,
+        )
+        if not ttl and not entry.can_revalidate:
+            return None
+
+        with self._lock:
+            self._delete(key)
+            self._entries[key] = entry
+            self._size += size
+            self._stored += 1
+            while self._size > self.max_bytes:
+                self._delete(next(iter(self._entries)))
+                self._evictions += 1
+        return entry
+
+    def revalidated(self, entry: HttpCacheEntry, url: str, response_headers: Headers) -> None:
+        """Make entry fresh by headers of 304 response."""
+        ttl = self._get_ttl(url, response_headers)
+        entry.expires_at = time.monotonic() + (ttl or 0)
+        entry.etag = _get_header(response_headers, "ETag") or entry.etag
+        with self._lock:
+            self._revalidated += 1
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _get_ttl(self, url: str, headers: Headers) -> tp.Optional[float]:
+        ttl = get_ttl(headers)
+        if ttl is None:
+            return None
+        route = url.partition("?")[0]
+        for pattern, route_ttl in self.route_ttls.items():
+            if fnmatch(route, pattern):
+                return route_ttl
+        return ttl
+
+    def _delete(self, key: tp.Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
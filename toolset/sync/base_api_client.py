@@ -3,6 +3,7 @@ import typing as tp
 
 import requests
 
+from toolset.http_cache import CACHEABLE_STATUS, NOT_MODIFIED_STATUS, HttpCache
 from toolset.typing_helpers import JSON_MAPPING
 
 OPTIONAL_JSON_MAPPING = tp.Optional[JSON_MAPPING]
@@ -18,13 +19,19 @@ DATA_TYPE = tp.Union[  # type: ignore
 
 
 class BaseApiClient:
-    """Base api client."""
+    """
+    Base api client.
+
+    Set `cache` to cache responses of GET requests (see HttpCache).
+    """
 
     service_token: tp.Optional[str] = os.environ.get("SERVICE_SECRET")
     service_name: str
 
     default_timeout = 120
 
+    cache: tp.Optional[HttpCache] = None
+
     def __init__(self):
         """Init."""
         self.session = requests.Session()
@@ -33,7 +40,9 @@ class BaseApiClient:
         )
 
     def get(self, url: str, **kwargs) -> requests.Response:
-        """Get."""
+        """Get, cached response is returned with read content."""
+        if self.cache is not None:
+            return self._cached_get(self.cache, url, kwargs)
         return self.session.get(url, **{"timeout": self.default_timeout, **kwargs})
 
     def post(
@@ -55,3 +64,25 @@ class BaseApiClient:
     def delete(self, url: str, **kwargs) -> requests.Response:
         """Delete."""
         return self.session.delete(url, **{"timeout": self.default_timeout, **kwargs})
+
+    def _cached_get(
+        self, cache: HttpCache, url: str, kwargs: tp.Dict[str, tp.Any],  # type: ignore
+    ) -> requests.Response:
+        request_headers = {**self.session.headers, **kwargs.get("headers", {})}
+        key = cache.make_key(url, kwargs.get("params"), request_headers)
+        entry = cache.get(key, request_headers)
+        if entry is not None and entry.is_fresh:
+            return entry.response
+        if entry is not None:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **entry.conditional_headers}
+
+        response = self.session.get(url, **{"timeout": self.default_timeout, **kwargs})
+        if entry is not None and response.status_code == NOT_MODIFIED_STATUS:
+            response.close()
+            cache.revalidated(entry, url, response.headers)
+            return entry.response
+        if response.status_code == CACHEABLE_STATUS:
+            cache.set(
+                key, url, response, response.headers, request_headers, len(response.content),
+            )
+        return response